@@ -0,0 +1,395 @@
+# bench/cluster_bench.py
+"""
+Benchmark ponta a ponta de um cluster local.
+
+Sobe K servidores (processos 'server.run_server' com configs gerados),
+opcionalmente P workers reais ('worker.run_worker') e M workers virtuais
+do load generator, roda cenários e imprime um JSON com:
+  - throughput (aceitas/s e concluídas/s);
+  - latência de despacho p50/p99 (pedido ALIVE -> tarefa, medida nos workers virtuais);
+  - tempo de convergência do empréstimo de workers (e de retorno, no 'mass_return');
+  - CPU e RSS por processo (psutil).
+
+Cenários:
+  steady       carga constante distribuída entre todos os servidores.
+  burst        carga base baixa + pico só no servidor 0 (empréstimo de workers).
+  peer_crash   carga constante; o último servidor leva SIGKILL na metade do tempo.
+  mass_return  pico só no servidor 0 e depois silêncio: mede a volta dos emprestados.
+
+Exemplo:
+  python -m bench.cluster_bench --servers 2 --workers 20 --rate 200 --duration 30 --output cluster.json
+"""
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import psutil
+
+from .load_generator import LoadGenerator, _request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("steady", "burst", "peer_crash", "mass_return")
+
+
+def bench_server_id(i: int) -> str:
+    return f"SERVER_BENCH{i + 1}"
+
+
+def bench_server_config(i: int, servers: int, base_port: int, timing: dict = None, load_balancing: dict = None) -> dict:
+    """Config do servidor i de um cluster de benchmark (peers = todos os outros)."""
+    peers = [{"ip": "127.0.0.1", "port": base_port + j, "id": bench_server_id(j)}
+             for j in range(servers) if j != i]
+    return {
+        "server": {"ip": "127.0.0.1", "port": base_port + i, "id_number": f"BENCH{i + 1}"},
+        "peers": peers,
+        # Sem supervisor: o reporter só loga localmente
+        "supervisor": {"supervisor_info": None, "supervisor_interval": 10},
+        "timing": {
+            "heartbeat_interval": 2,
+            "heartbeat_timeout": 6,
+            "heartbeat_retries": 1,
+            "heartbeat_retry_delay": 1,
+            "load_balancer_interval": 2,
+            "heartbeat_backoff_factor": 2,
+            "heartbeat_max_delay": 10,
+            "heartbeat_jitter_frac": 0.15,
+            **(timing or {})
+        },
+        "load_balancing": {
+            "min_workers_before_sharing": 1,
+            "threshold_window": 30,
+            "threshold_min_tasks": 1,
+            "min_queue_threshold": 5,
+            "max_queue_threshold": 50,
+            **(load_balancing or {})
+        },
+        "persistence": {"enabled": False},
+        "ingestion": {"internal_producer": False, "queue_capacity": 1000000, "backpressure": "reject"}
+    }
+
+
+def bench_worker_config(j: int, servers: int, base_port: int, work_time: float) -> dict:
+    """Config do worker j: casa em round-robin, os demais servidores como 'known_servers'."""
+    with open(os.path.join(REPO_ROOT, "worker", "config.json"), 'r') as f:
+        config = json.load(f)
+    home = j % servers
+    config["home_server"] = {"host": "127.0.0.1", "port": base_port + home, "uuid": bench_server_id(home)}
+    config["known_servers"] = [{"host": "127.0.0.1", "port": base_port + k, "uuid": bench_server_id(k)}
+                               for k in range(servers) if k != home]
+    config["execution"]["work_time"] = work_time
+    config["farm"]["processes"] = 1
+    return config
+
+
+class LocalCluster:
+    """K servidores (+ P workers reais) em localhost, cada um no seu processo."""
+
+    def __init__(self, servers: int, workdir: str, base_port: int = 19001, process_workers: int = 0,
+                 work_time: float = 0.0, timing: dict = None, load_balancing: dict = None):
+        self.servers = servers
+        self.workdir = workdir
+        self.base_port = base_port
+        self.process_workers = process_workers
+        self.work_time = work_time
+        self.timing = timing or {}
+        self.load_balancing = load_balancing or {}
+        self.procs = {}   # nome -> Popen
+        self._outputs = []
+
+    def server_id(self, i: int) -> str:
+        return bench_server_id(i)
+
+    def targets(self) -> list:
+        return [["127.0.0.1", self.base_port + i, self.server_id(i)] for i in range(self.servers)]
+
+    def _server_config(self, i: int) -> dict:
+        return bench_server_config(i, self.servers, self.base_port, self.timing, self.load_balancing)
+
+    def _worker_config(self, j: int) -> dict:
+        return bench_worker_config(j, self.servers, self.base_port, self.work_time)
+
+    def _spawn(self, name: str, module: str, config: dict):
+        config_path = os.path.join(self.workdir, f"{name}.json")
+        with open(config_path, 'w') as f:
+            json.dump(config, f, indent=2)
+        # Roda dentro do workdir (os logs vão para <workdir>/logs), com o repo no PYTHONPATH
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        out = open(os.path.join(self.workdir, f"{name}.out"), 'w')
+        self._outputs.append(out)
+        self.procs[name] = subprocess.Popen([sys.executable, "-m", module, config_path],
+                                            cwd=self.workdir, env=env, stdout=out, stderr=subprocess.STDOUT)
+
+    def _wait_for_port(self, port: int, timeout: float = 15) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                    return True
+            except OSError:
+                time.sleep(0.1)
+        return False
+
+    def start(self):
+        for i in range(self.servers):
+            self._spawn(f"server{i}", "server.run_server", self._server_config(i))
+        for i in range(self.servers):
+            if not self._wait_for_port(self.base_port + i):
+                self.stop()
+                raise RuntimeError(f"Servidor {self.server_id(i)} não abriu a porta {self.base_port + i}.")
+        for j in range(self.process_workers):
+            self._spawn(f"worker{j}", "worker.run_worker", self._worker_config(j))
+
+    def kill(self, name: str):
+        proc = self.procs.get(name)
+        if proc and proc.poll() is None:
+            proc.send_signal(signal.SIGKILL)
+            proc.wait()
+
+    def stop(self):
+        for proc in self.procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in self.procs.values():
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        for out in self._outputs:
+            out.close()
+
+
+class ProcessSampler:
+    """CPU (%) e RSS (MB) de cada processo do cluster e do próprio benchmark."""
+
+    def __init__(self, procs: dict):
+        self._handles = {name: psutil.Process(p.pid) for name, p in procs.items()}
+        self._handles["bench"] = psutil.Process(os.getpid())
+        self._samples = {name: [] for name in self._handles}
+        for handle in self._handles.values():
+            handle.cpu_percent(None)   # primeira leitura só zera o contador
+
+    def sample(self):
+        for name, handle in self._handles.items():
+            try:
+                self._samples[name].append((handle.cpu_percent(None), handle.memory_info().rss / (1024 * 1024)))
+            except psutil.Error:
+                pass   # processo morto (ex.: peer_crash)
+
+    def summary(self) -> dict:
+        result = {}
+        for name, samples in self._samples.items():
+            if not samples:
+                continue
+            cpus = [c for c, _ in samples]
+            result[name] = {
+                "cpu_mean": round(sum(cpus) / len(cpus), 1),
+                "cpu_max": round(max(cpus), 1),
+                "rss_max_mb": round(max(r for _, r in samples), 1),
+            }
+        return result
+
+
+def _plan(scenario: str, servers: int, rate: float, duration: float) -> dict:
+    """
+    Fases de carga ('at' e 'duration' em s, 'targets' = índices dos servidores)
+    e eventos do cenário. 'trigger' marca o instante de referência das medições.
+    """
+    everyone = list(range(servers))
+    if scenario == "steady":
+        return {"phases": [{"at": 0, "duration": duration, "rate": rate, "targets": everyone}], "events": [], "trigger": 0}
+    if scenario == "burst":
+        return {"phases": [{"at": 0, "duration": duration, "rate": rate * 0.2, "targets": everyone},
+                           {"at": duration / 3, "duration": duration / 3, "rate": rate * 2, "targets": [0]}],
+                "events": [], "trigger": duration / 3}
+    if scenario == "peer_crash":
+        return {"phases": [{"at": 0, "duration": duration, "rate": rate, "targets": everyone}],
+                "events": [{"at": duration / 2, "kill": f"server{servers - 1}"}], "trigger": duration / 2}
+    if scenario == "mass_return":
+        return {"phases": [{"at": 0, "duration": duration / 2, "rate": rate * 2, "targets": [0]}],
+                "events": [], "trigger": duration / 2}
+    raise ValueError(f"Cenário desconhecido: {scenario}")
+
+
+def _borrowing_metrics(timeline: list, trigger: float, scenario: str) -> dict:
+    """
+    A partir de [(t, emprestados)]:
+      - first_borrow_s: do gatilho até o primeiro worker emprestado;
+      - convergence_s: do gatilho até o empréstimo chegar a 90% do pico;
+      - return_s (mass_return): do fim da carga até não sobrar nenhum emprestado.
+    No peer_crash, "emprestado" inclui os workers que fizeram failover.
+    """
+    peak = max((b for _, b in timeline), default=0)
+    metrics = {"peak_borrowed": peak, "first_borrow_s": None, "convergence_s": None}
+    start = 0 if scenario == "mass_return" else trigger
+    for t, borrowed in timeline:
+        if t >= start and borrowed > 0 and metrics["first_borrow_s"] is None:
+            metrics["first_borrow_s"] = round(t - start, 3)
+        if t >= start and peak and borrowed >= 0.9 * peak:
+            metrics["convergence_s"] = round(t - start, 3)
+            break
+
+    if scenario == "mass_return":
+        metrics["return_s"] = None
+        if peak:
+            for t, borrowed in timeline:
+                if t >= trigger and borrowed == 0:
+                    metrics["return_s"] = round(t - trigger, 3)
+                    break
+    return metrics
+
+
+async def _run_scenario(cluster: LocalCluster, scenario: str, args) -> dict:
+    plan = _plan(scenario, args.servers, args.rate, args.duration)
+    targets = cluster.targets()
+    total = args.duration + args.drain
+
+    workers = LoadGenerator({
+        "targets": targets, "duration": total, "producers": 0, "workers": args.workers,
+        "work_time": args.work_time, "fetch_next": args.fetch_next, "seed": args.seed,
+    })
+    phases = [LoadGenerator({
+        "targets": [targets[i] for i in phase["targets"]], "duration": phase["duration"],
+        "producers": len(phase["targets"]), "rate": phase["rate"], "shape": args.shape,
+        "keys": args.keys, "workers": 0, "seed": args.seed,
+    }) for phase in plan["phases"]]
+
+    sampler = ProcessSampler(cluster.procs)
+    borrowed_timeline = []
+    queue_timeline = []
+    start = time.monotonic()
+
+    async def run_phase(generator, at):
+        await asyncio.sleep(at)
+        return await generator.run_async()
+
+    async def run_event(event):
+        await asyncio.sleep(event["at"])
+        cluster.kill(event["kill"])
+
+    async def observe():
+        last_probe = 0.0
+        while time.monotonic() - start < total:
+            now = time.monotonic() - start
+            borrowed = sum(1 for home, master in workers.worker_masters.values() if master != home)
+            borrowed_timeline.append((round(now, 3), borrowed))
+            if now - last_probe >= 1.0:
+                last_probe = now
+                sampler.sample()
+                # SUBMIT vazio devolve o tamanho da fila de cada servidor
+                sizes = []
+                for host, port, _ in targets:
+                    ack = await _request(host, port, {"TASK": "SUBMIT", "TASKS": []}, timeout=1)
+                    sizes.append(ack.get("QUEUE_SIZE") if ack else None)
+                queue_timeline.append([round(now, 1)] + sizes)
+            await asyncio.sleep(0.2)
+
+    results = await asyncio.gather(
+        workers.run_async(),
+        observe(),
+        *[run_phase(g, phase["at"]) for g, phase in zip(phases, plan["phases"])],
+        *[run_event(event) for event in plan["events"]],
+    )
+    worker_result = results[0]
+    phase_results = results[2:2 + len(phases)]
+
+    accepted = sum(r["accepted"] for r in phase_results)
+    result = {
+        "accepted": accepted,
+        "accepted_rate": round(accepted / args.duration, 2),
+        "rejected": sum(r["rejected"] for r in phase_results),
+        "submit_errors": sum(r["submit_errors"] for r in phase_results),
+        "completed": worker_result["completed"],
+        "completed_rate": round(worker_result["completed"] / args.duration, 2),
+        "dispatch_p50_ms": worker_result["dispatch_latency"]["p50_ms"],
+        "dispatch_p99_ms": worker_result["dispatch_latency"]["p99_ms"],
+        "dispatch_latency": worker_result["dispatch_latency"],
+        "submit_latency_p99_ms": max((r["submit_latency"]["p99_ms"] for r in phase_results), default=0),
+        "redirects": worker_result["redirects"],
+        "returns": worker_result["returns"],
+        "worker_errors": worker_result["worker_errors"],
+        "borrowing": _borrowing_metrics(borrowed_timeline, plan["trigger"], scenario),
+        "processes": sampler.summary(),
+        "queue_timeline": queue_timeline,
+        "completed_timeline": [[row[0], row[3]] for row in worker_result["timeline"]],
+    }
+
+    if scenario == "peer_crash":
+        # Throughput antes e depois da queda (por segundo, concluídas pelos workers virtuais)
+        trigger = int(plan["trigger"])
+        before = [c for s, c in result["completed_timeline"] if 1 <= s < trigger]
+        after = [c for s, c in result["completed_timeline"] if trigger < s < args.duration]
+        result["completed_rate_before_crash"] = round(sum(before) / len(before), 2) if before else 0
+        result["completed_rate_after_crash"] = round(sum(after) / len(after), 2) if after else 0
+    return result
+
+
+def run_benchmark(args) -> dict:
+    output = {
+        "cluster": {
+            "servers": args.servers, "virtual_workers": args.workers, "process_workers": args.process_workers,
+            "rate": args.rate, "duration": args.duration, "shape": args.shape, "keys": args.keys,
+            "work_time": args.work_time, "fetch_next": args.fetch_next,
+        },
+        "scenarios": {},
+    }
+    for scenario in args.scenarios:
+        # Cluster novo por cenário (o peer_crash mata um servidor)
+        with tempfile.TemporaryDirectory(prefix=f"cluster_bench_{scenario}_") as workdir:
+            cluster = LocalCluster(args.servers, workdir, base_port=args.base_port,
+                                   process_workers=args.process_workers, work_time=args.work_time,
+                                   load_balancing={"max_queue_threshold": args.max_queue_threshold})
+            cluster.start()
+            try:
+                time.sleep(args.warmup)
+                output["scenarios"][scenario] = asyncio.run(_run_scenario(cluster, scenario, args))
+            finally:
+                cluster.stop()
+                if args.keep_logs:
+                    target = os.path.abspath(os.path.join(args.keep_logs, scenario))
+                    os.makedirs(target, exist_ok=True)
+                    for name in os.listdir(workdir):
+                        if name.endswith(".out"):
+                            os.replace(os.path.join(workdir, name), os.path.join(target, name))
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta de um cluster local.")
+    parser.add_argument("--servers", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=20, help="Workers virtuais (medem latência de despacho).")
+    parser.add_argument("--process-workers", type=int, default=0, help="Workers reais (processos worker.run_worker).")
+    parser.add_argument("--rate", type=float, default=200, help="Tarefas/s ofertadas (base de cada cenário).")
+    parser.add_argument("--duration", type=float, default=30, help="Duração da carga de cada cenário (s).")
+    parser.add_argument("--drain", type=float, default=10, help="Tempo extra após a carga (s).")
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--shape", default="poisson", choices=["constant", "poisson", "burst", "diurnal"])
+    parser.add_argument("--keys", default="uniform", choices=["uniform", "zipf"])
+    parser.add_argument("--work-time", type=float, default=0.01)
+    parser.add_argument("--fetch-next", action="store_true")
+    parser.add_argument("--max-queue-threshold", type=int, default=50, help="Fila acima disso pede workers aos peers.")
+    parser.add_argument("--base-port", type=int, default=19001)
+    parser.add_argument("--scenarios", type=lambda s: [x for x in s.split(',') if x], default=list(SCENARIOS),
+                        help=f"Lista separada por vírgula ({','.join(SCENARIOS)}).")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--keep-logs", help="Copia a saída dos processos para este diretório.")
+    parser.add_argument("--output", help="Grava o resultado em JSON neste arquivo.")
+    args = parser.parse_args()
+
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"Cenário desconhecido: {scenario}")
+
+    result = run_benchmark(args)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,450 @@
+# bench/load_generator.py
+"""
+Gerador de carga sintético para benchmark dos servidores.
+
+Fala o protocolo real (JSON por linha, uma mensagem por conexão) e roda,
+em um único processo (asyncio), vários PRODUTORES virtuais (SUBMIT) e
+WORKERS virtuais (ALIVE -> tarefa -> STATUS), registrando throughput
+alcançado e percentis de latência.
+
+Exemplos:
+  python -m bench.load_generator --target 127.0.0.1:9001 --shape poisson --rate 500 --workers 20
+  python -m bench.load_generator --target 127.0.0.1:9001 --sweep 200,400,800,1600 --duration 15
+"""
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from bisect import bisect_left
+from itertools import accumulate
+
+from histogram import LatencyHistogram
+from payload_models import get_task, task_status, task_submit
+
+# Perfil padrão; qualquer chave pode ser sobrescrita por '--config' ou pela linha de comando
+DEFAULT_PROFILE = {
+    "targets": [["127.0.0.1", 9001]],  # [host, porta] ou [host, porta, id do servidor]
+    "duration": 30,               # segundos por estágio
+    "producers": 1,
+    "shape": "poisson",           # constant | poisson | burst | diurnal
+    "rate": 100,                  # tarefas/s (total, dividido entre os produtores)
+    "burst_rate": 1000,           # burst: taxa dentro do pico
+    "burst_every": 10,            # burst: intervalo entre picos (s)
+    "burst_length": 1,            # burst: duração do pico (s)
+    "peak_rate": 500,             # diurnal: taxa no pico (a base é 'rate')
+    "period": 60,                 # diurnal: duração de um "dia" (s)
+    "batch_window": 0.05,         # produtor junta as chegadas desta janela em um SUBMIT
+    "max_inflight_submits": 64,   # SUBMITs simultâneos por produtor
+    "keys": "uniform",            # uniform | zipf
+    "users": 1000,
+    "zipf_s": 1.1,
+    "task_types": {"QUERY": 1.0}, # peso de cada tipo de tarefa
+    "workers": 0,
+    "work_time": 0.0,             # tempo simulado de execução (s)
+    "fetch_next": False,          # usa "report and fetch" no STATUS
+    "idle_delay": 0.05,           # pausa do worker virtual após NO_TASK
+    "timeout": 5,
+    "seed": None,
+    "sweep": [],                  # lista de taxas: um estágio por taxa
+    "saturation_ratio": 0.95,     # estágio saturado se alcançado < ratio * ofertado
+}
+
+
+class ArrivalShape:
+    """
+    Processo de chegada com taxa (possivelmente) variável no tempo.
+    - constant: intervalo fixo 1/rate.
+    - poisson: intervalos exponenciais com taxa 'rate'.
+    - burst / diurnal: Poisson não-homogêneo (método de thinning).
+    """
+
+    def __init__(self, shape: str, rate: float, burst_rate: float = 0, burst_every: float = 10,
+                 burst_length: float = 1, peak_rate: float = 0, period: float = 60, rng: random.Random = None):
+        if shape not in ("constant", "poisson", "burst", "diurnal"):
+            raise ValueError(f"Forma de carga desconhecida: {shape}")
+        self.shape = shape
+        self.rate = rate
+        self.burst_rate = burst_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.peak_rate = peak_rate
+        self.period = period
+        self.rng = rng or random.Random()
+
+    def rate_at(self, t: float) -> float:
+        if self.shape == "burst":
+            return self.burst_rate if (t % self.burst_every) < self.burst_length else self.rate
+        if self.shape == "diurnal":
+            phase = (1 - math.cos(2 * math.pi * t / self.period)) / 2
+            return self.rate + (self.peak_rate - self.rate) * phase
+        return self.rate
+
+    def max_rate(self) -> float:
+        if self.shape == "burst":
+            return max(self.rate, self.burst_rate)
+        if self.shape == "diurnal":
+            return max(self.rate, self.peak_rate)
+        return self.rate
+
+    def next_arrival(self, t: float) -> float:
+        """Instante da próxima chegada depois de 't' (segundos desde o início)."""
+        if self.shape == "constant":
+            return t + 1.0 / self.rate if self.rate > 0 else math.inf
+        if self.shape == "poisson":
+            return t + self.rng.expovariate(self.rate) if self.rate > 0 else math.inf
+
+        lam_max = self.max_rate()
+        if lam_max <= 0:
+            return math.inf
+        while True:
+            t += self.rng.expovariate(lam_max)
+            if self.rng.random() * lam_max <= self.rate_at(t):
+                return t
+
+
+class KeyChooser:
+    """Escolhe o USER de cada tarefa: uniforme ou Zipf (poucos usuários "quentes")."""
+
+    def __init__(self, kind: str, users: int, zipf_s: float = 1.1, rng: random.Random = None):
+        if kind not in ("uniform", "zipf"):
+            raise ValueError(f"Distribuição de chaves desconhecida: {kind}")
+        self.kind = kind
+        self.users = max(1, users)
+        self.rng = rng or random.Random()
+        self._cumulative = None
+        if kind == "zipf":
+            self._cumulative = list(accumulate(1.0 / (k ** zipf_s) for k in range(1, self.users + 1)))
+
+    def next_user(self) -> str:
+        if self.kind == "uniform":
+            rank = self.rng.randrange(self.users)
+        else:
+            rank = bisect_left(self._cumulative, self.rng.random() * self._cumulative[-1])
+        return f"user-{rank}"
+
+
+class LoadStats:
+    """Contadores e histogramas de um estágio."""
+
+    def __init__(self):
+        self.submitted = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.submit_errors = 0
+        self.completed = 0
+        self.no_task = 0
+        self.redirects = 0
+        self.returns = 0
+        self.worker_errors = 0
+        self.submit_latency = LatencyHistogram()
+        self.dispatch_latency = LatencyHistogram()
+        self.status_latency = LatencyHistogram()
+        self.timeline = {}   # segundo -> [submetidas, aceitas, concluídas]
+
+    def tick(self, t: float, submitted: int = 0, accepted: int = 0, completed: int = 0):
+        bucket = self.timeline.setdefault(int(t), [0, 0, 0])
+        bucket[0] += submitted
+        bucket[1] += accepted
+        bucket[2] += completed
+
+    def summary(self, elapsed: float, offered_rate: float) -> dict:
+        elapsed = max(elapsed, 1e-9)
+        return {
+            "offered_rate": round(offered_rate, 2),
+            "elapsed": round(elapsed, 3),
+            "submitted": self.submitted,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "submit_errors": self.submit_errors,
+            "accepted_rate": round(self.accepted / elapsed, 2),
+            "completed": self.completed,
+            "completed_rate": round(self.completed / elapsed, 2),
+            "no_task": self.no_task,
+            "redirects": self.redirects,
+            "returns": self.returns,
+            "worker_errors": self.worker_errors,
+            "submit_latency": self.submit_latency.summary(),
+            "dispatch_latency": self.dispatch_latency.summary(),
+            "status_latency": self.status_latency.summary(),
+            "timeline": [[second] + counts for second, counts in sorted(self.timeline.items())],
+        }
+
+
+async def _request(host: str, port: int, payload: dict, timeout: float) -> dict:
+    """Envia uma mensagem em uma conexão nova e devolve a resposta (ou None)."""
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write((json.dumps(payload) + '\n').encode('utf-8'))
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        return json.loads(line) if line else None
+    except (OSError, asyncio.TimeoutError, json.JSONDecodeError):
+        return None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+class LoadGenerator:
+    """
+    Roda um estágio de carga contra os 'targets' do perfil.
+    Produtores e workers virtuais são distribuídos em round-robin entre os alvos.
+    """
+
+    def __init__(self, profile: dict):
+        self.profile = {**DEFAULT_PROFILE, **profile}
+        self.rng = random.Random(self.profile["seed"])
+        self.targets = [(t[0], int(t[1])) for t in self.profile["targets"]]
+        # O id do servidor vai no SERVER_UUID quando o worker virtual está emprestado
+        self.target_ids = [t[2] if len(t) > 2 else f"LOADGEN_HOME_{i}" for i, t in enumerate(self.profile["targets"])]
+        self.worker_masters = {}   # índice do worker virtual -> (casa, mestre atual)
+        types = self.profile["task_types"]
+        self._type_names = list(types)
+        self._type_weights = [types[name] for name in self._type_names]
+        self.stats = LoadStats()
+        self._start = 0.0
+        self._deadline = 0.0
+
+    def _now(self) -> float:
+        return time.monotonic() - self._start
+
+    # --- Produtores ---
+
+    async def _producer(self, index: int, rate: float):
+        p = self.profile
+        rng = random.Random(self.rng.random())
+        shape = ArrivalShape(p["shape"], rate, burst_rate=p["burst_rate"] / p["producers"],
+                             burst_every=p["burst_every"], burst_length=p["burst_length"],
+                             peak_rate=p["peak_rate"] / p["producers"], period=p["period"], rng=rng)
+        keys = KeyChooser(p["keys"], p["users"], zipf_s=p["zipf_s"], rng=rng)
+        host, port = self.targets[index % len(self.targets)]
+        slots = asyncio.Semaphore(p["max_inflight_submits"])
+        pending = set()
+        submit_template = task_submit([])
+
+        next_arrival = shape.next_arrival(0.0)
+        window_end = p["batch_window"]
+        while window_end <= p["duration"]:
+            delay = window_end - self._now()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            batch = []
+            while next_arrival < window_end:
+                task_type = rng.choices(self._type_names, self._type_weights)[0]
+                batch.append({"TASK": task_type, "USER": keys.next_user()})
+                next_arrival = shape.next_arrival(next_arrival)
+
+            if batch:
+                # O envio não bloqueia o relógio de chegadas; a latência conta a partir
+                # do instante planejado (evita "coordinated omission").
+                job = asyncio.create_task(self._submit(host, port, dict(submit_template, TASKS=batch), window_end, slots))
+                pending.add(job)
+                job.add_done_callback(pending.discard)
+            window_end += p["batch_window"]
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def _submit(self, host: str, port: int, payload: dict, intended_at: float, slots: asyncio.Semaphore):
+        size = len(payload["TASKS"])
+        self.stats.submitted += size
+        self.stats.tick(intended_at, submitted=size)
+        async with slots:
+            response = await _request(host, port, payload, self.profile["timeout"])
+
+        if not response or response.get("RESPONSE") != "SUBMIT_ACK":
+            self.stats.submit_errors += size
+            return
+        self.stats.submit_latency.record(self._now() - intended_at)
+        self.stats.accepted += response.get("ACCEPTED", 0)
+        self.stats.rejected += response.get("REJECTED", 0)
+        self.stats.tick(self._now(), accepted=response.get("ACCEPTED", 0))
+
+    # --- Workers virtuais ---
+
+    def _failover_target(self, master: tuple, home: tuple) -> tuple:
+        """Depois de uma falha: volta para a casa; se a casa falhou, tenta o próximo alvo."""
+        if master != home:
+            return home
+        return self.targets[(self.targets.index(home) + 1) % len(self.targets)]
+
+    async def _virtual_worker(self, index: int, home: tuple, ask_payload: dict, borrowed_payload: dict, status_payload: dict):
+        p = self.profile
+        stats = self.stats
+        master = home
+        response = None
+        self.worker_masters[index] = (home, master)
+
+        while self._now() < self._deadline:
+            self.worker_masters[index] = (home, master)
+            if response is None:
+                payload = ask_payload if master == home else borrowed_payload
+                sent_at = time.monotonic()
+                response = await _request(master[0], master[1], payload, p["timeout"])
+                rtt = time.monotonic() - sent_at
+                if response is None:
+                    stats.worker_errors += 1
+                    master = self._failover_target(master, home)
+                    await asyncio.sleep(0.5)
+                    continue
+            else:
+                rtt = None
+
+            command = response.get("TASK")
+            if command == "NO_TASK":
+                stats.no_task += 1
+                response = None
+                await asyncio.sleep(p["idle_delay"])
+            elif command == "REDIRECT":
+                stats.redirects += 1
+                target = response.get("SERVER_REDIRECT") or {}
+                master = (target.get("ip", home[0]), target.get("port", home[1]))
+                response = None
+            elif command == "RETURN":
+                stats.returns += 1
+                master = home
+                response = None
+            elif command:
+                if rtt is not None:
+                    stats.dispatch_latency.record(rtt)
+                if p["work_time"] > 0:
+                    await asyncio.sleep(p["work_time"])
+
+                status = dict(status_payload, TASK=command)
+                if response.get("TASK_ID"):
+                    status["TASK_ID"] = response["TASK_ID"]
+                sent_at = time.monotonic()
+                ack = await _request(master[0], master[1], status, p["timeout"])
+                stats.status_latency.record(time.monotonic() - sent_at)
+                stats.completed += 1
+                stats.tick(self._now(), completed=1)
+                # Com FETCH_NEXT a próxima tarefa (ou ordem) já veio no ACK
+                response = (ack or {}).get("NEXT")
+            else:
+                stats.worker_errors += 1
+                response = None
+
+    def _worker_payloads(self, home_index: int) -> tuple:
+        """
+        Monta os payloads de um worker virtual uma única vez
+        (os construtores de payload_models imprimem cada payload).
+        """
+        worker_id = f"LOADGEN-{uuid.uuid4().hex[:8]}"
+        ask = get_task(worker_id)
+        borrowed = get_task(worker_id, owner_id=self.target_ids[home_index])
+        status = task_status(worker_id, "OK", "QUERY", fetch_next=self.profile["fetch_next"])
+        return ask, borrowed, status
+
+    # --- Execução ---
+
+    async def run_async(self) -> dict:
+        p = self.profile
+        self._start = time.monotonic()
+        self._deadline = p["duration"]
+
+        jobs = []
+        per_producer = p["rate"] / p["producers"] if p["producers"] else 0
+        for i in range(p["producers"]):
+            jobs.append(self._producer(i, per_producer))
+        for i in range(p["workers"]):
+            home_index = i % len(self.targets)
+            jobs.append(self._virtual_worker(i, self.targets[home_index], *self._worker_payloads(home_index)))
+
+        await asyncio.gather(*jobs)
+        return self.stats.summary(self._now(), p["rate"] if p["shape"] in ("constant", "poisson") else self._mean_offered_rate())
+
+    def _mean_offered_rate(self) -> float:
+        """Taxa média ofertada nas formas variáveis (integração numérica de rate_at)."""
+        p = self.profile
+        shape = ArrivalShape(p["shape"], p["rate"], burst_rate=p["burst_rate"], burst_every=p["burst_every"],
+                             burst_length=p["burst_length"], peak_rate=p["peak_rate"], period=p["period"])
+        steps = 1000
+        return sum(shape.rate_at(p["duration"] * (i + 0.5) / steps) for i in range(steps)) / steps
+
+    def run(self) -> dict:
+        return asyncio.run(self.run_async())
+
+
+def run_sweep(profile: dict) -> dict:
+    """
+    Roda um estágio por taxa de 'sweep' e aponta o ponto de saturação:
+    a primeira taxa em que o throughput alcançado (aceitas, ou concluídas se
+    houver workers virtuais) fica abaixo de 'saturation_ratio' * ofertado.
+    """
+    profile = {**DEFAULT_PROFILE, **profile}
+    stages = []
+    saturation_rate = None
+    for rate in profile["sweep"]:
+        result = LoadGenerator({**profile, "rate": rate}).run()
+        achieved = result["completed_rate"] if profile["workers"] else result["accepted_rate"]
+        result["achieved_rate"] = achieved
+        stages.append(result)
+        if saturation_rate is None and achieved < profile["saturation_ratio"] * result["offered_rate"]:
+            saturation_rate = rate
+    return {"profile": profile, "stages": stages, "saturation_rate": saturation_rate}
+
+
+def _parse_target(value: str) -> list:
+    host, _, port = value.rpartition(':')
+    return [host or "127.0.0.1", int(port)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerador de carga sintético (produtores e workers virtuais).")
+    parser.add_argument("--config", help="JSON com um perfil (chaves de DEFAULT_PROFILE).")
+    parser.add_argument("--target", action="append", type=_parse_target, help="host:porta (pode repetir).")
+    parser.add_argument("--duration", type=float)
+    parser.add_argument("--producers", type=int)
+    parser.add_argument("--shape", choices=["constant", "poisson", "burst", "diurnal"])
+    parser.add_argument("--rate", type=float, help="Tarefas/s ofertadas (base para burst/diurnal).")
+    parser.add_argument("--burst-rate", type=float)
+    parser.add_argument("--burst-every", type=float)
+    parser.add_argument("--burst-length", type=float)
+    parser.add_argument("--peak-rate", type=float)
+    parser.add_argument("--period", type=float)
+    parser.add_argument("--keys", choices=["uniform", "zipf"])
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--zipf-s", type=float)
+    parser.add_argument("--workers", type=int, help="Workers virtuais.")
+    parser.add_argument("--work-time", type=float)
+    parser.add_argument("--fetch-next", action="store_true", default=None)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--sweep", type=lambda s: [float(x) for x in s.split(',') if x],
+                        help="Lista de taxas (ex.: 100,200,400). Um estágio por taxa.")
+    parser.add_argument("--output", help="Grava o resultado em JSON neste arquivo.")
+    args = parser.parse_args()
+
+    profile = {}
+    if args.config:
+        with open(args.config, 'r') as f:
+            profile.update(json.load(f))
+    overrides = {
+        "targets": args.target, "duration": args.duration, "producers": args.producers,
+        "shape": args.shape, "rate": args.rate, "burst_rate": args.burst_rate,
+        "burst_every": args.burst_every, "burst_length": args.burst_length,
+        "peak_rate": args.peak_rate, "period": args.period, "keys": args.keys,
+        "users": args.users, "zipf_s": args.zipf_s, "workers": args.workers,
+        "work_time": args.work_time, "fetch_next": args.fetch_next, "seed": args.seed,
+        "sweep": args.sweep,
+    }
+    profile.update({k: v for k, v in overrides.items() if v is not None})
+
+    try:
+        if profile.get("sweep"):
+            result = run_sweep(profile)
+        else:
+            result = LoadGenerator(profile).run()
+    except KeyboardInterrupt:
+        sys.exit(1)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
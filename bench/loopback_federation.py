@@ -0,0 +1,121 @@
+# bench/loopback_federation.py
+"""
+Federação inteira (K servidores + N workers) em UM processo, sobre o
+LoopbackTransport: sem portas, sem sockets, o mesmo código de roteamento
+e de balanceamento dos processos reais.
+
+Carrega 'tasks' tarefas via SUBMIT (uma fração 'skew' só no servidor 0, para
+forçar empréstimo de workers), espera a federação esvaziar as filas e imprime
+um JSON com tempo, throughput e quantos workers terminaram fora de casa.
+
+Exemplo:
+  python -m bench.loopback_federation --servers 4 --workers 200 --tasks 20000 --skew 0.7
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import contextlib
+
+from logs.logger import logger
+from payload_models import task_submit
+from server.dist_server import Server
+from worker.dist_worker import Worker
+from transport import LoopbackTransport
+from .cluster_bench import bench_server_config, bench_worker_config
+
+
+def _submit(transport: LoopbackTransport, host: str, port: int, tasks: list) -> dict:
+    with transport.connect(host, port, timeout=30) as conn:
+        conn.sendall((json.dumps(task_submit(tasks)) + '\n').encode('utf-8'))
+        return json.loads(conn.makefile('r', encoding='utf-8').readline())
+
+
+def run_federation(servers: int, workers: int, tasks: int, skew: float = 0.0, work_time: float = 0.0,
+                   concurrency: int = 1, timeout: float = 300, base_port: int = 9001) -> dict:
+    transport = LoopbackTransport()
+
+    server_objs = [Server(config=bench_server_config(i, servers, base_port), transport=transport, file_logging=False)
+                   for i in range(servers)]
+    threads = [threading.Thread(target=s.start, name=f"Server-{s.id}", daemon=True) for s in server_objs]
+    for thread in threads:
+        thread.start()
+
+    worker_objs = []
+    for j in range(workers):
+        config = bench_worker_config(j, servers, base_port, work_time)
+        config["execution"]["concurrency"] = concurrency
+        config["polling"].update({"idle_base_delay": 0.05, "idle_max_delay": 0.5})
+        worker_objs.append(Worker(config=config, transport=transport, file_logging=False))
+    worker_threads = [threading.Thread(target=w.start, name=f"Worker-{w.worker_id}", daemon=True) for w in worker_objs]
+    for thread in worker_threads:
+        thread.start()
+
+    # Distribui a carga: 'skew' vai para o servidor 0, o resto em partes iguais
+    start = time.monotonic()
+    hot = int(tasks * skew)
+    shares = [hot + (tasks - hot) // servers if i == 0 else (tasks - hot) // servers for i in range(servers)]
+    for i, share in enumerate(shares):
+        batch = [{"TASK": "QUERY", "USER": f"user-{i}-{n}"} for n in range(share)]
+        _submit(transport, "127.0.0.1", base_port + i, batch)
+    submitted = sum(shares)
+
+    peak_borrowed = 0
+    while time.monotonic() - start < timeout:
+        completed = sum(w.tasks_completed for w in worker_objs)
+        borrowed = sum(1 for w in worker_objs if (w.current_master_host, w.current_master_port) != (w.home_host, w.home_port))
+        peak_borrowed = max(peak_borrowed, borrowed)
+        if completed >= submitted:
+            break
+        time.sleep(0.1)
+    elapsed = time.monotonic() - start
+
+    for w in worker_objs:
+        w.stop()
+    for thread in worker_threads:
+        thread.join(timeout=10)
+    for s in server_objs:
+        s.stop()
+
+    completed = sum(w.tasks_completed for w in worker_objs)
+    return {
+        "servers": servers,
+        "workers": workers,
+        "submitted": submitted,
+        "completed": completed,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(completed / elapsed, 2) if elapsed else 0,
+        "peak_borrowed": peak_borrowed,
+        "queues_left": {s.id: len(s.task_queue) for s in server_objs},
+        "timed_out": completed < submitted,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Federação inteira em um processo (transporte loopback).")
+    parser.add_argument("--servers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--skew", type=float, default=0.0, help="Fração da carga enviada só ao servidor 0.")
+    parser.add_argument("--work-time", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=1, help="Slots por worker.")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--log-level", default="ERROR")
+    parser.add_argument("--verbose", action="store_true", help="Mantém os print() dos payloads no stdout.")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+        result = run_federation(args.servers, args.workers, args.tasks, skew=args.skew, work_time=args.work_time,
+                                concurrency=args.concurrency, timeout=args.timeout)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,491 @@
+# bench/policy_sim.py
+"""
+Simulador de eventos discretos das políticas de balanceamento.
+
+Roda uma federação inteira (K servidores, N workers) sobre um relógio
+virtual, usando as MESMAS regras do servidor (server/dist_server/policy.py):
+  - load_action / select_workers_to_release  (_load_balancer_loop)
+  - share_decision / pick_worker_to_lend     (WORKER_REQUEST no connection_handler)
+  - release_retry_delay                      (_handle_release_with_backoff)
+
+O estado imita o do servidor real: worker_status nunca perde entradas,
+ordens de REDIRECT/RETURN ficam em fila até o worker aparecer, pending_returns
+é sobrescrito por lote. Assim o simulador mostra também os efeitos colaterais
+das regras atuais, não só os desejados.
+
+Simplificações:
+  - rede com atraso fixo ('net_delay') por mensagem;
+  - worker ocioso não fica em polling: espera na lista do servidor e é
+    acordado (após U(0, 'idle_poll') segundos) quando chega tarefa ou ordem;
+  - todo servidor enxerga todos os outros como peers ativos (sem heartbeat);
+  - em queda ('outage'), o worker troca de servidor após 'connect_timeout'
+    e volta para casa na primeira tarefa depois que ela volta.
+
+Saída por política: throughput, atraso na fila (p50/p99, LatencyHistogram)
+e contagem de migrações (REDIRECT, RETURN, pedidos, releases).
+
+Exemplo (2 horas de 50 servidores e 5000 workers):
+  python -m bench.policy_sim --servers 50 --workers 5000 --hours 2 --hot-servers 5 --skew 0.5 \\
+      --policy baseline --policy aggressive --policy '{"load_balancing": {"max_queue_threshold": 40}}'
+"""
+import os
+import json
+import math
+import heapq
+import random
+import argparse
+from collections import deque
+
+from histogram import LatencyHistogram
+from server.dist_server.policy import (load_balancing_params, load_action, select_workers_to_release,
+                                       share_decision, pick_worker_to_lend, release_retry_delay,
+                                       LOAD_REQUEST, LOAD_RELEASE, RELEASE_MAX_RETRIES)
+from server.dist_server.records import WorkerRecord, WorkerState
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Políticas prontas: sobrescrevem 'load_balancing' e 'timing' do config base
+PRESETS = {
+    "baseline": {},
+    "no_sharing": {"load_balancing": {"max_queue_threshold": 10 ** 9, "min_queue_threshold": 0}},
+    "conservative": {"load_balancing": {"min_queue_threshold": 10, "max_queue_threshold": 100,
+                                        "min_workers_before_sharing": 2},
+                     "timing": {"load_balancer_interval": 30}},
+    "aggressive": {"load_balancing": {"min_queue_threshold": 2, "max_queue_threshold": 10},
+                   "timing": {"load_balancer_interval": 5}},
+}
+
+DEFAULT_WORKLOAD = {
+    "servers": 4,
+    "workers": 200,
+    "duration": 3600,        # segundos virtuais
+    "utilization": 0.8,      # carga média / capacidade total (workers / work_time)
+    "work_time": 30.0,       # média (exponencial) do tempo de execução de uma tarefa
+    "hot_servers": 1,        # os primeiros 'hot_servers' recebem a fração 'skew' da carga
+    "skew": 0.0,
+    "diurnal_amplitude": 0.0,
+    "diurnal_period": 86400,
+    "net_delay": 0.001,
+    "idle_poll": 1.0,
+    "connect_timeout": 1.0,
+    "outage": None,          # [servidor, início, duração]
+    "seed": 1,
+}
+
+
+def base_config(path: str = None) -> dict:
+    """'timing' e 'load_balancing' de um config de servidor (padrão: server/config_s1.json)."""
+    with open(path or os.path.join(REPO_ROOT, "server", "config_s1.json"), 'r') as f:
+        config = json.load(f)
+    return {"timing": dict(config["timing"]), "load_balancing": dict(config["load_balancing"])}
+
+
+def resolve_policy(spec: str, base: dict) -> tuple:
+    """
+    'spec' é o nome de um preset, um caminho para JSON ou um JSON inline com
+    as seções 'load_balancing'/'timing' a sobrescrever. Retorna (nome, config).
+    """
+    if spec in PRESETS:
+        name, overrides = spec, PRESETS[spec]
+    elif os.path.isfile(spec):
+        name = os.path.splitext(os.path.basename(spec))[0]
+        with open(spec, 'r') as f:
+            overrides = json.load(f)
+    else:
+        try:
+            overrides = json.loads(spec)
+        except json.JSONDecodeError:
+            raise ValueError(f"Política desconhecida: {spec} (presets: {', '.join(PRESETS)})")
+        name = overrides.pop("name", spec)
+
+    config = {section: dict(values) for section, values in base.items()}
+    for section in ("load_balancing", "timing"):
+        config[section].update(overrides.get(section, {}))
+    return name, config
+
+
+class SimServer:
+    """Estado de um servidor, com os mesmos campos do Server real."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.id = f"SERVER_{index}"
+        self.task_queue = deque()        # instantes de chegada
+        self.worker_status = {}          # wid -> WorkerRecord (nunca perde entradas, como no real)
+        self.redirect_queue = {}         # wid -> deque de ordens (mesma ordem FIFO da lista real)
+        self.pending_returns = {}        # peer_id -> set de wids em trânsito
+        self.pending_release_attempts = set()
+        self.completions = deque()       # instantes de conclusão (janela do WORKER_REQUEST)
+        self.idle = {}                   # wid -> True (workers esperando trabalho aqui)
+        self.up = True
+        self.peak_queue = 0
+
+    def tasks_completed_in_window(self, now: float, window: float) -> int:
+        cutoff = now - window
+        while self.completions and self.completions[0] < cutoff:
+            self.completions.popleft()
+        return len(self.completions)
+
+
+class SimWorker:
+    __slots__ = ("id", "home", "master", "failed_over")
+
+    def __init__(self, index: int, home: int):
+        self.id = f"W_{index}"
+        self.home = home
+        self.master = home
+        self.failed_over = False
+
+
+class PolicySimulator:
+    """Uma execução: uma política sobre uma carga."""
+
+    def __init__(self, config: dict, workload: dict):
+        self.config = config
+        self.workload = {**DEFAULT_WORKLOAD, **workload}
+        w = self.workload
+
+        params = load_balancing_params(config)
+        self.min_queue = params['min_queue_threshold']
+        self.max_queue = params['max_queue_threshold']
+        self.min_workers = params['min_workers_before_sharing']
+        self.window = params['threshold_window']
+        self.min_tasks = params['threshold_min_tasks']
+        self.lb_interval = config['timing']['load_balancer_interval']
+
+        self.net = w["net_delay"]
+        self.work_time = w["work_time"]
+        self.idle_poll = w["idle_poll"]
+
+        # Fluxos aleatórios separados: a chegada de tarefas é igual entre políticas
+        self.arrival_rng = random.Random(w["seed"])
+        self.rng = random.Random(w["seed"] + 1)
+
+        self.servers = [SimServer(i) for i in range(w["servers"])]
+        self.workers = {}
+        for j in range(w["workers"]):
+            worker = SimWorker(j, home=j % w["servers"])
+            self.workers[worker.id] = worker
+
+        capacity = w["workers"] / self.work_time
+        self.base_rate = w["utilization"] * capacity
+        self.max_rate = self.base_rate * (1 + w["diurnal_amplitude"])
+        # 'skew' da carga vai para os 'hot_servers' primeiros; o resto é uniforme
+        hot = max(1, min(w["hot_servers"], w["servers"]))
+        weights = [(1 - w["skew"]) / w["servers"] + (w["skew"] / hot if i < hot else 0)
+                   for i in range(w["servers"])]
+        self.cum_weights = []
+        total = 0
+        for weight in weights:
+            total += weight
+            self.cum_weights.append(total)
+
+        self.now = 0.0
+        self._events = []
+        self._seq = 0
+        self.queue_delay = LatencyHistogram()
+        self.counters = {
+            "arrived": 0, "rejected": 0, "dispatched": 0, "completed": 0,
+            "worker_requests": 0, "requests_approved": 0, "redirects": 0, "returns": 0,
+            "release_commands": 0, "release_retries": 0, "release_give_ups": 0,
+            "failovers": 0,
+        }
+
+    # --- Relógio virtual ---
+
+    def _at(self, t: float, fn, *args):
+        self._seq += 1
+        heapq.heappush(self._events, (t, self._seq, fn, args))
+
+    def run(self) -> dict:
+        duration = self.workload["duration"]
+        self._at(self.arrival_rng.expovariate(self.max_rate), self._on_arrival)
+        for server in self.servers:
+            self._at(self.rng.uniform(0, self.lb_interval), self._on_lb_tick, server)
+        for worker in self.workers.values():
+            self._at(self.rng.uniform(0, self.idle_poll), self._on_alive, worker, worker.master)
+        outage = self.workload["outage"]
+        if outage:
+            index, start, length = outage
+            self._at(start, self._on_outage, self.servers[int(index)], False)
+            self._at(start + length, self._on_outage, self.servers[int(index)], True)
+
+        events = 0
+        while self._events and self._events[0][0] <= duration:
+            self.now, _, fn, args = heapq.heappop(self._events)
+            fn(*args)
+            events += 1
+        self.now = duration
+        return self.report(events)
+
+    # --- Carga ---
+
+    def _on_arrival(self):
+        # Poisson não homogêneo por thinning (ciclo diário opcional)
+        amplitude = self.workload["diurnal_amplitude"]
+        rate = self.base_rate * (1 + amplitude * math.sin(2 * math.pi * self.now / self.workload["diurnal_period"]))
+        if self.arrival_rng.random() * self.max_rate <= rate:
+            pick = self.arrival_rng.random() * self.cum_weights[-1]
+            index = 0
+            while self.cum_weights[index] < pick:
+                index += 1
+            server = self.servers[index]
+            self.counters["arrived"] += 1
+            if server.up:
+                server.task_queue.append(self.now)
+                server.peak_queue = max(server.peak_queue, len(server.task_queue))
+                self._wake_one(server)
+            else:
+                self.counters["rejected"] += 1
+        self._at(self.now + self.arrival_rng.expovariate(self.max_rate), self._on_arrival)
+
+    def _on_outage(self, server: SimServer, up: bool):
+        server.up = up
+        if not up:
+            # Quem esperava ali descobre na próxima conexão
+            for wid in list(server.idle):
+                self._wake(server, wid)
+
+    # --- Worker ---
+
+    def _wake(self, server: SimServer, wid: str):
+        del server.idle[wid]
+        self._at(self.now + self.rng.uniform(0, self.idle_poll), self._on_alive, self.workers[wid], server.index)
+
+    def _wake_one(self, server: SimServer):
+        for wid in server.idle:
+            self._wake(server, wid)
+            return
+
+    def _on_alive(self, worker: SimWorker, index: int):
+        """Worker pede trabalho ao servidor 'index' (rota ALIVE)."""
+        server = self.servers[index]
+        if not server.up:
+            self._fail_over(worker, index)
+            return
+
+        # Volta para casa assim que ela responder de novo
+        if worker.failed_over and index != worker.home and self.servers[worker.home].up:
+            worker.failed_over = False
+            worker.master = worker.home
+            self._at(self.now + self.net, self._on_alive, worker, worker.home)
+            return
+
+        # Registro (a entrada antiga é mantida, como no _handle_connection)
+        status = server.worker_status.get(worker.id)
+        if status is None:
+            status = server.worker_status[worker.id] = WorkerRecord(addr=None, last_seen=self.now)
+        if index != worker.home:
+            status.owner_id = self.servers[worker.home].id
+
+        # Lote de retorno pendente
+        for peer_id, pending in server.pending_returns.items():
+            if worker.id in pending:
+                pending.discard(worker.id)
+                status.state = WorkerState.ACTIVE
+                if not pending:
+                    del server.pending_returns[peer_id]
+                break
+
+        # Ordem pendente -> REDIRECT/RETURN; senão tarefa; senão NO_TASK
+        orders = server.redirect_queue.get(worker.id)
+        if orders:
+            order = orders.popleft()
+            if not orders:
+                del server.redirect_queue[worker.id]
+            if order['TASK'] == 'RETURN':
+                self.counters["returns"] += 1
+            else:
+                self.counters["redirects"] += 1
+            worker.master = order['target']
+            self._at(self.now + 2 * self.net, self._on_alive, worker, worker.master)
+            return
+
+        if server.task_queue:
+            arrived_at = server.task_queue.popleft()
+            self.queue_delay.record(self.now - arrived_at)
+            self.counters["dispatched"] += 1
+            service = self.rng.expovariate(1 / self.work_time) if self.work_time else 0
+            self._at(self.now + self.net + service, self._on_done, worker, index)
+            return
+
+        server.idle[worker.id] = True
+
+    def _on_done(self, worker: SimWorker, index: int):
+        """STATUS da tarefa e novo ALIVE para o mestre atual."""
+        server = self.servers[index]
+        self.counters["completed"] += 1
+        if server.up:
+            server.completions.append(self.now)
+        self._at(self.now + 2 * self.net, self._on_alive, worker, worker.master)
+
+    def _fail_over(self, worker: SimWorker, failed: int):
+        self.counters["failovers"] += 1
+        if failed != worker.home and self.servers[worker.home].up:
+            target = worker.home
+        else:
+            alive = [s.index for s in self.servers if s.up and s.index != failed]
+            if not alive:
+                self._at(self.now + self.workload["connect_timeout"], self._on_alive, worker, failed)
+                return
+            target = self.rng.choice(alive)
+            worker.failed_over = target != worker.home
+        worker.master = target
+        self._at(self.now + self.workload["connect_timeout"], self._on_alive, worker, target)
+
+    # --- Servidor: balanceamento ---
+
+    def _add_order(self, server: SimServer, wid: str, target: int, kind: str):
+        server.redirect_queue.setdefault(wid, deque()).append({'target': target, 'TASK': kind})
+        if wid in server.idle:
+            self._wake(server, wid)
+
+    def _on_lb_tick(self, server: SimServer):
+        self._at(self.now + self.lb_interval, self._on_lb_tick, server)
+        if not server.up:
+            return
+
+        action = load_action(len(server.task_queue), self.min_queue, self.max_queue)
+        if action == LOAD_REQUEST:
+            for peer in self.servers:
+                if peer is not server and peer.up:
+                    self.counters["worker_requests"] += 1
+                    self._at(self.now + self.net, self._on_worker_request, peer, server.index)
+
+        elif action == LOAD_RELEASE:
+            by_owner = select_workers_to_release(server.worker_status, self.min_workers)
+            for owner_id, worker_list in by_owner.items():
+                if owner_id in server.pending_release_attempts:
+                    continue
+                server.pending_release_attempts.add(owner_id)
+                owner = int(owner_id.rsplit("_", 1)[1])
+                self._at(self.now + self.net, self._on_command_release, server, owner, worker_list, 1)
+
+    def _on_worker_request(self, peer: SimServer, requester: int):
+        """WORKER_REQUEST chegando ao peer: aprova e agenda um REDIRECT."""
+        if not peer.up:
+            return
+        can_share, _ = share_decision(len(peer.worker_status), peer.tasks_completed_in_window(self.now, self.window),
+                                      self.min_workers, self.min_tasks)
+        if not can_share:
+            return
+        wid = pick_worker_to_lend(peer.worker_status)
+        if wid:
+            self.counters["requests_approved"] += 1
+            self._add_order(peer, wid, requester, 'REDIRECT')
+
+    def _on_command_release(self, server: SimServer, owner: int, worker_list: list, attempt: int):
+        """COMMAND_RELEASE do emprestador ao dono, com o backoff do _handle_release_with_backoff."""
+        self.counters["release_commands"] += 1
+        owner_server = self.servers[owner]
+        owner_id = owner_server.id
+
+        if not owner_server.up:
+            if attempt < RELEASE_MAX_RETRIES:
+                self.counters["release_retries"] += 1
+                self._at(self.now + release_retry_delay(attempt), self._on_command_release,
+                         server, owner, worker_list, attempt + 1)
+            else:
+                self.counters["release_give_ups"] += 1
+                server.pending_release_attempts.discard(owner_id)
+            return
+
+        # Dono registra o lote e responde RELEASE_ACK
+        owner_server.pending_returns[server.id] = {w['id'] for w in worker_list}
+        self._at(self.now + self.net, self._on_release_ack, server, owner, worker_list)
+
+    def _on_release_ack(self, server: SimServer, owner: int, worker_list: list):
+        for worker_info in worker_list:
+            wid = worker_info['id']
+            if wid in server.worker_status:
+                server.worker_status[wid].release_notified = True
+                self._add_order(server, wid, owner, 'RETURN')
+        server.pending_release_attempts.discard(self.servers[owner].id)
+
+    # --- Relatório ---
+
+    def report(self, events: int) -> dict:
+        duration = self.workload["duration"]
+        counters = dict(self.counters)
+        borrowed = sum(1 for w in self.workers.values() if w.master != w.home)
+        return {
+            "throughput": round(counters["completed"] / duration, 3) if duration else 0,
+            "offered_rate": round(counters["arrived"] / duration, 3) if duration else 0,
+            "queue_delay": self.queue_delay.summary(),
+            "migrations": {
+                "redirects": counters["redirects"],
+                "returns": counters["returns"],
+                "worker_requests": counters["worker_requests"],
+                "requests_approved": counters["requests_approved"],
+                "release_commands": counters["release_commands"],
+                "release_retries": counters["release_retries"],
+                "release_give_ups": counters["release_give_ups"],
+                "failovers": counters["failovers"],
+            },
+            "end_state": {
+                "queued": sum(len(s.task_queue) for s in self.servers),
+                "peak_queue": max(s.peak_queue for s in self.servers),
+                "borrowed_workers": borrowed,
+                "orders_pending": sum(len(q) for s in self.servers for q in s.redirect_queue.values()),
+            },
+            "counters": counters,
+            "events": events,
+        }
+
+
+def simulate(policies: list, workload: dict, base: dict = None) -> dict:
+    """Roda a mesma carga para cada política. Retorna {nome: relatório}."""
+    base = base or base_config()
+    results = {}
+    for spec in policies:
+        name, config = resolve_policy(spec, base)
+        results[name] = PolicySimulator(config, workload).run()
+    return results
+
+
+def _format_table(results: dict) -> str:
+    header = f"{'policy':<20} {'tput/s':>9} {'p50 s':>9} {'p99 s':>9} {'redir':>7} {'return':>7} {'queued':>8}"
+    lines = [header, "-" * len(header)]
+    for name, r in results.items():
+        delay, mig = r["queue_delay"], r["migrations"]
+        lines.append(f"{name[:20]:<20} {r['throughput']:>9.2f} {delay['p50_ms'] / 1000:>9.2f} {delay['p99_ms'] / 1000:>9.2f} "
+                     f"{mig['redirects']:>7} {mig['returns']:>7} {r['end_state']['queued']:>8}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulador de eventos discretos das políticas de balanceamento.")
+    parser.add_argument("--policy", action="append", help="Preset, arquivo JSON ou JSON inline (repetível).")
+    parser.add_argument("--base-config", help="Config de servidor de onde vêm 'timing' e 'load_balancing'.")
+    parser.add_argument("--servers", type=int, default=DEFAULT_WORKLOAD["servers"])
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKLOAD["workers"])
+    parser.add_argument("--hours", type=float, default=DEFAULT_WORKLOAD["duration"] / 3600)
+    parser.add_argument("--utilization", type=float, default=DEFAULT_WORKLOAD["utilization"])
+    parser.add_argument("--work-time", type=float, default=DEFAULT_WORKLOAD["work_time"])
+    parser.add_argument("--hot-servers", type=int, default=DEFAULT_WORKLOAD["hot_servers"])
+    parser.add_argument("--skew", type=float, default=DEFAULT_WORKLOAD["skew"], help="Fração da carga nos 'hot servers'.")
+    parser.add_argument("--diurnal-amplitude", type=float, default=DEFAULT_WORKLOAD["diurnal_amplitude"])
+    parser.add_argument("--diurnal-period", type=float, default=DEFAULT_WORKLOAD["diurnal_period"])
+    parser.add_argument("--net-delay", type=float, default=DEFAULT_WORKLOAD["net_delay"])
+    parser.add_argument("--idle-poll", type=float, default=DEFAULT_WORKLOAD["idle_poll"])
+    parser.add_argument("--outage", help="Queda de um servidor: 'indice:inicio:duracao' (segundos).")
+    parser.add_argument("--seed", type=int, default=DEFAULT_WORKLOAD["seed"])
+    parser.add_argument("--json", action="store_true", help="Imprime o relatório completo em JSON.")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    workload = {
+        "servers": args.servers, "workers": args.workers, "duration": args.hours * 3600,
+        "utilization": args.utilization, "work_time": args.work_time,
+        "hot_servers": args.hot_servers, "skew": args.skew,
+        "diurnal_amplitude": args.diurnal_amplitude, "diurnal_period": args.diurnal_period,
+        "net_delay": args.net_delay, "idle_poll": args.idle_poll, "seed": args.seed,
+        "outage": [float(x) for x in args.outage.split(":")] if args.outage else None,
+    }
+    results = simulate(args.policy or ["baseline"], workload, base_config(args.base_config))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text if args.json else _format_table(results))
@@ -0,0 +1,102 @@
+# histogram.py
+"""
+Histograma de latência com memória fixa (estilo HDR, log-linear).
+Usado pelo load generator, pelos benchmarks e pelas métricas do servidor.
+"""
+from typing import Dict
+
+
+class LatencyHistogram:
+    """
+    Guarda latências (em segundos) em buckets log-lineares de microssegundos.
+    - Valores até 2^(sub_bucket_bits+1) us são exatos.
+    - Acima disso, cada potência de 2 é dividida em 2^sub_bucket_bits buckets,
+      então o erro relativo fica abaixo de 1 / 2^sub_bucket_bits (~3% com 5 bits).
+    - Memória fixa: ~1.2k contadores para valores até ~12 dias.
+    Não é thread-safe: quem compartilha o histograma deve usar seu próprio lock.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 5, max_exponent: int = 40):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.linear_limit = 1 << (sub_bucket_bits + 1)
+        self.max_value_us = (1 << max_exponent) - 1
+        self.counts = [0] * self._index(self.max_value_us) + [0]
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def _index(self, value_us: int) -> int:
+        if value_us < self.linear_limit:
+            return value_us
+        exponent = value_us.bit_length() - (self.sub_bucket_bits + 1)
+        mantissa = value_us >> exponent
+        return self.linear_limit + (exponent - 1) * self.sub_bucket_count + (mantissa - self.sub_bucket_count)
+
+    def _bucket_value(self, index: int) -> int:
+        """Valor representativo (meio do bucket) em microssegundos."""
+        if index < self.linear_limit:
+            return index
+        offset = index - self.linear_limit
+        exponent = offset // self.sub_bucket_count + 1
+        mantissa = offset % self.sub_bucket_count + self.sub_bucket_count
+        low = mantissa << exponent
+        high = ((mantissa + 1) << exponent) - 1
+        return (low + high) // 2
+
+    def record(self, seconds: float, count: int = 1):
+        value_us = min(max(int(seconds * 1_000_000), 0), self.max_value_us)
+        self.counts[self._index(value_us)] += count
+        self.count += count
+        self.total_us += value_us * count
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other: "LatencyHistogram"):
+        """Soma outro histograma (mesma configuração) neste."""
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, p: float) -> float:
+        """Latência (s) no percentil 'p' (0-100)."""
+        if self.count == 0:
+            return 0.0
+        target = max(1, int(round(self.count * p / 100.0)))
+        seen = 0
+        for index, c in enumerate(self.counts):
+            if c:
+                seen += c
+                if seen >= target:
+                    value_us = min(max(self._bucket_value(index), self.min_us), self.max_us)
+                    return value_us / 1_000_000
+        return self.max_us / 1_000_000
+
+    def mean(self) -> float:
+        return (self.total_us / self.count) / 1_000_000 if self.count else 0.0
+
+    def summary(self) -> Dict:
+        """Resumo em milissegundos, pronto para JSON."""
+        return {
+            "count": self.count,
+            "min_ms": round((self.min_us or 0) / 1000, 3),
+            "mean_ms": round(self.mean() * 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p90_ms": round(self.percentile(90) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "p999_ms": round(self.percentile(99.9) * 1000, 3),
+            "max_ms": round(self.max_us / 1000, 3),
+        }
@@ -0,0 +1,178 @@
+# logs/analyze_events.py
+"""
+Analisador offline do log estruturado de eventos (logs/events.py).
+
+Lê os arquivos em stream, linha a linha (inclusive .gz), e mantém só
+agregados de tamanho fixo ou proporcional ao número de entidades:
+  - histograma de latência por rota (LatencyHistogram, campo 'd');
+  - throughput por worker (DISPATCH no servidor ou EXEC no worker);
+  - linha do tempo de migrações: REDIRECT/RETURN por intervalo de
+    '--bucket' segundos, migrações por worker e as últimas N ordens.
+Logs de vários GB cabem em memória limitada: nada é guardado por evento.
+
+Exemplo:
+  python -m logs.analyze_events logs/ --bucket 60 --top 10
+  python -m logs.analyze_events "logs/SERVER_*_events.jsonl.*" --output analise.json
+"""
+import os
+import sys
+import glob
+import gzip
+import json
+import argparse
+from collections import deque
+
+from histogram import LatencyHistogram
+
+TASK_ROUTES = ("DISPATCH", "EXEC")
+MIGRATION_ROUTES = ("REDIRECT", "RETURN")
+
+
+def expand_paths(paths: list) -> list:
+    """Arquivos, diretórios (todos os '*_events.jsonl*') e globs, sem repetição e em ordem."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(glob.glob(os.path.join(path, "*_events.jsonl*")))
+        elif any(c in path for c in "*?["):
+            found.extend(glob.glob(path))
+        else:
+            found.append(path)
+    return sorted(set(found))
+
+
+def iter_events(paths: list):
+    """Gera os eventos (dicts) de todos os arquivos; linhas inválidas ou que não são objetos são ignoradas."""
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(event, dict):
+                    yield event
+
+
+class EventAnalyzer:
+
+    def __init__(self, bucket: float = 60, keep_migrations: int = 100):
+        self.bucket = bucket
+        self.events = 0
+        self.first_t = None
+        self.last_t = None
+        self.by_source = {}
+        self.routes = {}           # rota -> LatencyHistogram
+        self.route_counts = {}
+        self.workers = {}          # worker -> [DISPATCH, EXEC, primeiro t, último t, tempo de execução]
+        self.worker_moves = {}     # worker -> migrações
+        self.timeline = {}         # início do intervalo -> {"REDIRECT": n, "RETURN": n}
+        self.recent_migrations = deque(maxlen=keep_migrations)
+
+    def add(self, event: dict):
+        route = event.get("r")
+        t = event.get("t")
+        if route is None or t is None:
+            return
+        self.events += 1
+        self.first_t = t if self.first_t is None else min(self.first_t, t)
+        self.last_t = t if self.last_t is None else max(self.last_t, t)
+        source = event.get("p")
+        self.by_source[source] = self.by_source.get(source, 0) + 1
+        self.route_counts[route] = self.route_counts.get(route, 0) + 1
+
+        duration = event.get("d")
+        if duration is not None:
+            hist = self.routes.get(route)
+            if hist is None:
+                hist = self.routes[route] = LatencyHistogram()
+            hist.record(duration)
+
+        entity = event.get("e")
+        if route in TASK_ROUTES and entity:
+            stats = self.workers.get(entity)
+            if stats is None:
+                stats = self.workers[entity] = [0, 0, t, t, 0.0]
+            stats[0 if route == "DISPATCH" else 1] += 1
+            stats[2] = min(stats[2], t)
+            stats[3] = max(stats[3], t)
+            if route == "EXEC" and duration is not None:
+                stats[4] += duration
+
+        elif route in MIGRATION_ROUTES:
+            start = int(t // self.bucket * self.bucket)
+            slot = self.timeline.get(start)
+            if slot is None:
+                slot = self.timeline[start] = {"REDIRECT": 0, "RETURN": 0}
+            slot[route] += 1
+            if entity:
+                self.worker_moves[entity] = self.worker_moves.get(entity, 0) + 1
+            self.recent_migrations.append({"t": t, "kind": route, "worker": entity, "from": source, "to": event.get("to")})
+
+    def report(self, top: int = 10) -> dict:
+        span = (self.last_t - self.first_t) if self.events else 0
+        per_worker = []
+        for worker, (dispatched, executed, first, last, exec_time) in self.workers.items():
+            # Log do próprio worker (EXEC) quando houver; senão o que o servidor despachou
+            tasks = executed or dispatched
+            active = last - first
+            per_worker.append({
+                "worker": worker,
+                "tasks": tasks,
+                "tasks_per_s": round(tasks / active, 3) if active > 0 else None,
+                "exec_time_s": round(exec_time, 3),
+                "migrations": self.worker_moves.get(worker, 0),
+            })
+        per_worker.sort(key=lambda w: w["tasks"], reverse=True)
+
+        counts = sorted(w["tasks"] for w in per_worker)
+        return {
+            "events": self.events,
+            "span_s": round(span, 3),
+            "sources": len(self.by_source),
+            "by_source_top": dict(sorted(self.by_source.items(), key=lambda kv: kv[1], reverse=True)[:top]),
+            "routes": {route: {"events": self.route_counts[route], **(self.routes[route].summary() if route in self.routes else {})}
+                       for route in sorted(self.route_counts)},
+            "workers": {
+                "count": len(per_worker),
+                "tasks_min": counts[0] if counts else 0,
+                "tasks_median": counts[len(counts) // 2] if counts else 0,
+                "tasks_max": counts[-1] if counts else 0,
+                "top": per_worker[:top],
+            },
+            "migrations": {
+                "total": sum(self.worker_moves.values()),
+                "bucket_s": self.bucket,
+                "timeline": [{"start": start, **self.timeline[start]} for start in sorted(self.timeline)],
+                "recent": list(self.recent_migrations),
+            },
+        }
+
+
+def analyze(paths: list, bucket: float = 60, top: int = 10, keep_migrations: int = 100) -> dict:
+    analyzer = EventAnalyzer(bucket=bucket, keep_migrations=keep_migrations)
+    files = expand_paths(paths)
+    for event in iter_events(files):
+        analyzer.add(event)
+    result = analyzer.report(top=top)
+    result["files"] = len(files)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analisa os logs estruturados de eventos (logs/events.py).")
+    parser.add_argument("paths", nargs="+", help="Arquivos, diretórios ou globs.")
+    parser.add_argument("--bucket", type=float, default=60, help="Intervalo (s) da linha do tempo de migrações.")
+    parser.add_argument("--top", type=int, default=10, help="Workers listados no relatório.")
+    parser.add_argument("--keep-migrations", type=int, default=100, help="Últimas ordens de migração listadas.")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    result = analyze(args.paths, bucket=args.bucket, top=args.top, keep_migrations=args.keep_migrations)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text + "\n")
@@ -0,0 +1,170 @@
+# logs/events.py
+"""
+Log estruturado de eventos (JSON lines compacto), para análise offline.
+
+Diferente dos logs de texto (logger.py), cada linha é um evento por mensagem,
+pronto para o analisador (python -m logs.analyze_events), sem regex:
+
+  {"t":1718000000.123456,"m":5321.000123,"p":"SERVER_1","r":"ALIVE","e":"WORKER_ab12cd","d":0.000412}
+
+  t  hora de parede (alinha processos diferentes na linha do tempo)
+  m  relógio monotônico do processo (ordem e intervalos dentro do processo)
+  p  processo/servidor que registrou
+  r  rota ou tipo do evento (ALIVE, STATUS, SUBMIT, DISPATCH, REDIRECT, RETURN, EXEC, W.ALIVE...)
+  e  entidade (worker, peer ou produtor)
+  d  duração em segundos (quando houver)
+  +  campos extras curtos: task, to, st...
+
+Desligado por padrão. Quando ligado (seção 'events' do config), record() só
+coloca a tupla em um deque limitado; a thread escritora serializa e grava em
+lote a cada 'flush_interval' segundos. Os arquivos rodam em segmentos
+'<path>.000001', '<path>.000002'... de até 'max_bytes'.
+Se o escritor atrasar, os eventos mais antigos do buffer são descartados
+(contados em 'dropped'): o caminho quente nunca espera pelo disco.
+
+Nos call sites, teste 'events.enabled' antes de montar os argumentos:
+  if events.enabled:
+      events.record("DISPATCH", worker_id, source=self.id, task=task_id)
+"""
+import os
+import glob
+import json
+import time
+import threading
+from collections import deque
+from logs.logger import logger
+
+
+class EventLog:
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.dropped = 0
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._writer = None
+        self._file = None
+        self._closed = False
+
+    def open(self, path: str, flush_interval: float = 0.5, max_bytes: int = 256 * 1024 * 1024,
+             max_pending: int = 100000):
+        """Liga o registro em 'path'. Chamadas seguintes são ignoradas (um log por processo)."""
+        with self._cond:
+            if self.enabled:
+                return
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.path = path
+            self.flush_interval = flush_interval
+            self.max_bytes = max_bytes
+            self._pending = deque(maxlen=max(1, max_pending))
+            self._segment = self._last_segment() + 1
+            self._file = open(self._segment_path(self._segment), 'ab')
+            self._closed = False
+            self.enabled = True
+            self._writer = threading.Thread(target=self._writer_loop, name="EventLogWriter", daemon=True)
+            self._writer.start()
+        logger.info(f"[EVENTS] Log estruturado de eventos em {self.path}.*")
+
+    # --- Segmentos ---
+
+    def _segment_path(self, segment: int) -> str:
+        return f"{self.path}.{segment:06d}"
+
+    def _last_segment(self) -> int:
+        segments = [int(p.rsplit('.', 1)[-1]) for p in glob.glob(f"{glob.escape(self.path)}.[0-9]*")
+                    if p.rsplit('.', 1)[-1].isdigit()]
+        return max(segments) if segments else 0
+
+    # --- Escrita ---
+
+    def record(self, route: str, entity: str = None, source: str = None, duration: float = None, **fields):
+        """Registra um evento (não bloqueia)."""
+        if not self.enabled:
+            return
+        pending = self._pending
+        if len(pending) == pending.maxlen:
+            self.dropped += 1
+        pending.append((time.time(), time.monotonic(), source, route, entity, duration, fields))
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                if not self._closed:
+                    self._cond.wait(timeout=self.flush_interval)
+                closing = self._closed
+
+            batch = []
+            pending = self._pending
+            while pending:
+                try:
+                    batch.append(pending.popleft())
+                except IndexError:
+                    break
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    logger.error(f"[EVENTS] Erro ao gravar lote de {len(batch)} eventos: {e}")
+
+            if closing:
+                return
+
+    def _write_batch(self, batch: list):
+        dumps = json.JSONEncoder(separators=(',', ':')).encode
+        lines = []
+        for wall, mono, source, route, entity, duration, fields in batch:
+            event = {"t": round(wall, 6), "m": round(mono, 6), "p": source, "r": route}
+            if entity is not None:
+                event["e"] = entity
+            if duration is not None:
+                event["d"] = round(duration, 6)
+            if fields:
+                event.update(fields)
+            lines.append(dumps(event))
+        lines.append('')
+        self._file.write('\n'.join(lines).encode('utf-8'))
+        self._file.flush()
+
+        if self._file.tell() >= self.max_bytes:
+            self._file.close()
+            self._segment += 1
+            self._file = open(self._segment_path(self._segment), 'ab')
+
+    def close(self):
+        """Grava o que falta e desliga o registro."""
+        with self._cond:
+            if not self.enabled:
+                return
+            self.enabled = False
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join(timeout=10)
+        try:
+            self._file.close()
+        except Exception:
+            pass
+        if self.dropped:
+            logger.warning(f"[EVENTS] {self.dropped} eventos descartados (escritor atrasado).")
+
+
+# Log de eventos do processo (desligado até configure_event_log)
+events = EventLog()
+
+
+def configure_event_log(config: dict, process_id: str):
+    """
+    Aplica a seção 'events' do config:
+      {"enabled": true, "path": "logs/{id}_events.jsonl", "flush_interval": 0.5,
+       "max_bytes": 268435456, "max_pending": 100000}
+    """
+    config = config or {}
+    if not config.get("enabled", False):
+        return
+    safe_id = "".join(c for c in process_id if c.isalnum() or c in ('_', '-')) or "unknown_process"
+    events.open(config.get("path", "logs/{id}_events.jsonl").format(id=safe_id),
+                flush_interval=config.get("flush_interval", 0.5),
+                max_bytes=config.get("max_bytes", 256 * 1024 * 1024),
+                max_pending=config.get("max_pending", 100000))
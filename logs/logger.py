@@ -1,4 +1,6 @@
 import sys
+import time
+import threading
 from loguru import logger
 
 # 1. Remove o handler padrão
@@ -54,5 +56,157 @@ def setup_file_logging(process_id: str):
     
     logger.success(f"Logs de arquivo configurados. Saída em: {log_path_base}_*.log")
 
+
+# --- LOG DO CAMINHO QUENTE (por rota) ---
+#
+# ALIVE, despacho, NO_TASK e STATUS acontecem milhares de vezes por segundo.
+# Cada call site usa log_route("ROTA", "INFO", "mensagem {}", arg) e a política
+# da rota decide se a linha sai:
+#   all      toda linha (padrão para rotas não listadas)
+#   sample   1 a cada 'sample_every'
+#   rate     token bucket: 'rate' linhas/s com rajada de 'burst'
+#   summary  nenhuma linha por evento, só o resumo periódico
+#   off      nada (nem resumo)
+# Rotas que não são 'all' geram, a cada 'summary_interval' segundos, uma linha
+# "[SUMMARY] N <label> nos últimos 10.0 s". WARNING ou acima sempre sai.
+# A mensagem usa placeholders do loguru ({}): só é formatada se for emitida.
+#
+# Config (seção 'logging' do server/worker):
+#   {"summary_interval": 10,
+#    "routes": {"DISPATCH": {"mode": "summary"}, "STATUS": {"mode": "rate", "rate": 5, "burst": 20}}}
+# "WORKER.CONNECT" usa a política de "WORKER.CONNECT", senão a de "WORKER".
+
+ROUTE_MODES = ("all", "sample", "rate", "summary", "off")
+ALWAYS_LOGGED = {"WARNING", "ERROR", "CRITICAL"}
+
+DEFAULT_ROUTES = {
+    "DISPATCH": {"mode": "summary", "label": "tarefas despachadas"},
+    "NO_TASK": {"mode": "summary", "label": "respostas NO_TASK"},
+    "STATUS": {"mode": "summary", "label": "status de tarefa"},
+    "WORKER": {"mode": "summary", "label": "conexões de worker"},
+    "FETCH": {"mode": "summary", "label": "pedidos de tarefa"},
+    "TASK": {"mode": "summary", "label": "tarefas executadas"},
+}
+
+
+class _RouteState:
+    """Política e contadores de uma rota."""
+
+    def __init__(self, route: str, policy: dict, now: float):
+        self.route = route
+        self.mode = policy.get("mode", "all")
+        if self.mode not in ROUTE_MODES:
+            raise ValueError(f"Modo de log desconhecido para '{route}': {self.mode}")
+        self.label = policy.get("label", f"eventos {route}")
+        self.sample_every = max(1, int(policy.get("sample_every", 100)))
+        self.rate = float(policy.get("rate", 10))
+        self.burst = float(policy.get("burst", max(1.0, self.rate)))
+        self.tokens = self.burst
+        self.last_refill = now
+        self.lock = threading.Lock()
+        self.total = 0
+        self.window_count = 0
+        self.window_emitted = 0
+
+    def admit(self, now: float) -> bool:
+        """Conta o evento e decide se a linha sai."""
+        with self.lock:
+            self.total += 1
+            self.window_count += 1
+            if self.mode == "all":
+                emit = True
+            elif self.mode == "sample":
+                emit = (self.total - 1) % self.sample_every == 0
+            elif self.mode == "rate":
+                self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                emit = self.tokens >= 1
+                if emit:
+                    self.tokens -= 1
+            else:
+                emit = False
+            if emit:
+                self.window_emitted += 1
+            return emit
+
+    def take_window(self) -> tuple:
+        with self.lock:
+            counts = (self.window_count, self.window_emitted)
+            self.window_count = self.window_emitted = 0
+            return counts
+
+
+class RouteLogger:
+    """Amostragem, rate limit e resumos periódicos por rota sobre o logger do loguru."""
+
+    def __init__(self, config: dict = None, clock=time.monotonic, sink=None):
+        self._clock = clock
+        self._sink = sink or logger
+        self._lock = threading.Lock()
+        self.configure(config)
+
+    def configure(self, config: dict = None):
+        """Aplica a seção 'logging' do config (None: só os padrões)."""
+        config = config or {}
+        with self._lock:
+            self.summary_interval = float(config.get("summary_interval", 10))
+            self.policies = {route: dict(policy) for route, policy in DEFAULT_ROUTES.items()}
+            for route, policy in config.get("routes", {}).items():
+                self.policies[route] = {**self.policies.get(route, {}), **policy}
+            self._states = {}
+            self._window_start = self._clock()
+
+    def _state(self, route: str) -> _RouteState:
+        state = self._states.get(route)
+        if state is None:
+            with self._lock:
+                state = self._states.get(route)
+                if state is None:
+                    policy = self.policies.get(route) or self.policies.get(route.split(".", 1)[0]) or {}
+                    state = self._states[route] = _RouteState(route, policy, self._clock())
+        return state
+
+    def log(self, route: str, level: str, message: str, *args, **kwargs) -> bool:
+        """Registra um evento da rota; retorna True se a linha foi emitida."""
+        now = self._clock()
+        emit = self._state(route).admit(now) or level in ALWAYS_LOGGED
+        if emit:
+            self._sink.opt(depth=1).log(level, message, *args, **kwargs)
+        if now - self._window_start >= self.summary_interval:
+            self.flush(now)
+        return emit
+
+    def flush(self, now: float = None):
+        """Emite os resumos da janela atual (também chamado ao parar o processo)."""
+        now = self._clock() if now is None else now
+        with self._lock:
+            elapsed = now - self._window_start
+            self._window_start = now
+            states = list(self._states.values())
+        for state in states:
+            if state.mode in ("all", "off"):
+                continue
+            count, emitted = state.take_window()
+            if count:
+                rate = count / elapsed if elapsed > 0 else 0.0
+                self._sink.info(f"[SUMMARY] {count} {state.label} nos últimos {elapsed:.1f} s "
+                                f"({rate:.1f}/s, {count - emitted} linhas omitidas)")
+
+    def totals(self) -> dict:
+        """Eventos por rota desde o configure()."""
+        return {route: state.total for route, state in self._states.items()}
+
+
+route_logger = RouteLogger()
+
+
+def configure_route_logging(config: dict = None):
+    """Aplica a seção 'logging' do config ao logger de rotas do processo."""
+    route_logger.configure(config)
+
+
+# Atalho para os call sites: log_route("DISPATCH", "INFO", "Enviando tarefa para {}.", worker_id)
+log_route = route_logger.log
+
 # Não exportamos mais um logger com filtros de módulo,
 # pois agora filtramos por arquivos separados.
\ No newline at end of file
@@ -3,6 +3,7 @@
 Centraliza a criação de todos os payloads (contratos)
 usados na comunicação entre Servidor e Worker.
 """
+import time
 import uuid
 from datetime import datetime, UTC
 
@@ -23,13 +24,40 @@ def get_task(worker_id: str, owner_id: tuple = None) -> dict:
     return payload
 
 # PADRÃO PAYLOAD OK
-def task_status(worker_id: str, status: str, task: str) -> dict:
-    """Payload que o Worker envia para REPORTAR o status de uma tarefa."""
+def task_status(worker_id: str, status: str, task: str, fetch_next: bool = False, task_id: str = None,
+                exec_time: float = None) -> dict:
+    """
+    Payload que o Worker envia para REPORTAR o status de uma tarefa.
+    - Se 'fetch_next' for True, o Worker também pede a próxima tarefa
+      ("report and fetch"); ela volta no campo NEXT do ACK.
+    - 'task_id' ecoa o TASK_ID recebido, para o servidor fechar a tarefa certa.
+    - 'exec_time' é o tempo de execução (s) medido no worker.
+    """
     payload = {
         "STATUS": status, # "OK" ou "NOK"
         "TASK": task,
         "WORKER_UUID": worker_id,
     }
+    if task_id:
+        payload["TASK_ID"] = task_id
+    if exec_time is not None:
+        payload["EXEC_TIME"] = round(exec_time, 6)
+    if fetch_next:
+        payload["FETCH_NEXT"] = True
+
+    print(payload)
+    return payload
+
+def task_handback(worker_id: str, tasks: list) -> dict:
+    """
+    Payload que o Worker envia para DEVOLVER tarefas pré-buscadas
+    que não vai executar (REDIRECT, RETURN, TTL expirado ou shutdown).
+    """
+    payload = {
+        "STATUS": "HANDBACK",
+        "WORKER_UUID": worker_id,
+        "TASKS": tasks # Lista de payloads de tarefa, na ordem em que foram recebidos
+    }
 
     print(payload)
     return payload
@@ -41,15 +69,34 @@ def new_task_payload(user: str, task_type: str = "QUERY") -> dict:
     """
     Este é o payload da TAREFA EM SI. 
     É o que é colocado na fila e depois enviado ao Worker.
+    Sai com TASK_ID e ENQUEUED_AT (epoch, s) para medir espera e tempo total.
     """
     payload = {
         "TASK": task_type, # Identifica que este JSON é uma tarefa
         "USER": user,
+        "TASK_ID": uuid.uuid4().hex,
+        "ENQUEUED_AT": time.time(),
     }
 
     print(payload)
     return payload
 
+def task_submit(tasks: list, stream: bool = False) -> dict:
+    """
+    Payload que um PRODUTOR envia para SUBMETER um lote de tarefas.
+    - Se 'stream' for True, as próximas linhas da conexão trazem mais
+      tarefas (uma por linha, ou {"TASKS": [...]}) até {"END": true}.
+    """
+    payload = {
+        "TASK": "SUBMIT",
+        "TASKS": tasks # Lista de {"TASK": ..., "USER": ...}
+    }
+    if stream:
+        payload["STREAM"] = True
+
+    print(payload)
+    return payload
+
 # --- Payloads enviados pelo SERVIDOR ---
 
 def server_no_task() -> dict:
@@ -59,9 +106,30 @@ def server_no_task() -> dict:
     print(payload)
     return payload
 
-def server_ack() -> dict:
-    """Payload que o Servidor envia para confirmar o recebimento de um status."""
+def server_ack(next_message: dict = None) -> dict:
+    """
+    Payload que o Servidor envia para confirmar o recebimento de um status.
+    - 'next_message' (opcional) é a resposta ao FETCH_NEXT: uma tarefa,
+      NO_TASK ou uma ordem de REDIRECT/RETURN.
+    """
     payload = {"STATUS": "ACK"} # ACK = Acknowledged (Confirmado)
+    if next_message:
+        payload["NEXT"] = next_message
+
+    print(payload)
+    return payload
+
+def server_submit_ack(accepted: int, rejected: int, queue_size: int) -> dict:
+    """
+    Payload que o Servidor envia ao PRODUTOR depois de um SUBMIT.
+    'REJECTED' > 0 indica backpressure (fila cheia) ou tarefas inválidas.
+    """
+    payload = {
+        "RESPONSE": "SUBMIT_ACK",
+        "ACCEPTED": accepted,
+        "REJECTED": rejected,
+        "QUEUE_SIZE": queue_size
+    }
 
     print(payload)
     return payload
@@ -207,6 +275,32 @@ def server_release_completed(server_id: str, worker_uuids: list) -> dict:
     print(payload)
     return payload
 
+def metrics_request(history: bool = False) -> dict:
+    """
+    Payload que um operador (ou script) envia para consultar as métricas
+    locais de um servidor. Com 'history', a resposta traz o anel de amostras.
+    """
+    payload = {
+        "TASK": "STATS",
+        "HISTORY": history
+    }
+
+    print(payload)
+    return payload
+
+def server_metrics(snapshot: dict) -> dict:
+    """
+    Resposta da rota METRICS/STATS: o snapshot das métricas locais
+    (contadores, taxas, gauges, histogramas e, se pedido, o histórico).
+    """
+    payload = {
+        "RESPONSE": "METRICS",
+        **snapshot
+    }
+
+    print(payload)
+    return payload
+
 # --- Payload enviado pelo SERVIDOR para SUPERVISOR ---
 
 def server_performance_report(
@@ -214,10 +308,15 @@ def server_performance_report(
         system_data: dict,
         farm_data: dict,
         config_thresholds: dict,
-        neighbors_data: list
+        neighbors_data: list,
+        task_latency: dict = None,
+        result_cache: dict = None
     ) -> dict:
     """
     Gera o payload de relatório de performance para o supervisor.
+    - 'task_latency': resumo (ms) dos histogramas de espera na fila,
+      execução e tempo total das tarefas concluídas no intervalo.
+    - 'result_cache': acertos/erros (e taxas) do cache de consultas no intervalo.
     """
     payload = {
         "server_uuid": server_uuid,
@@ -232,6 +331,10 @@ def server_performance_report(
         "config_thresholds": config_thresholds,
         "neighbors": neighbors_data
     }
+    if task_latency is not None:
+        payload["performance"]["task_latency"] = task_latency
+    if result_cache is not None:
+        payload["performance"]["result_cache"] = result_cache
 
     print(payload)
     return payload
@@ -6,9 +6,22 @@ from typing import Dict, List
 from random import uniform
 from logs.logger import logger
 from payload_models import server_heartbeat, server_request_worker, server_command_release, server_release_completed
+from .supervisor_sender import SupervisorSender
+from .records import PeerRecord
 
 class ClientActionsMixin:
 
+    def _submit_outbound(self, peer_id: str, fn, *args) -> bool:
+        """
+        Manda uma operação de saída para o executor limitado (no máximo
+        'executor.per_peer_limit' simultâneas por peer). False se recusada.
+        """
+        if self.outbound.submit(fn, *args, key=peer_id):
+            return True
+        self.metrics.inc("outbound_rejected")
+        logger.warning(f"[OUTBOUND] Fila de saída cheia: {fn.__name__} para {peer_id} descartado.")
+        return False
+
     def _send_heartbeat(self, peer: dict) -> bool:
         """Tenta enviar um heartbeat para um peer usando backoff exponencial."""
         retries = self.config['timing']['heartbeat_retries']
@@ -19,7 +32,8 @@ class ClientActionsMixin:
    
         for attempt in range(retries):
             try:
-                with socket.create_connection((peer['ip'], peer['port']), timeout=5) as client_socket:
+                started = time.monotonic() # RTT do heartbeat (métrica por peer)
+                with self.transport.connect(peer['ip'], peer['port'], timeout=5) as client_socket:
                     msg = server_heartbeat(server_id=self.id)
                     client_socket.sendall((json.dumps(msg) + '\n').encode('utf-8')) # Adiciona \n
 
@@ -33,8 +47,9 @@ class ClientActionsMixin:
 
                     data = json.loads(response_line)
                     if data.get("RESPONSE") == "ALIVE":
+                        self.metrics.observe("peer_rtt", time.monotonic() - started, label=peer['id'])
                         with self.lock:
-                            self.peer_status[peer['id']] = {'last_alive': time.time()}
+                            self.peer_status[peer['id']] = PeerRecord(last_alive=time.time())
                         logger.success(f"[HB] Sucesso com {peer['id']}.")
                         return True
                     else:
@@ -61,7 +76,7 @@ class ClientActionsMixin:
     def _ask_peer_for_workers(self, peer) -> List[Dict]:
         """Envia solicitação de workers a um peer (agora é um método)."""
         try:
-            with socket.create_connection((peer['ip'], peer['port']), timeout=5) as s:
+            with self.transport.connect(peer['ip'], peer['port'], timeout=5) as s:
 
                 requestor_info = {'ip': self.host, 'port': self.port}
                 msg = server_request_worker(requestor_info=requestor_info)
@@ -102,7 +117,7 @@ class ClientActionsMixin:
             msg = server_command_release(master_id=self.id, worker_ids=worker_ids)
             logger.info(f"[RELEASE] Notificando {peer['id']} sobre liberação de {len(worker_ids)} workers.")
 
-            with socket.create_connection((peer['ip'], peer['port']), timeout=5) as s:
+            with self.transport.connect(peer['ip'], peer['port'], timeout=5) as s:
                 s.sendall((json.dumps(msg) + '\n').encode('utf-8')) # Adiciona \n
 
                 reader = s.makefile('r', encoding='utf-8')
@@ -139,7 +154,7 @@ class ClientActionsMixin:
             logger.info(f"[RELEASE] Enviando confirmação final (RELEASE_COMPLETED) para {peer['id']} sobre {worker_ids}")
 
             # Conecta, envia e fecha.
-            with socket.create_connection((peer['ip'], peer['port']), timeout=5) as s:
+            with self.transport.connect(peer['ip'], peer['port'], timeout=5) as s:
                 s.sendall((json.dumps(msg) + '\n').encode('utf-8'))
             
             logger.success(f"[RELEASE] Confirmação final enviada para {peer['id']}.")
@@ -150,30 +165,30 @@ class ClientActionsMixin:
 
     def _send_to_supervisor(self, supervisor_info: dict, payload: dict) -> bool:
         """
-        Envia o payload de performance para o Supervisor.
+        Entrega o payload de performance ao SupervisorSender, criado no primeiro
+        relatório: conexão persistente, envio em lote e spool em disco ficam na
+        thread dele. Não bloqueia o reporter.
         """
-        try:
+        if self.supervisor_sender is None:
             ip = supervisor_info.get('ip')
             port = supervisor_info.get('port')
-
             if not ip or not port:
                 logger.error("[REPORT] Configuração do Supervisor inválida (IP ou Porta ausente).")
                 return False
 
-            with socket.create_connection((ip, port), timeout=2) as s:
-                msg = json.dumps(payload) + '\n'
-                s.sendall(msg.encode('utf-8'))
-            
-            logger.success(f"[REPORT] Relatório enviado para {ip}:{port}") 
-
-            return True
-
-        except socket.timeout:
-            logger.warning(f"[REPORT] Timeout ao tentar conectar ao Supervisor em {ip}:{port}")
-            return False
-        except ConnectionRefusedError:
-            logger.warning(f"[REPORT] Conexão recusada pelo Supervisor em {ip}:{port}. Ele está online?")
-            return False
-        except Exception as e:
-            logger.error(f"[REPORT] Erro ao enviar para supervisor: {e}")
+            config_sup = self.config.get('supervisor', {})
+            self.supervisor_sender = SupervisorSender(
+                self.transport, ip, port,
+                spool_path=config_sup.get('spool_path', f"logs/{self.id}_supervisor.spool"),
+                max_batch=config_sup.get('max_batch', 50),
+                max_pending=config_sup.get('max_pending', 1000),
+                spool_max_bytes=config_sup.get('spool_max_bytes', 16 * 1024 * 1024),
+                delta=config_sup.get('delta', False),
+                delta_full_every=config_sup.get('delta_full_every', 10),
+                retry_max=config_sup.get('retry_max', 60)
+            )
+
+        if not self.supervisor_sender.submit(payload):
+            logger.warning("[REPORT] Fila de relatórios cheia: o mais antigo foi descartado.")
             return False
+        return True
@@ -0,0 +1,84 @@
+# dist_server/coalescing.py
+"""
+Agrupamento de leituras idênticas pendentes.
+
+Quando a fila enche, ela guarda centenas de {"TASK": "QUERY", "USER": X}
+iguais, e cada uma ocupa a fila e uma ida ao worker. Aqui:
+  - um índice (usuário, tipo) -> tarefa primária ainda na fila detecta a
+    duplicata em O(1);
+  - a duplicata não entra na fila: fica pendurada na primária;
+  - quando a primária termina (status do worker ou cache de consultas), o
+    mesmo status/resultado conclui todas as penduradas;
+  - uma tarefa que não é leitura para o usuário (ex.: atualização) fecha o
+    grupo: leituras seguintes formam um grupo novo, que roda depois dela.
+
+Só entram leituras sem campos extras (tarefas realmente iguais). As
+penduradas são registradas no WAL como tarefas normais: depois de um
+restart elas voltam para a fila, sem agrupamento (pelo menos uma vez).
+
+Todos os métodos são chamados com o lock do servidor.
+"""
+from typing import Dict, List, Optional
+from .records import QueuedTask
+
+
+class TaskCoalescer:
+
+    def __init__(self, config: dict = None):
+        config = config or {}
+        self.enabled = config.get('enabled', False)
+        self.read_tasks = frozenset(config.get('read_tasks', ["QUERY"]))
+
+        self._primary: Dict[tuple, QueuedTask] = {}          # (usuário, tipo) -> primária ainda na fila
+        self._followers: Dict[str, List[QueuedTask]] = {}    # TASK_ID da primária -> duplicatas
+        self.waiting = 0        # duplicatas penduradas agora
+        self.coalesced = 0      # duplicatas agrupadas (total)
+
+    def _key(self, task: QueuedTask) -> Optional[tuple]:
+        if task.kind in self.read_tasks and not task.extra:
+            return (task.user, task.kind)
+        return None
+
+    def attach(self, task: QueuedTask) -> bool:
+        """Pendura a tarefa na primária igual que está na fila. False se não houver."""
+        if not self.enabled:
+            return False
+        key = self._key(task)
+        primary = self._primary.get(key) if key else None
+        if primary is None:
+            return False
+        self._followers.setdefault(primary.task_id, []).append(task)
+        self.waiting += 1
+        self.coalesced += 1
+        return True
+
+    def queued(self, task: QueuedTask):
+        """A tarefa entrou na fila: vira primária do seu grupo, ou fecha os grupos do usuário."""
+        if not self.enabled:
+            return
+        key = self._key(task)
+        if key:
+            self._primary.setdefault(key, task)
+        elif task.kind not in self.read_tasks:
+            for kind in self.read_tasks:
+                self._primary.pop((task.user, kind), None)
+
+    def dequeued(self, task: QueuedTask):
+        """A primária saiu da fila: novas duplicatas formam outro grupo (as penduradas continuam)."""
+        if not self.enabled:
+            return
+        key = self._key(task)
+        if key and self._primary.get(key) is task:
+            del self._primary[key]
+
+    def followers(self) -> List[QueuedTask]:
+        """Todas as duplicatas penduradas (para o checkpoint do WAL)."""
+        return [task for group in self._followers.values() for task in group]
+
+    def take_followers(self, task_id: str) -> List[QueuedTask]:
+        """Duplicatas da primária que terminou (saem do agrupador)."""
+        followers = self._followers.pop(task_id, None)
+        if not followers:
+            return []
+        self.waiting -= len(followers)
+        return followers
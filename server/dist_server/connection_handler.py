@@ -1,37 +1,40 @@
 # dist_server/connection_handler.py
 import socket
-import threading
 import json
 import time
 from random import randint
-from logs.logger import logger
+from logs.logger import logger, log_route
+from logs.events import events
+from .records import WorkerState, PeerRecord, ReturnBatch, RedirectOrder, OrderKind, intern_id
+from .policy import share_decision, pick_worker_to_lend, SHARE_TOO_FEW_WORKERS, SHARE_LOW_LOAD
 from payload_models import server_no_task, server_ack, server_release_ack, server_order_return, server_order_redirect, server_response_available, server_response_unavailable, server_heartbeat_response
 
+# Rotas com histograma próprio de tempo de tratamento; o resto usa o tipo de conexão
+METRIC_ROUTES = frozenset(("ALIVE", "STATUS", "HEARTBEAT", "WORKER_REQUEST", "COMMAND_RELEASE", "SUBMIT", "STATS", "METRICS"))
+
 class ConnectionHandlerMixin:
     
     def _listen_loop(self):
         """Loop principal que escuta por novas conexões."""
         try:
-            # self.host e self.port são definidos no __init__ da classe Server
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
+            # self.host e self.port são definidos no __init__ da classe Server.
+            # O transporte (TCP ou loopback em memória) já devolve o listener pronto.
+            with self.transport.listen(self.host, self.port) as server_socket:
                 self.server_socket = server_socket # Guardando para o shutdown limpo
-                server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                server_socket.bind((self.host, self.port))
-                server_socket.listen()
                 logger.success(f"Servidor escutando em {self.host}:{self.port}")
                 
                 while self._running:
                     try:
-                        server_socket.settimeout(1.0) 
+                        # accept() bloqueia sem timeout: stop() fecha o socket e o acorda
                         conn, addr = server_socket.accept()
-                        server_socket.settimeout(None) 
-                        
-                        handler_thread = threading.Thread(
-                            target=self._handle_connection, args=(conn, addr), daemon=True
-                        )
-                        handler_thread.start()
-                    except socket.timeout:
-                        continue # Volta ao início do loop para checar self._running
+                        self.metrics.inc("connections_accepted")
+
+                        # Pool limitado: cliente parado por mais de 'connection_idle_timeout' libera o slot
+                        conn.settimeout(self.connection_idle_timeout)
+                        if not self.connection_pool.submit(self._handle_connection, conn, addr):
+                            self.metrics.inc("connections_rejected")
+                            logger.warning(f"Pool de conexões cheio: conexão de {addr[0]}:{addr[1]} recusada.")
+                            conn.close()
                     except Exception as e:
                         if not self._running:
                             logger.info("Listener encerrando devido ao shutdown.")
@@ -43,12 +46,67 @@ class ConnectionHandlerMixin:
                 logger.critical(f"Erro fatal na thread Listener: {e}")
                 self.stop() # Tenta parar o servidor se o listener falhar
 
+    def _next_message_for_worker(self, entity_id: str):
+        """
+        Decide o que entregar a um worker que pede trabalho.
+        1. Ordem pendente de REDIRECT/RETURN para ele, se houver.
+        2. Senão, a próxima tarefa da fila.
+        3. Senão, NO_TASK.
+        Retorna (mensagem, ordem_removida). 'ordem_removida' é None se não houve ordem.
+        """
+        order_to_remove = None
+        redirect_msg = None
+
+        with self.lock:
+            for order in self.redirect_queue:
+                if order.worker_id == entity_id:
+                    target_server = order.target_server
+                    task_type = order.kind.value
+
+                    if events.enabled:
+                        events.record(task_type, entity_id, source=self.id, to=f"{target_server['ip']}:{target_server['port']}")
+
+                    self.metrics.inc("orders_return" if task_type == 'RETURN' else "orders_redirect")
+                    if task_type == 'RETURN':
+                        redirect_msg = server_order_return(return_target_server=target_server)
+                        logger.warning(f"Ordenando RETORNO para {entity_id} -> {target_server}")
+
+                    else: # REDIRECT normal
+                        redirect_msg = server_order_redirect(redirect_target_server=target_server)
+                        logger.warning(f"Ordenando REDIRECT (via GET_TASK) para {entity_id} -> {target_server['ip']}")
+
+                    order_to_remove = order
+                    break # Encontramos, saia do loop
+
+            if order_to_remove:
+                # SIM, ele deve ser redirecionado.
+                self.redirect_queue.remove(order_to_remove)
+                return redirect_msg, order_to_remove
+
+        # Se não há ordem de redirect, procure uma tarefa na fila.
+        task_to_send = self._dequeue_task(entity_id)
+
+        if task_to_send:
+            self.metrics.inc("tasks_dispatched")
+            if events.enabled:
+                events.record("DISPATCH", entity_id, source=self.id, task=task_to_send.get("TASK_ID"))
+            log_route("DISPATCH", "INFO", "Enviando tarefa para {}.", entity_id)
+            return task_to_send, None
+
+        # Fila vazia, envie "NO_TASK"
+        self.metrics.inc("no_task")
+        log_route("NO_TASK", "INFO", "Fila vazia. Nenhuma tarefa para {}.", entity_id)
+        return server_no_task(), None
+
     def _handle_connection(self, conn: socket.socket, addr):
         """Lida com uma conexão de entrada (agora é um método)."""
 
         connection_type = "UNKNOWN"
         entity_id = None
         order_to_remove = None
+        task = None
+        started = None # Início do tratamento da primeira mensagem (log de eventos)
+        self.metrics.adjust("connections_active", 1)
 
         # Adiciona contexto do cliente aos logs desta thread
         with logger.contextualize(client_addr=f"{addr[0]}:{addr[1]}"):
@@ -62,6 +120,9 @@ class ConnectionHandlerMixin:
                             logger.info(f"Conexão encerrada por {entity_id or 'peer desconhecido'}.")
                             break
 
+                        if started is None:
+                            started = time.monotonic()
+
                         try:
                             data = json.loads(line)
                         except json.JSONDecodeError:
@@ -80,15 +141,15 @@ class ConnectionHandlerMixin:
                                 connection_type = "WORKER"
                                 entity_id = data.get("WORKER_UUID")
 
-                                logger.info(f"Conexão identificada como WORKER: {entity_id}")
+                                log_route("WORKER.CONNECT", "INFO", "Conexão identificada como WORKER: {}", entity_id)
 
                                 # Registra o worker (se for a primeira vez)
+                                entity_id = intern_id(entity_id)
                                 with self.lock:
                                     if entity_id not in self.worker_status:
-                                        self.worker_status[entity_id] = {
-                                            'addr': addr, 
-                                            'last_seen': time.time()
-                                        }
+                                        if entity_id in self.evictor.tombstones:
+                                            logger.info(f"Worker {entity_id} voltou depois de removido por TTL (dono/estado restaurados).")
+                                        self.evictor.register_worker(self.worker_status, entity_id, addr, time.time())
                                 
                                 # --- LÓGICA DE REGISTRO DE DONO ---
                                 if "SERVER_UUID" in data:
@@ -96,7 +157,7 @@ class ConnectionHandlerMixin:
                                     logger.warning(f"Worker {entity_id} é 'EMPRESTADO'. Dono: {owner_id}")
                                     with self.lock:
                                         # Salva a informação do dono no status do worker
-                                        self.worker_status[entity_id]['SERVER_UUID'] = owner_id
+                                        self.worker_status[entity_id].owner_id = intern_id(owner_id)
 
                             # --- COMUNICAÇÃO DO SERVIDOR ---
 
@@ -147,15 +208,16 @@ class ConnectionHandlerMixin:
                                 if target_peer:
                                     # Registra o LOTE de workers que estamos esperando
                                     with self.lock:
-                                        # Armazena o lote por server_id
-                                        self.pending_returns[entity_id] = {
-                                            'peer': target_peer,
+                                        # Armazena o lote por server_id (expira em 'eviction.return_batch_ttl')
+                                        self.evictor.watch_return_batch(entity_id, time.time())
+                                        self.pending_returns[entity_id] = ReturnBatch(
+                                            peer=target_peer,
                                             # Salva uma cópia para podermos modificar a 'pending'
-                                            'workers_pending': list(workers_list), 
+                                            workers_pending=list(workers_list),
                                             # Salva a lista original para o payload final
-                                            'workers_original': list(workers_list),
-                                            'timestamp': time.time()
-                                        }
+                                            workers_original=list(workers_list),
+                                            timestamp=time.time()
+                                        )
                                     logger.info(f"Registrado lote de {len(workers_list)} workers 'em trânsito' de volta de {entity_id}.")
                                 else:
                                     logger.error(f"Recebido COMMAND_RELEASE de {entity_id}, mas ele não está na lista de active_peers.")
@@ -166,6 +228,20 @@ class ConnectionHandlerMixin:
 
                                 break # Encerra a conexão
                             
+                            elif task == "SUBMIT":
+                                # --- COMUNICAÇÃO DO PRODUTOR ---
+                                connection_type = "PRODUCER"
+                                entity_id = f"PRODUCER@{addr[0]}:{addr[1]}"
+                                self._handle_submit(conn, reader, data, entity_id)
+                                break # Encerra a conexão
+
+                            elif task in ("STATS", "METRICS"):
+                                # --- CONSULTA DE MÉTRICAS (operador/script) ---
+                                connection_type = "METRICS"
+                                entity_id = f"METRICS@{addr[0]}:{addr[1]}"
+                                self._handle_metrics_request(conn, data)
+                                break # Encerra a conexão
+
                             elif "RESPONSE" in data and data.get("RESPONSE") == "RELEASE_COMPLETED":
                                 entity_id = data.get("SERVER_UUID")
                                 logger.success(f"Recebida a confirmação de recebimento de workers pelo server: {entity_id}")
@@ -200,22 +276,22 @@ class ConnectionHandlerMixin:
                                 with self.lock:
                                     # Procura em qual lote pendente este worker está
                                     for server_id, return_info in self.pending_returns.items():
-                                        if entity_id in return_info['workers_pending']:
+                                        if entity_id in return_info.workers_pending:
 
                                             logger.success(f"[RETURN] Worker {entity_id} retornou com sucesso de {server_id}.")
 
                                             if entity_id in self.worker_status:
-                                                self.worker_status[entity_id]["BORROWED"] = False
+                                                self.worker_status[entity_id].state = WorkerState.ACTIVE
                                             
                                             # Remove o worker da lista de pendentes
-                                            return_info['workers_pending'].remove(entity_id)
+                                            return_info.workers_pending.remove(entity_id)
                                             server_that_returned_id = server_id
                                             
                                             # Verifica se o lote está completo
-                                            if not return_info['workers_pending']:
+                                            if not return_info.workers_pending:
                                                 batch_is_complete = True
-                                                peer_to_notify = return_info['peer']
-                                                original_worker_list = return_info['workers_original']
+                                                peer_to_notify = return_info.peer
+                                                original_worker_list = return_info.workers_original
                                                 
                                             break # Encontrou o worker, pode parar de procurar
 
@@ -227,62 +303,19 @@ class ConnectionHandlerMixin:
                                     with self.lock:
                                         self.pending_returns.pop(server_that_returned_id) 
                                     
-                                    # Envia a notificação final em uma thread
-                                    notify_thread = threading.Thread(
-                                        target=self._send_release_completed,
-                                        args=(peer_to_notify, original_worker_list),
-                                        daemon=True
-                                    )
-                                    notify_thread.start()
+                                    # Envia a notificação final pelo executor de saída
+                                    self._submit_outbound(peer_to_notify['id'], self._send_release_completed,
+                                                          peer_to_notify, original_worker_list)
                                 
                                 # ATUALIZA O "ALIVE" DO WORKER
                                 with self.lock:
                                     if entity_id in self.worker_status:
-                                        self.worker_status[entity_id]['last_seen'] = time.time()
-
-                                # Verifica Redirect
-                                redirect_msg = None
-
-                                with self.lock:
-                                    for order in self.redirect_queue:
-                                        if order['worker_id'] == entity_id:
-                                            target_server = order['target_server']
-                                            task_type = order.get('TASK', 'REDIRECT')
-                                            
-                                            if task_type == 'RETURN':
-                                                redirect_msg = server_order_return(return_target_server=target_server)
-                                                logger.warning(f"Ordenando RETORNO para {entity_id} -> {target_server}")
-
-                                            else: # REDIRECT normal
-                                                redirect_msg = server_order_redirect(redirect_target_server=target_server)
-                                                logger.warning(f"Ordenando REDIRECT (via GET_TASK) para {entity_id} -> {target_server['ip']}")
-
-                                            order_to_remove = order
-                                            break # Encontramos, saia do loop
+                                        self.worker_status[entity_id].last_seen = time.time()
 
-                                if order_to_remove:
-                                    # SIM, ele deve ser redirecionado. Envie a ordem e encerre.
-                                    with self.lock:
-                                        self.redirect_queue.remove(order_to_remove)
-                                    conn.sendall((json.dumps(redirect_msg) + '\n').encode('utf-8'))
-                                    break # Encerra a conexão com o worker
+                                # Ordem de redirect pendente ou próxima tarefa da fila
+                                response, order_to_remove = self._next_message_for_worker(entity_id)
+                                conn.sendall((json.dumps(response) + '\n').encode('utf-8'))
 
-                                # --- PASSO 2: LÓGICA DE FILA (Normal, da v1) ---
-                                # Se não há ordem de redirect, procure uma tarefa na fila.
-                                task_to_send = None
-                                with self.lock:
-                                    if self.task_queue: # Se a fila NÃO estiver vazia
-                                        task_to_send = self.task_queue.pop(0) # Pega a primeira
-                                
-                                if task_to_send:
-                                    # Envia a tarefa da fila
-                                    logger.info(f"Enviando tarefa para {entity_id}.")
-                                    conn.sendall((json.dumps(task_to_send) + '\n').encode('utf-8'))
-                                else:
-                                    # Fila vazia, envie "NO_TASK"
-                                    logger.info(f"Fila vazia. Nenhuma tarefa para {entity_id}.")
-                                    conn.sendall((json.dumps(server_no_task()) + '\n').encode('utf-8'))
-                                
                                 break # Encerra conexão (modelo de conexão curta da v1)
 
                             # --- ROTA 2: Worker reporta um status ---
@@ -291,18 +324,35 @@ class ConnectionHandlerMixin:
                                 
                                 with self.lock:
                                     if entity_id in self.worker_status:
-                                        self.worker_status[entity_id]['last_seen'] = time.time()
+                                        self.worker_status[entity_id].last_seen = time.time()
                                 
                                 if status == "OK":
-                                    logger.success(f"Worker {entity_id} reportou {status} para a tarefa.")
+                                    log_route("STATUS", "SUCCESS", "Worker {} reportou {} para a tarefa.", entity_id, status)
+                                    self._complete_task(entity_id, status, data.get("TASK_ID"), data.get("EXEC_TIME"))
                                     self._record_task_completion() # Seu helper original de state_helpers.py
+                                    self.metrics.inc("status_ok")
                                 
                                 elif status == "NOK":
                                     logger.warning(f"Worker {entity_id} reportou {status} para a tarefa.")
+                                    self._complete_task(entity_id, status, data.get("TASK_ID"), data.get("EXEC_TIME"))
                                     self._record_task_completion() # Seu helper original de state_helpers.py
-
-                                # Confirma o recebimento
-                                conn.sendall((json.dumps(server_ack()) + '\n').encode('utf-8'))
+                                    self.metrics.inc("status_nok")
+
+                                elif status == "HANDBACK":
+                                    # Tarefas pré-buscadas que o worker não vai executar:
+                                    # voltam para o INÍCIO da fila, mantendo a ordem original.
+                                    returned_tasks = [t for t in data.get("TASKS", []) if isinstance(t, dict) and "TASK" in t]
+                                    self._enqueue_tasks(returned_tasks, front=True)
+                                    self.metrics.inc("tasks_handed_back", len(returned_tasks))
+                                    logger.warning(f"Worker {entity_id} devolveu {len(returned_tasks)} tarefas para a fila.")
+
+                                # Confirma o recebimento. Se o worker pediu "report and fetch",
+                                # o ACK já leva a próxima tarefa (ou ordem) no campo NEXT.
+                                next_msg = None
+                                if data.get("FETCH_NEXT") and status in ("OK", "NOK"):
+                                    next_msg, order_to_remove = self._next_message_for_worker(entity_id)
+
+                                conn.sendall((json.dumps(server_ack(next_message=next_msg)) + '\n').encode('utf-8'))
                                 break # Encerra conexão
 
                         # Lógica de WORKER_REQUEST
@@ -330,19 +380,19 @@ class ConnectionHandlerMixin:
                             with self.lock: # Protege a leitura de self.worker_status
                                 current_worker_count = len(self.worker_status)
 
-                            # 3. Lógica de decisão
-                            can_share = False
-                            if current_worker_count <= min_workers_to_keep:
+                            # 3. Lógica de decisão (regra pura em policy.py)
+                            can_share, reason = share_decision(current_worker_count, current_task_count,
+                                                               min_workers_to_keep, min_tasks_threshold)
+                            if reason == SHARE_TOO_FEW_WORKERS:
                                 # Não compartilha se tiver menos que o mínimo de workers
                                 logger.info(f"[REQUEST] Pedido de {entity_id} negado: contagem de workers ({current_worker_count}) abaixo do mínimo ({min_workers_to_keep}).")
-                            elif current_task_count < min_tasks_threshold:
+                            elif reason == SHARE_LOW_LOAD:
                                 # Não compartilha se a carga JÁ ESTIVER baixa
                                 # (Se a carga está baixa, nós mesmos precisamos dos workers!)
                                 logger.info(f"[REQUEST] Pedido de {entity_id} negado: carga atual ({current_task_count}) abaixo do threshold ({min_tasks_threshold}).")
                             else:
                                 # Carga está saudável E temos workers suficientes para compartilhar.
                                 logger.success(f"[REQUEST] Pedido de {entity_id} APROVADO.")
-                                can_share = True
 
                             # --- FIM DA NOVA LÓGICA ---
 
@@ -350,13 +400,13 @@ class ConnectionHandlerMixin:
                                 # Pega qualquer worker.
                                 worker_to_move_id = None
                                 with self.lock:
-                                    if self.worker_status: # Checagem extra de segurança
-                                        worker_to_move_id = list(self.worker_status.keys())[0] 
+                                    worker_to_move_id = pick_worker_to_lend(self.worker_status)
                                 
                                 if worker_to_move_id:
-                                    redirect_order = {'worker_id': worker_to_move_id, 'target_server': requestor_info}
+                                    redirect_order = RedirectOrder(worker_to_move_id, requestor_info, OrderKind.REDIRECT, time.time())
                                     with self.lock:
                                         self.redirect_queue.append(redirect_order)
+                                        self.evictor.watch_order(redirect_order)
                                     logger.success(f"Worker {worker_to_move_id} agendado para redirect para {entity_id}")
                                     response = server_response_available(master_id=self.id, worker_uuid_list=[worker_to_move_id])
                                 else:
@@ -375,7 +425,7 @@ class ConnectionHandlerMixin:
                         elif connection_type == "SERVER" and task == "HEARTBEAT":
                             logger.info("Recebido solicitação de Heartbeat. Enviando Alive")
                             with self.lock:
-                                self.peer_status[entity_id] = {'last_alive': time.time()}
+                                self.peer_status[entity_id] = PeerRecord(last_alive=time.time())
                             response = server_heartbeat_response(server_id=self.id)
                             conn.sendall((json.dumps(response) + '\n').encode('utf-8'))
                             break # Encerra conexão após responder
@@ -383,12 +433,23 @@ class ConnectionHandlerMixin:
 
             except (ConnectionResetError, BrokenPipeError, EOFError):
                  logger.warning(f"Conexão perdida abruptamente.")
+            except socket.timeout:
+                 logger.warning(f"Conexão ociosa por mais de {self.connection_idle_timeout}s: encerrando.")
             except Exception as e:
                  logger.error(f"Erro inesperado na conexão: {e}")
             finally:
+                 # Métricas e um evento por conexão: rota e tempo de tratamento
+                 self.metrics.adjust("connections_active", -1)
+                 if started is not None:
+                     duration = time.monotonic() - started
+                     # Rótulo de um conjunto fixo ('TASK' vem do cliente)
+                     self.metrics.observe("route", duration, label=task if task in METRIC_ROUTES else connection_type)
+                     if events.enabled:
+                         events.record(task or connection_type, entity_id, source=self.id, duration=duration)
+
                 # Limpeza final da conexão
                  if connection_type == "WORKER" and order_to_remove and entity_id:
                      with self.lock:
                          if entity_id in self.worker_status:
-                             self.worker_status[entity_id]["BORROWED"] = True
+                             self.worker_status[entity_id].state = WorkerState.LENT
                              logger.info(f"Worker {entity_id} alocado como emprestado.")
\ No newline at end of file
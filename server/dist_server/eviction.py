@@ -0,0 +1,155 @@
+# dist_server/eviction.py
+"""
+Remoção por TTL do estado que não volta mais.
+
+worker_status nunca perdia entradas: workers mortos ou que foram embora
+ficavam para sempre, inflando cada varredura e as métricas
+(total_registered/workers_failed). Lotes de pending_returns e ordens de
+REDIRECT/RETURN de workers que nunca reapareceram também ficavam.
+
+Aqui cada entrada entra uma vez em uma roda de tempo (timing wheel) com o
+prazo em que pode expirar. A cada tick só os baldes vencidos são olhados:
+  - entrada ainda viva (ex.: o worker mandou ALIVE depois) volta para a
+    roda com o prazo novo, sem custo no caminho quente;
+  - entrada vencida é removida e contada.
+Workers removidos deixam uma lápide (dono e estado) por 'tombstone_ttl':
+se o worker voltar, é reconhecido e o registro é refeito com esses dados.
+O custo de memória e de varredura acompanha a fazenda viva, não o histórico.
+"""
+from typing import Dict, List
+from .records import WorkerRecord, Tombstone, RedirectOrder
+
+# Tipos de entrada na roda
+_WORKER = "WORKER"
+_RETURN = "RETURN"
+_ORDER = "ORDER"
+_TOMBSTONE = "TOMBSTONE"
+
+
+class TimingWheel:
+    """
+    Roda de tempo de um nível: 'slots' baldes de 'tick' segundos. Cada item
+    guarda o tick absoluto do prazo, então prazos além de uma volta esperam
+    no balde até a volta certa.
+    """
+
+    def __init__(self, tick: float, slots: int, now: float):
+        self.tick = tick
+        self.slots = slots
+        self._buckets = [[] for _ in range(slots)]
+        self._current = int(now // tick) # Último tick já processado
+        self.size = 0
+
+    def schedule(self, item, deadline: float):
+        due_tick = max(int(deadline // self.tick), self._current + 1)
+        self._buckets[due_tick % self.slots].append((due_tick, item))
+        self.size += 1
+
+    def advance(self, now: float) -> list:
+        """Avança até 'now' e devolve os itens vencidos (cada balde é visitado no máximo uma vez)."""
+        target = int(now // self.tick)
+        due = []
+        for step in range(self._current + 1, min(target, self._current + self.slots) + 1):
+            index = step % self.slots
+            bucket = self._buckets[index]
+            if not bucket:
+                continue
+            keep = []
+            for entry in bucket:
+                if entry[0] <= target:
+                    due.append(entry[1])
+                else:
+                    keep.append(entry) # Prazo numa volta seguinte
+            self._buckets[index] = keep
+        self._current = max(self._current, target)
+        self.size -= len(due)
+        return due
+
+
+class StateEvictor:
+    """
+    TTLs (seção 'eviction' do config) e a roda de tempo das entradas do
+    servidor. Todos os métodos são chamados com o lock do servidor.
+    """
+
+    def __init__(self, config: dict = None, now: float = 0.0):
+        config = config or {}
+        self.worker_ttl = config.get('worker_ttl', 600)
+        self.return_batch_ttl = config.get('return_batch_ttl', 600)
+        self.redirect_order_ttl = config.get('redirect_order_ttl', 300)
+        self.tombstone_ttl = config.get('tombstone_ttl', 3600)
+        self.interval = config.get('interval', 5)
+        self.wheel = TimingWheel(tick=max(0.001, self.interval), slots=config.get('wheel_slots', 512), now=now)
+        self.tombstones: Dict[str, Tombstone] = {}
+        self.evicted = {"workers": 0, "return_batches": 0, "redirect_orders": 0, "tombstones": 0}
+        self.revived = 0
+
+    # --- Registro ---
+
+    def register_worker(self, worker_status: Dict[str, WorkerRecord], worker_id: str, addr: tuple,
+                        now: float) -> WorkerRecord:
+        """Cria o registro de um worker novo (ou que volta de uma lápide) e o coloca na roda."""
+        record = WorkerRecord(addr=addr, last_seen=now)
+        tombstone = self.tombstones.pop(worker_id, None)
+        if tombstone is not None:
+            # Worker removido por TTL que voltou: mantém dono e estado
+            record.owner_id = tombstone.owner_id
+            record.state = tombstone.state
+            self.revived += 1
+        worker_status[worker_id] = record
+        self.wheel.schedule((_WORKER, worker_id), now + self.worker_ttl)
+        return record
+
+    def watch_return_batch(self, server_id: str, now: float):
+        self.wheel.schedule((_RETURN, server_id), now + self.return_batch_ttl)
+
+    def watch_order(self, order: RedirectOrder):
+        self.wheel.schedule((_ORDER, order), order.created_at + self.redirect_order_ttl)
+
+    # --- Expiração ---
+
+    def evict(self, worker_status: Dict, pending_returns: Dict, redirect_queue: List, now: float) -> dict:
+        """Processa os baldes vencidos. Retorna quantas entradas de cada tipo saíram neste tick."""
+        removed = {"workers": 0, "return_batches": 0, "redirect_orders": 0, "tombstones": 0}
+        for kind, key in self.wheel.advance(now):
+            if kind == _WORKER:
+                record = worker_status.get(key)
+                if record is None:
+                    continue
+                deadline = record.last_seen + self.worker_ttl
+                if deadline > now:
+                    self.wheel.schedule((_WORKER, key), deadline) # Visto depois: volta para a roda
+                    continue
+                del worker_status[key]
+                self.tombstones[key] = Tombstone(record.owner_id, record.state, now)
+                self.wheel.schedule((_TOMBSTONE, key), now + self.tombstone_ttl)
+                removed["workers"] += 1
+
+            elif kind == _RETURN:
+                batch = pending_returns.get(key)
+                if batch is None:
+                    continue
+                deadline = batch.timestamp + self.return_batch_ttl
+                if deadline > now:
+                    self.wheel.schedule((_RETURN, key), deadline) # Lote novo do mesmo servidor
+                    continue
+                del pending_returns[key]
+                removed["return_batches"] += 1
+
+            elif kind == _ORDER:
+                # Ordem ainda na fila (ninguém a entregou): remove pela identidade
+                for index, order in enumerate(redirect_queue):
+                    if order is key:
+                        del redirect_queue[index]
+                        removed["redirect_orders"] += 1
+                        break
+
+            elif kind == _TOMBSTONE:
+                tombstone = self.tombstones.get(key)
+                if tombstone is not None and tombstone.evicted_at + self.tombstone_ttl <= now:
+                    del self.tombstones[key]
+                    removed["tombstones"] += 1
+
+        for name, count in removed.items():
+            self.evicted[name] += count
+        return removed
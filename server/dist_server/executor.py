@@ -0,0 +1,181 @@
+# dist_server/executor.py
+"""
+Executor limitado para conexões e operações de saída (peers).
+
+Antes, cada conexão aceita, cada COMMAND_RELEASE e cada RELEASE_COMPLETED
+ganhava uma thread nova, sem limite: numa tempestade de rebalanceamento ou
+com um peer fora, o número de threads (e a memória) crescia sem parar.
+Aqui:
+  - no máximo 'max_workers' threads (criadas sob demanda, encerradas
+    quando ficam 'idle_timeout' s sem trabalho);
+  - fila limitada ('max_queue'): acima disso submit() recusa e conta;
+  - limite por chave ('per_key_limit', ex.: id do peer): um peer lento ou
+    fora do ar não ocupa todas as threads; o excedente espera na fila da
+    própria chave sem bloquear as outras;
+  - shutdown() cancela o que ainda estava na fila e devolve esses jobs.
+"""
+import threading
+from collections import deque
+from logs.logger import logger
+
+
+class BoundedExecutor:
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 256, per_key_limit: int = None,
+                 idle_timeout: float = 30, name: str = "Executor"):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.per_key_limit = per_key_limit
+        self.idle_timeout = idle_timeout
+        self.name = name
+
+        self._ready = deque()           # (key, fn, args) liberados para rodar
+        self._waiting = {}              # key -> deque de jobs acima do limite da chave
+        self._admitted = {}             # key -> jobs da chave na fila pronta ou rodando
+        self._cond = threading.Condition()
+        self._threads = 0
+        self._idle = 0
+        self._running = 0
+        self._queued = 0                # prontos + esperando a chave
+        self._closed = False
+        self._seq = 0
+
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.max_queued = 0             # maior profundidade de fila vista
+
+    def submit(self, fn, *args, key: str = None) -> bool:
+        """Enfileira fn(*args). Retorna False (e conta em 'rejected') se a fila estiver cheia ou fechada."""
+        with self._cond:
+            # Cabe o que as threads livres (existentes ou a criar) absorvem + 'max_queue' na fila
+            if self._closed or self._queued >= self.max_queue + (self.max_workers - self._running):
+                self.rejected += 1
+                return False
+            job = (key, fn, args)
+            if key is not None and self.per_key_limit and self._admitted.get(key, 0) >= self.per_key_limit:
+                self._waiting.setdefault(key, deque()).append(job)
+            else:
+                self._admit_locked(job)
+            self._queued += 1
+            self.max_queued = max(self.max_queued, self._queued)
+
+            if self._idle:
+                self._cond.notify()
+            elif self._threads < self.max_workers:
+                self._threads += 1
+                self._seq += 1
+                threading.Thread(target=self._worker, name=f"{self.name}-{self._seq}", daemon=True).start()
+        return True
+
+    def pending(self, key: str) -> int:
+        """Jobs da chave ainda não concluídos (na fila ou rodando)."""
+        with self._cond:
+            return self._admitted.get(key, 0) + len(self._waiting.get(key, ()))
+
+    def _admit_locked(self, job: tuple):
+        key = job[0]
+        if key is not None:
+            self._admitted[key] = self._admitted.get(key, 0) + 1
+        self._ready.append(job)
+
+    def _release_key_locked(self, key: str):
+        """Um job da chave terminou: libera o próximo que esperava por ela."""
+        if key is None:
+            return
+        left = self._admitted.get(key, 0) - 1
+        if left > 0:
+            self._admitted[key] = left
+        else:
+            self._admitted.pop(key, None)
+        waiting = self._waiting.get(key)
+        if waiting:
+            self._admit_locked(waiting.popleft())
+            if not waiting:
+                del self._waiting[key]
+            self._cond.notify()
+
+    def _worker(self):
+        with self._cond:
+            while True:
+                while not self._ready and not self._closed:
+                    self._idle += 1
+                    woke = self._cond.wait(timeout=self.idle_timeout)
+                    self._idle -= 1
+                    if not woke and not self._ready:
+                        break # Ociosa demais: a thread sai (volta a ser criada sob demanda)
+                if not self._ready:
+                    self._threads -= 1
+                    return
+                key, fn, args = self._ready.popleft()
+                self._queued -= 1
+                self._running += 1
+
+                self._cond.release()
+                try:
+                    fn(*args)
+                    failed = False
+                except Exception as e:
+                    failed = True
+                    logger.error(f"[{self.name}] Job {getattr(fn, '__name__', fn)} falhou: {e}", exc_info=True)
+                finally:
+                    self._cond.acquire()
+
+                self._running -= 1
+                self.completed += 1
+                self.failed += failed
+                self._release_key_locked(key)
+
+    def stats(self) -> dict:
+        """Profundidade da fila, threads e contadores (para as métricas)."""
+        with self._cond:
+            return {
+                "queued": self._queued,
+                "running": self._running,
+                "threads": self._threads,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "cancelled": self.cancelled,
+            }
+
+    def shutdown(self) -> list:
+        """Recusa novos jobs, cancela os da fila e acorda as threads. Retorna os args dos cancelados."""
+        with self._cond:
+            self._closed = True
+            dropped = list(self._ready)
+            for waiting in self._waiting.values():
+                dropped.extend(waiting)
+            self._ready.clear()
+            self._waiting.clear()
+            self._admitted.clear()
+            self._queued = 0
+            self.cancelled += len(dropped)
+            self._cond.notify_all()
+        return [args for _, _, args in dropped]
+
+
+class InlineExecutor:
+    """Mesma interface, mas roda o job na hora, na thread de quem chamou (testes)."""
+
+    def __init__(self):
+        self.completed = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+    def submit(self, fn, *args, key: str = None) -> bool:
+        fn(*args)
+        self.completed += 1
+        return True
+
+    def pending(self, key: str) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        return {"queued": 0, "running": 0, "threads": 0, "max_queued": 0, "completed": self.completed,
+                "failed": 0, "rejected": self.rejected, "cancelled": self.cancelled}
+
+    def shutdown(self) -> list:
+        return []
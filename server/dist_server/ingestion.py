@@ -0,0 +1,137 @@
+# dist_server/ingestion.py
+import json
+import time
+from typing import Dict, Iterator, List
+from logs.logger import logger
+from payload_models import server_submit_ack
+
+
+def iter_task_file(path: str, batch_size: int = 500) -> Iterator[List[Dict]]:
+    """
+    Lê um arquivo JSON lines (estilo 'requests.jsonl') em lotes, sem carregar
+    o arquivo inteiro em memória. Linhas vazias ou não-JSON são puladas.
+    """
+    batch = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                batch.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"[INGEST] Linha não-JSON ignorada em {path}: {line[:80]}")
+                continue
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+class IngestionMixin:
+
+    def _ingestion_config(self) -> dict:
+        config_ingest = self.config.get('ingestion', {})
+        return {
+            'queue_capacity': config_ingest.get('queue_capacity', 100000),
+            'backpressure': config_ingest.get('backpressure', 'reject'), # "reject" ou "block"
+            'block_timeout': config_ingest.get('block_timeout', 5),
+            # Tipos que os workers executam: outro tipo voltaria UNEXPECTED e ficaria
+            # indo e voltando entre o worker e o timeout de despacho
+            'task_types': frozenset(config_ingest.get('task_types', ["QUERY"])),
+        }
+
+    def _submit_tasks(self, raw_tasks: List[Dict]) -> tuple:
+        """
+        Valida e enfileira um lote de tarefas de um produtor.
+        Itens que não são dict, sem USER string não vazia ou com TASK que não é
+        string de 'task_types' são recusados (contam no SUBMIT_ACK).
+        Aplica backpressure quando a fila chega em 'queue_capacity':
+        - 'reject': o excedente é recusado na hora;
+        - 'block': espera até 'block_timeout' segundos por espaço (o produtor
+          fica parado, pois o servidor não lê a próxima linha) e recusa o resto.
+        Retorna (aceitas, recusadas).
+        """
+        cfg = self._ingestion_config()
+        capacity = cfg['queue_capacity']
+
+        # Monta o dict direto (sem new_task_payload, que imprime cada tarefa);
+        # TASK_ID e ENQUEUED_AT são carimbados em _enqueue_tasks.
+        tasks = []
+        invalid = 0
+        for raw in raw_tasks:
+            if not isinstance(raw, dict):
+                invalid += 1
+                continue
+            user = raw.get("USER")
+            task_type = raw.get("TASK", "QUERY")
+            if isinstance(user, str) and user and isinstance(task_type, str) and task_type in cfg['task_types']:
+                tasks.append({"TASK": task_type, "USER": user})
+            else:
+                invalid += 1
+
+        accepted = 0
+        deadline = time.monotonic() + cfg['block_timeout']
+        while tasks:
+            with self.queue_space:
+                free = capacity - len(self.task_queue)
+                if free <= 0 and cfg['backpressure'] == 'block':
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        self.queue_space.wait(timeout=remaining)
+                        continue
+            if free <= 0:
+                break
+            # Outro SUBMIT pode ter ocupado o espaço entre a checagem e o
+            # enfileiramento: _enqueue_tasks reconfere a capacidade sob o lock.
+            added = self._enqueue_tasks(tasks[:free], capacity=capacity)
+            tasks = tasks[added:]
+            accepted += added
+
+        self.metrics.inc("tasks_submitted", accepted)
+        self.metrics.inc("tasks_rejected", len(tasks) + invalid)
+        return accepted, len(tasks) + invalid
+
+    def _handle_submit(self, conn, reader, first_msg: dict, entity_id: str):
+        """
+        Rota SUBMIT.
+        - Lote único: {"TASK": "SUBMIT", "TASKS": [...]} -> um SUBMIT_ACK.
+        - Stream: {"TASK": "SUBMIT", "STREAM": true} seguido de linhas com uma
+          tarefa cada (ou {"TASKS": [...]}), até {"END": true} ou EOF.
+          O SUBMIT_ACK final traz os totais.
+        """
+        total_accepted = 0
+        total_rejected = 0
+
+        accepted, rejected = self._submit_tasks(first_msg.get("TASKS", []))
+        total_accepted += accepted
+        total_rejected += rejected
+
+        if first_msg.get("STREAM"):
+            while self._running:
+                line = reader.readline()
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                except json.JSONDecodeError:
+                    total_rejected += 1
+                    continue
+                if msg.get("END"):
+                    break
+                batch = msg["TASKS"] if "TASKS" in msg else [msg]
+                accepted, rejected = self._submit_tasks(batch)
+                total_accepted += accepted
+                total_rejected += rejected
+
+        with self.lock:
+            queue_size = len(self.task_queue)
+
+        if total_rejected:
+            logger.warning(f"[INGEST] {entity_id}: {total_accepted} tarefas aceitas, {total_rejected} recusadas. Fila: {queue_size}.")
+        else:
+            logger.success(f"[INGEST] {entity_id}: {total_accepted} tarefas aceitas. Fila: {queue_size}.")
+
+        response = server_submit_ack(accepted=total_accepted, rejected=total_rejected, queue_size=queue_size)
+        conn.sendall((json.dumps(response) + '\n').encode('utf-8'))
@@ -0,0 +1,314 @@
+# dist_server/metrics.py
+"""
+Métricas locais do servidor, consultáveis sem sistema externo:
+  - rota METRICS/STATS no próprio listener ({"TASK": "STATS"} -> snapshot JSON);
+  - porta HTTP opcional ('metrics.http_port'): GET /metrics (texto no formato
+    do Prometheus) e GET /stats (JSON; /stats?history=1 inclui o histórico);
+  - anel limitado de amostras (uma a cada 'sample_interval' s, guardando até
+    'history_seconds'), para ver a última hora sem coletor externo.
+
+Contadores e histogramas ficam em ServerMetrics (lock próprio, curto).
+A espera no lock principal do servidor é medida pelo TimedLock, que só
+cronometra quando o acquire não é imediato.
+"""
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from logs.logger import logger
+from histogram import LatencyHistogram
+from payload_models import server_metrics
+
+
+class ServerMetrics:
+    """Contadores, níveis (gauges incrementais) e histogramas, com histórico em anel."""
+
+    def __init__(self, history_size: int = 360):
+        self.counters = {}          # nome -> total desde o start
+        self.levels = {}            # nome -> valor atual (ex.: conexões abertas)
+        self.histograms = {}        # nome -> LatencyHistogram
+        self.labeled = {}           # nome -> {rótulo -> LatencyHistogram} (ex.: RTT por peer)
+        self.history = deque(maxlen=max(1, history_size))
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def adjust(self, name: str, delta: int):
+        with self._lock:
+            self.levels[name] = self.levels.get(name, 0) + delta
+
+    def observe(self, name: str, seconds: float, label: str = None):
+        with self._lock:
+            if label is None:
+                hist = self.histograms.get(name)
+                if hist is None:
+                    hist = self.histograms[name] = LatencyHistogram()
+            else:
+                by_label = self.labeled.setdefault(name, {})
+                hist = by_label.get(label)
+                if hist is None:
+                    hist = by_label[label] = LatencyHistogram()
+            hist.record(seconds)
+
+    def snapshot(self) -> dict:
+        """Cópia dos contadores/níveis e resumo (ms) dos histogramas."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "levels": dict(self.levels),
+                "histograms": {name: hist.summary() for name, hist in self.histograms.items()},
+                "labeled": {name: {label: hist.summary() for label, hist in by_label.items()}
+                            for name, by_label in self.labeled.items()},
+            }
+
+    def rates(self, counters: dict, now: float, since: float) -> dict:
+        """Taxa (por segundo) de cada contador desde a última amostra do anel (ou 'since')."""
+        with self._lock:
+            last = self.history[-1] if self.history else None
+        if last is not None:
+            since, previous = last["t"], last["counters"]
+        else:
+            previous = {}
+        elapsed = now - since
+        if elapsed <= 0:
+            return {}
+        return {name: round((value - previous.get(name, 0)) / elapsed, 3) for name, value in counters.items()}
+
+    def add_sample(self, sample: dict):
+        with self._lock:
+            self.history.append(sample)
+
+    def recent(self) -> list:
+        with self._lock:
+            return list(self.history)
+
+
+class TimedLock:
+    """
+    Lock com medição da espera: tenta o acquire sem bloquear e só cronometra
+    quando há disputa. Conta aquisições e disputas e guarda a espera em um
+    histograma. Tudo é atualizado já com o lock na mão, sem sincronização extra.
+    Funciona com threading.Condition (acquire/release/__enter__/__exit__).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait = LatencyHistogram()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            self.acquisitions += 1
+            return True
+        if not blocking:
+            return False
+        started = time.perf_counter()
+        if not self._lock.acquire(True, timeout):
+            return False
+        self.acquisitions += 1
+        self.contended += 1
+        self.wait.record(time.perf_counter() - started)
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+    def summary(self) -> dict:
+        """Chamado com o lock: aquisições, disputas e espera (ms) das disputadas."""
+        return {"acquisitions": self.acquisitions, "contended": self.contended, **self.wait.summary()}
+
+
+class MetricsMixin:
+
+    def _metrics_config(self) -> dict:
+        config_metrics = self.config.get('metrics', {})
+        return {
+            'sample_interval': config_metrics.get('sample_interval', 10),
+            'history_seconds': config_metrics.get('history_seconds', 3600),
+            'lock_timing': config_metrics.get('lock_timing', False),
+            'http_host': config_metrics.get('http_host', '127.0.0.1'),
+            'http_port': config_metrics.get('http_port'),
+        }
+
+    def _init_metrics(self):
+        """Cria o registro de métricas (o anel guarda 'history_seconds' de amostras)."""
+        cfg = self._metrics_config()
+        self.metrics = ServerMetrics(history_size=int(cfg['history_seconds'] // max(1, cfg['sample_interval'])))
+        self.metrics_http = None
+
+    def _new_state_lock(self):
+        """Lock principal do estado: cronometrado (TimedLock) se 'metrics.lock_timing'."""
+        return TimedLock() if self._metrics_config()['lock_timing'] else threading.Lock()
+
+    def _metrics_gauges(self) -> tuple:
+        """Estado instantâneo (fila, em voo, workers, ordens, peers, threads, executores) e a espera no lock."""
+        now = time.time()
+        timeout = self.config['timing']['heartbeat_timeout']
+        with self.lock:
+            gauges = {
+                "queue_depth": len(self.task_queue),
+                "inflight_tasks": len(self.inflight_tasks),
+                "workers_registered": len(self.worker_status),
+                "workers_alive": sum(1 for w in self.worker_status.values() if (now - w.last_seen) < timeout),
+                "redirect_orders": len(self.redirect_queue),
+                "pending_returns": len(self.pending_returns),
+                "peers_active": len(self.active_peers),
+                "worker_tombstones": len(self.evictor.tombstones),
+                "tasks_coalesced_waiting": self.coalescer.waiting,
+            }
+            lock_summary = self.lock.summary() if isinstance(self.lock, TimedLock) else None
+        gauges["threads"] = threading.active_count()
+        for name, pool in self.executors.items():
+            stats = pool.stats()
+            gauges[f"{name}_queue_depth"] = stats["queued"]
+            gauges[f"{name}_running"] = stats["running"]
+            gauges[f"{name}_threads"] = stats["threads"]
+            gauges[f"{name}_rejected"] = stats["rejected"]
+        return gauges, lock_summary
+
+    def _metrics_snapshot(self, history: bool = False) -> dict:
+        """Snapshot completo (contadores, taxas, gauges e histogramas), pronto para JSON."""
+        now = time.time()
+        gauges, lock_summary = self._metrics_gauges()
+        registry = self.metrics.snapshot()
+        gauges.update(registry["levels"])
+
+        snapshot = {
+            "server": self.id,
+            "t": round(now, 3),
+            "uptime_s": int(now - self.start_time),
+            "counters": registry["counters"],
+            "rates": self.metrics.rates(registry["counters"], now, self.start_time),
+            "gauges": gauges,
+            "histograms": registry["histograms"],
+            "peer_rtt": registry["labeled"].get("peer_rtt", {}),
+            "routes": registry["labeled"].get("route", {}),
+        }
+        if lock_summary is not None:
+            snapshot["lock_wait"] = lock_summary
+        if history:
+            snapshot["history"] = self.metrics.recent()
+        return snapshot
+
+    def _metrics_sample(self) -> dict:
+        """Uma amostra compacta para o anel: contadores, taxas e gauges."""
+        now = time.time()
+        gauges, _ = self._metrics_gauges()
+        counters = self.metrics.snapshot()["counters"]
+        sample = {
+            "t": round(now, 3),
+            "counters": counters,
+            "rates": self.metrics.rates(counters, now, self.start_time),
+            "gauges": gauges,
+        }
+        self.metrics.add_sample(sample)
+        return sample
+
+    def _handle_metrics_request(self, conn, data: dict):
+        """Rota METRICS/STATS: responde o snapshot (com histórico se 'HISTORY')."""
+        response = server_metrics(self._metrics_snapshot(history=bool(data.get("HISTORY"))))
+        conn.sendall((json.dumps(response) + '\n').encode('utf-8'))
+
+    # --- HTTP opcional (scrape) ---
+
+    def _start_metrics_http(self):
+        """Sobe o servidor HTTP de métricas se 'metrics.http_port' estiver configurado."""
+        cfg = self._metrics_config()
+        if not cfg['http_port']:
+            return
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                try:
+                    if url.path == "/metrics":
+                        body = prometheus_text(server._metrics_snapshot()).encode('utf-8')
+                        content_type = "text/plain; version=0.0.4"
+                    elif url.path == "/stats":
+                        history = parse_qs(url.query).get("history", ["0"])[0] not in ("0", "")
+                        body = json.dumps(server._metrics_snapshot(history=history)).encode('utf-8')
+                        content_type = "application/json"
+                    else:
+                        self.send_error(404)
+                        return
+                except Exception as e:
+                    logger.error(f"[METRICS] Erro ao responder {url.path}: {e}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Scrapes periódicos não vão para o log
+
+        self.metrics_http = ThreadingHTTPServer((cfg['http_host'], cfg['http_port']), Handler)
+        self.metrics_http.daemon_threads = True
+        thread = threading.Thread(target=self.metrics_http.serve_forever, name="MetricsHTTP", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"[METRICS] HTTP em http://{cfg['http_host']}:{self.metrics_http.server_address[1]}/metrics")
+
+    def _stop_metrics_http(self):
+        if self.metrics_http:
+            self.metrics_http.shutdown()
+            self.metrics_http.server_close()
+            self.metrics_http = None
+
+
+def _prom_name(name: str) -> str:
+    return "dist_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text(snapshot: dict) -> str:
+    """Converte um snapshot para o formato texto do Prometheus (histogramas viram summaries)."""
+    server = snapshot.get("server", "")
+    lines = []
+
+    def summary(name: str, hist: dict, labels: str):
+        metric = _prom_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for quantile, key in (("0.5", "p50_ms"), ("0.9", "p90_ms"), ("0.99", "p99_ms"), ("0.999", "p999_ms")):
+            lines.append(f'{metric}{{{labels},quantile="{quantile}"}} {hist[key] / 1000}')
+        lines.append(f"{metric}_count{{{labels}}} {hist['count']}")
+        lines.append(f"{metric}_sum{{{labels}}} {hist['mean_ms'] * hist['count'] / 1000}")
+
+    base = f'server="{server}"'
+    for name, value in sorted(snapshot.get("counters", {}).items()):
+        metric = _prom_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{{{base}}} {value}")
+    for name, value in sorted(snapshot.get("gauges", {}).items()):
+        metric = _prom_name(name)
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric}{{{base}}} {value}")
+    for name, hist in sorted(snapshot.get("histograms", {}).items()):
+        summary(name, hist, base)
+    for peer, hist in sorted(snapshot.get("peer_rtt", {}).items()):
+        summary("peer_rtt", hist, f'{base},peer="{peer}"')
+    for route, hist in sorted(snapshot.get("routes", {}).items()):
+        summary("route", hist, f'{base},route="{route}"')
+    if "lock_wait" in snapshot:
+        lock = snapshot["lock_wait"]
+        lines.append("# TYPE dist_lock_acquisitions_total counter")
+        lines.append(f"dist_lock_acquisitions_total{{{base}}} {lock['acquisitions']}")
+        lines.append("# TYPE dist_lock_contended_total counter")
+        lines.append(f"dist_lock_contended_total{{{base}}} {lock['contended']}")
+        summary("lock_wait", lock, base)
+    return "\n".join(lines) + "\n"
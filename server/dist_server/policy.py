@@ -0,0 +1,91 @@
+# dist_server/policy.py
+"""
+Regras de decisão do balanceamento de carga, como funções puras
+(sem lock, rede ou relógio). O servidor chama estas funções nos loops
+e handlers; o simulador (bench/policy_sim.py) chama as mesmas funções
+sobre um relógio virtual.
+"""
+from typing import Dict, List, Optional, Tuple
+from .records import WorkerRecord
+
+# Ações do load balancer
+LOAD_REQUEST = "REQUEST"   # fila cheia: pedir workers aos peers
+LOAD_RELEASE = "RELEASE"   # fila vazia: devolver workers emprestados
+LOAD_STEADY = "STEADY"     # carga normal: nada a fazer
+
+# Motivos da resposta a um WORKER_REQUEST
+SHARE_OK = "OK"
+SHARE_TOO_FEW_WORKERS = "TOO_FEW_WORKERS"
+SHARE_LOW_LOAD = "LOW_LOAD"
+
+# Retentativas do COMMAND_RELEASE (_handle_release_with_backoff)
+RELEASE_MAX_RETRIES = 5
+RELEASE_BASE_DELAY = 5
+RELEASE_MAX_DELAY = 30
+
+
+def load_balancing_params(config: dict) -> dict:
+    """Lê a seção 'load_balancing' com os mesmos padrões usados pelo servidor."""
+    config_lb = config['load_balancing']
+    return {
+        'min_queue_threshold': config_lb.get('min_queue_threshold', 10),
+        'max_queue_threshold': config_lb.get('max_queue_threshold', 100),
+        'min_workers_before_sharing': config_lb.get('min_workers_before_sharing', 2),
+        'threshold_window': config_lb.get('threshold_window', 30),
+        'threshold_min_tasks': config_lb.get('threshold_min_tasks', 1),
+    }
+
+
+def load_action(queue_size: int, min_queue: int, max_queue: int) -> str:
+    """Fila acima de 'max_queue' pede workers; abaixo de 'min_queue' devolve."""
+    if queue_size > max_queue:
+        return LOAD_REQUEST
+    if queue_size < min_queue:
+        return LOAD_RELEASE
+    return LOAD_STEADY
+
+
+def select_workers_to_release(worker_status: Dict[str, WorkerRecord], min_workers: int) -> Dict[str, List[Dict]]:
+    """
+    Agrupa por dono os workers emprestados (owner_id) ainda não notificados.
+    Para no limite de 'min_workers' (o servidor não fica sem ninguém).
+    Retorna {owner_id: [{'id': worker_id}, ...]}.
+    """
+    by_owner = {}
+    workers_to_release = 0
+    for wid, winfo in worker_status.items():
+        if winfo.owner_id and not winfo.release_notified:
+            by_owner.setdefault(winfo.owner_id, []).append({'id': wid})
+            workers_to_release += 1
+
+            # Não deixa o server ficar menos que o mínimo de workers
+            if workers_to_release + 1 >= min_workers:
+                break
+    return by_owner
+
+
+def share_decision(worker_count: int, tasks_in_window: int, min_workers_to_keep: int,
+                   min_tasks_threshold: int) -> Tuple[bool, str]:
+    """
+    Responde a um WORKER_REQUEST: empresta só se tiver mais que
+    'min_workers_to_keep' workers e se a própria carga (tarefas concluídas
+    na janela) não estiver abaixo de 'min_tasks_threshold'.
+    Retorna (pode_emprestar, motivo).
+    """
+    if worker_count <= min_workers_to_keep:
+        return False, SHARE_TOO_FEW_WORKERS
+    if tasks_in_window < min_tasks_threshold:
+        return False, SHARE_LOW_LOAD
+    return True, SHARE_OK
+
+
+def pick_worker_to_lend(worker_status: Dict[str, WorkerRecord]) -> Optional[str]:
+    """Escolhe o worker emprestado a um peer (o primeiro registrado)."""
+    for wid in worker_status:
+        return wid
+    return None
+
+
+def release_retry_delay(attempt: int, base_delay: float = RELEASE_BASE_DELAY, max_delay: float = RELEASE_MAX_DELAY) -> float:
+    """Espera antes da tentativa 'attempt' + 1 do COMMAND_RELEASE: 5s, 10s, 20s, ... até 'max_delay'."""
+    return min(base_delay * (2 ** (attempt - 1)), max_delay)
@@ -0,0 +1,114 @@
+# dist_server/records.py
+"""
+Registros compactos do estado do servidor.
+
+O estado era todo de dicts aninhados com chaves string ('last_seen',
+'SERVER_UUID', 'BORROWED', 'release_notified', ...): cada worker e cada
+tarefa na fila pagava um dict inteiro. Aqui:
+  - dataclasses com __slots__ (sem __dict__ por instância);
+  - enums para os estados (em vez de flags soltas);
+  - ids e usuários internados (sys.intern): milhões de tarefas do mesmo
+    USER apontam para a mesma string;
+  - a fila guarda QueuedTask e o dict do protocolo só é montado no envio
+    (to_wire) ou no WAL.
+"""
+import sys
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional
+
+
+def intern_id(value):
+    """Interna ids (worker, servidor, usuário); outros tipos passam direto."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class WorkerState(Enum):
+    ACTIVE = "ACTIVE"   # trabalhando para este servidor
+    LENT = "LENT"       # recebeu ordem de REDIRECT/RETURN e saiu daqui
+
+
+class OrderKind(Enum):
+    REDIRECT = "REDIRECT"   # emprestar o worker a outro servidor
+    RETURN = "RETURN"       # devolver o worker ao dono
+
+
+@dataclass(slots=True)
+class WorkerRecord:
+    addr: tuple
+    last_seen: float
+    owner_id: Optional[str] = None      # dono, se o worker veio emprestado ('SERVER_UUID')
+    state: WorkerState = WorkerState.ACTIVE
+    release_notified: bool = False      # dono já avisado (COMMAND_RELEASE confirmado)
+
+
+@dataclass(slots=True)
+class PeerRecord:
+    last_alive: float
+
+
+@dataclass(slots=True)
+class ReturnBatch:
+    """Lote de workers que um peer mandou de volta (COMMAND_RELEASE)."""
+    peer: dict
+    workers_pending: List[str]
+    workers_original: List[str]
+    timestamp: float
+
+
+@dataclass(slots=True)
+class RedirectOrder:
+    worker_id: str
+    target_server: dict
+    kind: OrderKind = OrderKind.REDIRECT
+    created_at: float = 0.0             # para expirar ordens de workers que nunca voltam
+
+
+@dataclass(slots=True)
+class Tombstone:
+    """O que sobra de um worker removido por TTL (para reconhecê-lo se voltar)."""
+    owner_id: Optional[str]
+    state: WorkerState
+    evicted_at: float
+
+
+# Chaves do protocolo que viram campos do QueuedTask (o resto vai em 'extra')
+_TASK_FIELDS = ("TASK_ID", "TASK", "USER", "ENQUEUED_AT")
+
+
+@dataclass(slots=True)
+class QueuedTask:
+    task_id: str
+    kind: str
+    user: str
+    enqueued_at: Optional[float] = None
+    extra: Optional[Dict] = None        # campos raros do payload (None na maioria das tarefas)
+
+    @classmethod
+    def from_wire(cls, task: dict) -> "QueuedTask":
+        extra = {key: value for key, value in task.items() if key not in _TASK_FIELDS}
+        return cls(task["TASK_ID"], intern_id(task.get("TASK", "QUERY")), intern_id(task.get("USER")),
+                   task.get("ENQUEUED_AT"), extra or None)
+
+    def to_wire(self) -> dict:
+        task = {"TASK": self.kind, "USER": self.user, "TASK_ID": self.task_id}
+        if self.enqueued_at is not None:
+            task["ENQUEUED_AT"] = self.enqueued_at
+        if self.extra:
+            task.update(self.extra)
+        return task
+
+
+@dataclass(slots=True)
+class InflightTask:
+    task: QueuedTask
+    worker_id: str
+    dispatched_at: float
+
+    def to_wire(self) -> dict:
+        """Formato do WAL (checkpoint): {'task', 'worker_id', 'dispatched_at'}."""
+        return {'task': self.task.to_wire(), 'worker_id': self.worker_id, 'dispatched_at': self.dispatched_at}
+
+    @classmethod
+    def from_wire(cls, info: dict) -> "InflightTask":
+        return cls(QueuedTask.from_wire(info['task']), intern_id(info['worker_id']), info['dispatched_at'])
@@ -0,0 +1,89 @@
+# dist_server/result_cache.py
+"""
+Cache de resultados de consulta (QUERY) por usuário.
+
+O produtor sorteia de uma lista pequena de usuários: a maior parte da fila
+é a mesma consulta repetida, e cada uma ia até um worker. Aqui:
+  - o desfecho de uma QUERY concluída com OK fica guardado por usuário, por
+    até 'ttl' segundos, com no máximo 'max_entries' usuários (LRU);
+  - uma consulta com entrada válida é concluída no servidor, sem ida ao
+    worker (no enfileiramento ou quando chega a vez dela na fila).
+
+O que a fazenda consegue servir hoje limita o cache: o worker só executa
+QUERY (somente leitura) e reporta só o STATUS, sem payload de resultado.
+Por isso a entrada guarda o STATUS e não há invalidação: nenhuma tarefa
+aceita altera o estado de um usuário. Um tipo de tarefa de escrita vai
+precisar invalidar o usuário antes de ser aceito com o cache ligado.
+Entre a execução e o fim do 'ttl' o servidor responde com um desfecho de
+até 'ttl' segundos atrás (por isso o cache é opcional).
+
+Todos os métodos são chamados com o lock do servidor.
+"""
+from collections import OrderedDict
+from .records import QueuedTask
+
+MISS = object() # Sentinela: "não há entrada válida" (distinto de qualquer valor guardado)
+
+
+class ResultCache:
+
+    def __init__(self, config: dict = None):
+        config = config or {}
+        self.enabled = config.get('enabled', False)
+        self.ttl = config.get('ttl', 5)
+        self.max_entries = max(1, config.get('max_entries', 1024))
+        self.read_tasks = frozenset(config.get('read_tasks', ["QUERY"]))
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict() # user -> (status, guardado_em), do menos ao mais recente
+
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.evictions = 0
+        self._reported = (0, 0) # (hits, misses) no último relatório
+
+    def lookup(self, task: QueuedTask, now: float):
+        """Desfecho em cache para a consulta, ou MISS (tarefas que não são leitura não contam)."""
+        if not self.enabled or task.kind not in self.read_tasks:
+            return MISS
+        entry = self._entries.get(task.user)
+        if entry is None:
+            self.misses += 1
+            return MISS
+        status, stored_at = entry
+        if now - stored_at > self.ttl:
+            del self._entries[task.user]
+            self.misses += 1
+            return MISS
+        self._entries.move_to_end(task.user)
+        self.hits += 1
+        return status
+
+    def task_completed(self, task: QueuedTask, status: str, dispatched_at: float, now: float):
+        """Status do worker: guarda o desfecho de uma consulta concluída com OK."""
+        if not self.enabled or task.kind not in self.read_tasks or status != "OK":
+            return
+        if now - dispatched_at > self.ttl:
+            return # Já nasceu vencido
+        self._entries[task.user] = (status, now)
+        self._entries.move_to_end(task.user)
+        self.fills += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def report(self) -> dict:
+        """Acertos/erros desde o último relatório (para o supervisor) e o tamanho atual."""
+        last_hits, last_misses = self._reported
+        hits, misses = self.hits - last_hits, self.misses - last_misses
+        self._reported = (self.hits, self.misses)
+        lookups = hits + misses
+        return {
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "miss_rate": round(misses / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,86 @@
+# dist_server/sampler.py
+"""
+Amostrador de sistema para o relatório de performance.
+
+O reporter chamava psutil.cpu_percent(interval=0.1) (bloqueia 100 ms) e relia
+cpu_count, memória e disco a cada ciclo. Aqui:
+  - fatos estáticos (CPUs lógicas/físicas) são lidos uma vez;
+  - cpu_percent(interval=None) mede desde a amostra anterior, sem bloquear;
+  - cada amostra inclui o próprio processo (CPU, RSS e threads);
+  - a seção 'system' do relatório já fica montada: o reporter só copia
+    o dict pronto e acrescenta o uptime (microssegundos, sem syscalls).
+"""
+import os
+import time
+import psutil
+
+
+class SystemSampler:
+
+    def __init__(self, disk_path: str = '/'):
+        self.disk_path = disk_path
+        self.static = None     # fatos que não mudam (lidos uma vez)
+        self.section = None    # seção 'system' pronta, da última amostra
+        self.sampled_at = None
+        self._process = None
+
+    def _load_static(self):
+        self.static = {
+            "count_logical": psutil.cpu_count(logical=True),
+            "count_physical": psutil.cpu_count(logical=False),
+        }
+        self._process = psutil.Process(os.getpid())
+        # A primeira chamada sem intervalo só marca o ponto de partida
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+
+    def sample(self) -> dict:
+        """Lê o estado atual (sem bloquear) e troca a seção pronta de uma vez."""
+        if self.static is None:
+            self._load_static()
+        try:
+            load_avg = psutil.getloadavg() # Retorna tupla (1m, 5m, 15m)
+        except AttributeError:
+            load_avg = (0.0, 0.0, 0.0) # Fallback para Windows antigo
+
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        process = self._process
+        with process.oneshot():
+            process_cpu = process.cpu_percent(interval=None)
+            rss = process.memory_info().rss
+            threads = process.num_threads()
+
+        section = {
+            "load_average_1m": load_avg[0],
+            "load_average_5m": load_avg[1],
+            "cpu": {
+                "usage_percent": psutil.cpu_percent(interval=None),
+                "count_logical": self.static["count_logical"],
+                "count_physical": self.static["count_physical"]
+            },
+            "memory": {
+                "total_mb": int(mem.total / (1024 * 1024)),
+                "available_mb": int(mem.available / (1024 * 1024)),
+                "percent_used": mem.percent,
+                "memory_used": int(mem.used / (1024 * 1024))
+            },
+            "disk": {
+                "total_gb": round(disk.total / (1024**3), 2),
+                "free_gb": round(disk.free / (1024**3), 2),
+                "percent_used": disk.percent
+            },
+            "process": {
+                "cpu_percent": process_cpu,
+                "rss_mb": round(rss / (1024 * 1024), 1),
+                "threads": threads
+            }
+        }
+        self.sampled_at = time.time()
+        self.section = section # Troca atômica: leitores veem a amostra velha ou a nova
+        return section
+
+    def system_data(self, uptime: float) -> dict:
+        """Seção 'system' do relatório a partir da última amostra (amostra agora se não houver)."""
+        section = self.section if self.section is not None else self.sample()
+        return {"uptime_seconds": int(uptime), **section}
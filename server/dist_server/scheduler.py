@@ -0,0 +1,202 @@
+# dist_server/scheduler.py
+"""
+Agendador central do servidor.
+
+Antes, cada loop de fundo tinha a própria thread e acordava a cada 1 s só
+para checar self._running; as retentativas do COMMAND_RELEASE dormiam em
+threads dedicadas. Aqui:
+  - um heap de timers (ordenado por horário) guarda jobs periódicos e
+    one-shot (retentativas com atraso), todos canceláveis;
+  - poucas threads executoras dormem até o próximo timer vencer (ou até um
+    timer novo/stop() as acordar): nenhum despertar ocioso;
+  - stop() acorda todas na hora (shutdown imediato);
+  - o relógio é injetável: com ManualClock e advance() os testes andam no
+    tempo sem dormir.
+
+Jobs periódicos usam atraso fixo: o próximo disparo é agendado quando o
+atual termina (um job nunca roda em paralelo com ele mesmo).
+"""
+import heapq
+import itertools
+import threading
+import time
+from logs.logger import logger
+
+
+class ManualClock:
+    """Relógio virtual para testes: só anda com advance()."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class Timer:
+    """Um job agendado. cancel() impede os próximos disparos."""
+
+    def __init__(self, scheduler: "Scheduler", when: float, interval: float, name: str, fn, args: tuple):
+        self.scheduler = scheduler
+        self.when = when
+        self.interval = interval   # None = one-shot
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+
+class Scheduler:
+
+    def __init__(self, clock=time.monotonic, threads: int = 2, name: str = "Scheduler"):
+        self.clock = clock
+        self.name = name
+        self._threads_wanted = max(1, threads)
+        self._heap = []
+        self._seq = itertools.count() # Desempate estável para timers no mesmo horário
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+        self.fired = 0      # disparos executados
+        self.failed = 0     # disparos que levantaram exceção
+
+    # --- Agendamento ---
+
+    def call_later(self, delay: float, fn, *args, name: str = None) -> Timer:
+        """Executa fn(*args) uma vez, daqui a 'delay' segundos."""
+        return self._push(Timer(self, self.clock() + max(0.0, delay), None, name or fn.__name__, fn, args))
+
+    def call_every(self, interval: float, fn, *args, first_delay: float = None, name: str = None) -> Timer:
+        """Executa fn(*args) a cada 'interval' segundos (o primeiro após 'first_delay', padrão = interval)."""
+        if interval <= 0:
+            raise ValueError("interval deve ser positivo")
+        delay = interval if first_delay is None else max(0.0, first_delay)
+        return self._push(Timer(self, self.clock() + delay, interval, name or fn.__name__, fn, args))
+
+    def cancel(self, timer: Timer):
+        """Cancela o timer (sai do heap quando chegar a vez dele)."""
+        with self._cond:
+            timer.cancelled = True
+
+    def _push(self, timer: Timer) -> Timer:
+        with self._cond:
+            if self._stopped:
+                timer.cancelled = True
+                return timer
+            heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+            self._cond.notify() # O novo timer pode vencer antes do que as threads esperam
+        return timer
+
+    def pending(self) -> int:
+        """Timers ainda agendados (não cancelados)."""
+        with self._cond:
+            return sum(1 for _, _, timer in self._heap if not timer.cancelled)
+
+    # --- Execução ---
+
+    def _pop_due_locked(self, now: float):
+        """Tira do heap o próximo timer vencido (descartando cancelados); None se não houver."""
+        while self._heap:
+            when, _, timer = self._heap[0]
+            if timer.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            if when > now:
+                return None
+            heapq.heappop(self._heap)
+            return timer
+        return None
+
+    def _fire(self, timer: Timer):
+        try:
+            timer.fn(*timer.args)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"[SCHED] Job '{timer.name}' falhou: {e}", exc_info=True)
+        self.fired += 1
+        if timer.interval is not None:
+            with self._cond:
+                if timer.cancelled or self._stopped:
+                    return
+                timer.when = self.clock() + timer.interval
+                heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+                self._cond.notify()
+
+    def run_pending(self) -> int:
+        """Executa (na thread atual) todos os timers vencidos no horário do relógio. Retorna quantos."""
+        fired = 0
+        while True:
+            with self._cond:
+                timer = self._pop_due_locked(self.clock())
+            if timer is None:
+                return fired
+            self._fire(timer)
+            fired += 1
+
+    def advance(self, seconds: float) -> int:
+        """
+        Só com ManualClock: anda o relógio até 'agora + seconds', disparando
+        cada timer no seu horário (periódicos podem disparar várias vezes).
+        """
+        target = self.clock() + seconds
+        fired = 0
+        while True:
+            with self._cond:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                next_when = self._heap[0][0] if self._heap else None
+            if next_when is None or next_when > target:
+                break
+            self.clock.now = max(self.clock.now, next_when)
+            fired += self.run_pending()
+        self.clock.now = target
+        return fired
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                timer = self._pop_due_locked(self.clock())
+                if timer is None:
+                    # Dorme até o próximo vencimento (ou até ser acordado)
+                    timeout = self._heap[0][0] - self.clock() if self._heap else None
+                    self._cond.wait(timeout=timeout)
+                    continue
+                self._cond.release()
+                try:
+                    self._fire(timer)
+                finally:
+                    self._cond.acquire()
+
+    def start(self):
+        """Sobe as threads executoras."""
+        with self._cond:
+            self._stopped = False
+        for i in range(self._threads_wanted):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 0.2):
+        """
+        Cancela tudo e acorda as threads na hora. Espera no máximo 'timeout'
+        (no total) por elas: um job em execução (ex.: heartbeat em retentativa)
+        termina sozinho e a thread sai em seguida.
+        """
+        with self._cond:
+            self._stopped = True
+            for _, _, timer in self._heap:
+                timer.cancelled = True
+            self._heap.clear()
+            self._cond.notify_all()
+        current = threading.current_thread()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            if thread is not current:
+                thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        self._threads = []
@@ -3,60 +3,96 @@ import socket
 import threading
 import json
 import time
-from typing import Dict, List
+from typing import List
 
 # Importa o logger do pacote (ou de onde ele estiver)
-from logs.logger import logger, setup_file_logging
+from logs.logger import logger, setup_file_logging, configure_route_logging, route_logger
+from logs.events import events, configure_event_log
 # Importa os Mixins
 from .connection_handler import ConnectionHandlerMixin
 from .background_tasks import BackgroundTasksMixin
 from .client_actions import ClientActionsMixin
 from .state_helpers import StateHelpersMixin
+from .ingestion import IngestionMixin
+from .metrics import MetricsMixin
+from .sampler import SystemSampler
+from .scheduler import Scheduler
+from .executor import BoundedExecutor
+from transport import TcpTransport
 
 # A classe Server agora herda de todos os Mixins
 class Server(ConnectionHandlerMixin, 
              BackgroundTasksMixin, 
              ClientActionsMixin, 
-             StateHelpersMixin):
+             StateHelpersMixin,
+             IngestionMixin,
+             MetricsMixin):
     
-    def __init__(self, config_path="config.json"):
-        """Inicializa o servidor carregando a configuração e o estado."""
-        logger.info(f"Inicializando servidor com config: {config_path}")
-        self._load_config(config_path)
+    def __init__(self, config_path="config.json", transport=None, config: dict = None, file_logging: bool = True):
+        """
+        Inicializa o servidor carregando a configuração e o estado.
+        - 'transport' troca o TCP por outro transporte (ex.: LoopbackTransport em memória).
+        - 'config' permite passar o dict já carregado (vários servidores no mesmo processo).
+        - 'file_logging=False' não cria arquivos de log próprios.
+        """
+        logger.info(f"Inicializando servidor com config: {config_path if config is None else 'dict em memória'}")
+        self._load_config(config_path, config)
+        self.transport = transport or TcpTransport()
+        # Amostragem/rate limit dos logs do caminho quente (seção 'logging')
+        configure_route_logging(self.config.get('logging'))
 
         # Estado do Servidor
         self.id = f'SERVER_{self.id_number}'
         self.start_time = time.time()
-        self.peer_status: Dict[str, Dict] = {}
-        self.worker_status: Dict[str, Dict] = {}
-        self.active_peers: List[Dict] = list(self.config['peers'])
-        self.redirect_queue: List[Dict] = []
-        self.completed_task_timestamps: List[float] = []
-
-        self.pending_returns: Dict[str, Dict] = {}
-
-        self.pending_release_attempts: Dict[str, float] = {}
-
-        self.task_queue: List[Dict] = []
+        # Fazenda, peers, fila, em voo, caches (o mesmo estado que os testes montam)
+        self._init_state(self.config)
+        # Amostras de CPU/memória/disco/processo para o relatório (thread SystemSampler)
+        self.sampler = SystemSampler()
+        # Envio assíncrono ao supervisor (criado no primeiro relatório)
+        self.supervisor_sender = None
         self.lista_users = ['Arthur', 'Carlos', 'Michel', 'Maria', 'Fernanda', 'Joao'] # Para o produtor
 
 
-        self.lock = threading.Lock() # Lock único
+        # Métricas locais (rota STATS, HTTP opcional e histórico em anel)
+        self._init_metrics()
+        self.lock = self._new_state_lock() # Lock único (espera medida se 'metrics.lock_timing')
+        # Acordada quando sai tarefa da fila (backpressure do SUBMIT em modo 'block')
+        self.queue_space = threading.Condition(self.lock)
 
         # Controle de Threads
         self._threads: List[threading.Thread] = []
+        # Jobs periódicos e retentativas (heap de timers, sem polling de 1 s)
+        self.scheduler = Scheduler(threads=self.config['timing'].get('scheduler_threads', 2))
+        self._shutdown_event = threading.Event()
+        # Threads limitadas para conexões aceitas e para operações de saída (peers)
+        config_exec = self.config.get('executor', {})
+        self.connection_idle_timeout = config_exec.get('connection_idle_timeout', 60)
+        self.connection_pool = BoundedExecutor(max_workers=config_exec.get('connection_threads', 64),
+                                               max_queue=config_exec.get('connection_queue', 256), name="Conn")
+        self.outbound = BoundedExecutor(max_workers=config_exec.get('outbound_threads', 8),
+                                        max_queue=config_exec.get('outbound_queue', 256),
+                                        per_key_limit=config_exec.get('per_peer_limit', 2), name="Outbound")
+        self.executors = {"connection": self.connection_pool, "outbound": self.outbound}
         self._running = True
         self.server_socket = None # Para o shutdown
 
-        setup_file_logging(self.id)
+        if file_logging:
+            setup_file_logging(self.id)
+        # Log estruturado de eventos (seção 'events', desligado por padrão)
+        configure_event_log(self.config.get('events'), self.id)
+
+        # Recupera a fila do WAL (se habilitado) antes de aceitar conexões
+        self._init_task_log()
 
         logger.success(f"Servidor {self.id} ({self.host}:{self.port}) inicializado.")
 
-    def _load_config(self, config_path):
-        """Carrega a configuração do arquivo JSON."""
+    def _load_config(self, config_path, config: dict = None):
+        """Carrega a configuração do arquivo JSON (ou usa o dict já carregado)."""
         try:
-            with open(config_path, 'r') as f:
-                self.config = json.load(f)
+            if config is None:
+                with open(config_path, 'r') as f:
+                    config = json.load(f)
+            self.config = config
             self.host = self.config['server']['ip']
             self.port = self.config['server']['port']
             self.id_number = self.config['server']['id_number']
@@ -74,22 +110,17 @@ class Server(ConnectionHandlerMixin,
         logger.info("Iniciando threads do servidor...")
         self._running = True
 
-        # Métodos _loop
-        thread_targets = {
-            "Listener": self._listen_loop,
-            "Heartbeat": self._heartbeat_loop,
-            # "Monitor": self._monitor_loop,
-            "LoadBalancer": self._load_balancer_loop,
-            "InternalProducer": self._internal_producer_loop,
-            "PerformanceReporter": self._performance_reporter_loop
-        }
+        # Só o listener tem thread própria; os loops viraram jobs do agendador
+        thread = threading.Thread(target=self._listen_loop, name="Listener", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info("Thread 'Listener' iniciada.")
 
-        for name, target in thread_targets.items():
+        self.scheduler.start()
+        self._schedule_background_jobs()
 
-            thread = threading.Thread(target=target, name=name, daemon=True)
-            thread.start()
-            self._threads.append(thread)
-            logger.info(f"Thread '{name}' iniciada.")
+        # Porta HTTP de métricas (só se 'metrics.http_port' estiver no config)
+        self._start_metrics_http()
 
         # Mantém a thread principal viva
         self._wait_for_shutdown()
@@ -97,8 +128,7 @@ class Server(ConnectionHandlerMixin,
     def _wait_for_shutdown(self):
         """Mantém o servidor rodando até receber um sinal de interrupção."""
         try:
-            while self._running:
-                time.sleep(1)
+            self._shutdown_event.wait() # Acordado por stop(), sem polling
         except KeyboardInterrupt:
             self.stop()
 
@@ -110,12 +140,44 @@ class Server(ConnectionHandlerMixin,
         logger.warning("Recebido sinal de encerramento...")
         self._running = False
 
+        # 0. Cancela os jobs agendados e acorda as threads do agendador
+        self.scheduler.stop()
+
+        # 0.1 Cancela o que ainda esperava nos executores (conexões na fila são fechadas)
+        for conn, _ in self.connection_pool.shutdown():
+            conn.close()
+        cancelled = len(self.outbound.shutdown())
+        if cancelled:
+            logger.info(f"{cancelled} operações de saída canceladas no shutdown.")
+
         # 1. Fecha o socket principal para desbloquear o .accept()
         try:
             if self.server_socket:
+                if hasattr(self.server_socket, 'shutdown'):
+                    try:
+                        self.server_socket.shutdown(socket.SHUT_RDWR) # No Linux, só close() não acorda o accept()
+                    except OSError:
+                        pass
                 self.server_socket.close()
                 logger.info("Socket do listener fechado.")
         except Exception as e:
             logger.error(f"Erro ao fechar socket do listener: {e}")
+
+        # 1.1 Para o HTTP de métricas
+        self._stop_metrics_http()
+
+        # 2. Grava o que ainda está no buffer do WAL
+        if self.task_log:
+            self.task_log.close()
+            logger.info("WAL da fila de tarefas fechado.")
+
+        # 2.1 Última tentativa de entregar os relatórios (o resto fica no spool)
+        if self.supervisor_sender:
+            self.supervisor_sender.close()
+
+        # 3. Resumo final dos logs amostrados e eventos pendentes
+        route_logger.flush()
+        events.close()
         
+        self._shutdown_event.set()
         logger.info("Servidor encerrado.")
\ No newline at end of file
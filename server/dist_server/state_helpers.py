@@ -1,9 +1,62 @@
 # dist_server/state_helpers.py
+import math
 import time
-from typing import Dict, List
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from logs.logger import logger
+from histogram import LatencyHistogram
+from .task_log import TaskLog
+from .records import WorkerRecord, PeerRecord, ReturnBatch, RedirectOrder, QueuedTask, InflightTask, intern_id
+from .eviction import StateEvictor
+from .result_cache import ResultCache, MISS
+from .coalescing import TaskCoalescer
+
+# Histogramas do ciclo de vida das tarefas
+TASK_LATENCY_STAGES = ("queue_wait", "execution", "end_to_end")
+
+
+def new_task_latency() -> Dict[str, LatencyHistogram]:
+    """Um histograma (memória fixa) por etapa: espera na fila, execução e tempo total."""
+    return {stage: LatencyHistogram() for stage in TASK_LATENCY_STAGES}
+
+
+def _is_time(value) -> bool:
+    """Tempos vindos da rede (EXEC_TIME, ENQUEUED_AT): só números finitos contam."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
 
 class StateHelpersMixin:
 
+    def _init_state(self, config: dict):
+        """
+        Cria o estado compartilhado pelos mixins (fazenda, peers, fila, em voo,
+        histogramas e caches). O Server chama no __init__; os dublês dos testes
+        e o microbench chamam o mesmo método, então um estado novo entra aqui só.
+        """
+        self.peer_status: Dict[str, PeerRecord] = {}
+        self.worker_status: Dict[str, WorkerRecord] = {}
+        self.active_peers: List[Dict] = list(config.get('peers', []))
+        self.redirect_queue: List[RedirectOrder] = []
+        self.completed_task_timestamps: List[float] = []
+
+        self.pending_returns: Dict[str, ReturnBatch] = {}
+        # TTL de workers sumidos, lotes de retorno e ordens (seção 'eviction')
+        self.evictor = StateEvictor(config.get('eviction'), now=time.time())
+
+        self.pending_release_attempts: Dict[str, float] = {}
+
+        self.task_queue: Deque[QueuedTask] = deque()
+        # Tarefas entregues a workers e ainda sem status (key: TASK_ID)
+        self.inflight_tasks: Dict[str, InflightTask] = {}
+        self.task_log = None # WAL opcional (seção 'persistence' do config)
+        # Histogramas de espera/execução/tempo total (zerados a cada relatório)
+        self.task_latency = new_task_latency()
+        # Resultados de QUERY por usuário (seção 'result_cache', desligado por padrão)
+        self.result_cache = ResultCache(config.get('result_cache'))
+        # Leituras iguais pendentes penduradas em uma só (seção 'coalescing', desligado por padrão)
+        self.coalescer = TaskCoalescer(config.get('coalescing'))
+
     def _record_task_completion(self, ts: float = None):
         """Registra a conclusão de uma tarefa (agora é um método)."""
         if ts is None:
@@ -27,6 +80,230 @@ class StateHelpersMixin:
          idle_threshold = self.config['load_balancing']['idle_worker_threshold']
          with self.lock:
              for wid, winfo in self.worker_status.items():
-                 if (now - winfo.get('last_seen', 0)) >= idle_threshold:
+                 if (now - winfo.last_seen) >= idle_threshold:
                      idle_candidates.append({'id': wid})
-         return idle_candidates
\ No newline at end of file
+         return idle_candidates
+
+    # --- FILA DE TAREFAS (com WAL opcional) ---
+
+    def _init_task_log(self):
+        """
+        Se 'persistence.enabled', reconstrói a fila/em voo a partir do WAL
+        e abre o log para os próximos eventos.
+        """
+        config_persist = self.config.get('persistence', {})
+        if not config_persist.get('enabled', False):
+            return
+
+        wal_path = config_persist.get('wal_path', f"logs/{self.id}_tasks.wal")
+        queue, inflight = TaskLog.replay(wal_path)
+        self._restore_tasks(queue, inflight)
+
+        self.task_log = TaskLog(
+            wal_path,
+            fsync_batch=config_persist.get('fsync_batch', 128),
+            fsync_interval=config_persist.get('fsync_interval_ms', 20) / 1000,
+            checkpoint_every=config_persist.get('checkpoint_every', 50000)
+        )
+        # Começa um segmento novo já com o estado recuperado
+        with self.lock:
+            self.task_log.checkpoint(self.task_queue, self.inflight_tasks)
+        logger.success(f"[WAL] Fila recuperada de {wal_path}: {len(queue)} tarefas na fila, {len(inflight)} em voo.")
+
+    def _restore_tasks(self, queue: List[Dict], inflight: Dict[str, Dict]):
+        """Converte a fila/em voo do replay (dicts do WAL) em registros compactos."""
+        self.task_queue.extend(QueuedTask.from_wire(task) for task in queue)
+        for task_id, info in inflight.items():
+            self.inflight_tasks[task_id] = InflightTask.from_wire(info)
+
+    def _maybe_checkpoint(self):
+        """Chamado com self.lock: grava um checkpoint se o log já cresceu o bastante."""
+        if self.task_log and self.task_log.needs_checkpoint():
+            queue = self.task_queue
+            if self.coalescer.waiting:
+                # Penduradas não estão na fila, mas precisam sobreviver ao restart
+                queue = list(queue) + self.coalescer.followers()
+            self.task_log.checkpoint(queue, self.inflight_tasks)
+
+    def _enqueue_tasks(self, tasks: List[Dict], front: bool = False, capacity: int = None) -> int:
+        """
+        Coloca tarefas (dicts do protocolo) na fila, no fim ou no início se 'front'.
+        Garante que cada tarefa tenha TASK_ID e ENQUEUED_AT, guarda como QueuedTask
+        e registra no WAL.
+        Tarefas devolvidas (HANDBACK) mantêm o ENQUEUED_AT original.
+        Com 'capacity', só enfileira o que couber (checado sob o mesmo lock).
+        Consultas com resultado em cache são concluídas aqui mesmo e leituras iguais
+        a uma que já está na fila ficam penduradas nela (nenhuma das duas ocupa a fila).
+        Retorna quantas tarefas foram aceitas (enfileiradas, agrupadas ou servidas
+        do cache), sempre um prefixo de 'tasks'.
+        """
+        now = time.time()
+        for task in tasks:
+            if "TASK_ID" not in task:
+                task["TASK_ID"] = uuid.uuid4().hex
+            if "ENQUEUED_AT" not in task:
+                task["ENQUEUED_AT"] = now
+        tasks = [QueuedTask.from_wire(task) for task in tasks] # A fila guarda o registro compacto
+        accepted = 0
+        cached = 0
+        with self.lock:
+            room = None if capacity is None else capacity - len(self.task_queue)
+            to_queue = []
+            coalesced = []
+            for task in tasks:
+                # HANDBACK (front) ainda está em voo: volta para a fila e o cache é
+                # consultado no _dequeue_task, que tira o 'em voo' e grava o DONE
+                if not front and self.result_cache.lookup(task, now) is not MISS:
+                    cached += self._complete_from_cache_locked(task, now)
+                elif not front and self.coalescer.attach(task):
+                    coalesced.append(task)
+                elif room is not None and len(to_queue) >= room:
+                    break
+                else:
+                    to_queue.append(task)
+                    self.coalescer.queued(task)
+                accepted += 1
+            if to_queue:
+                self._enqueue_locked(to_queue, front)
+            if coalesced and self.task_log:
+                # Penduradas vão ao WAL como tarefas comuns (voltam para a fila num restart)
+                self.task_log.append({"EV": "ENQ", "TASKS": [task.to_wire() for task in coalesced], "FRONT": False})
+                self._maybe_checkpoint()
+        if cached:
+            self.metrics.inc("tasks_cache_hit", cached)
+        if coalesced:
+            self.metrics.inc("tasks_coalesced", len(coalesced))
+        return accepted
+
+    def _enqueue_locked(self, tasks: List[QueuedTask], front: bool):
+        """Chamado com self.lock: insere na fila (deque) e registra o ENQ no WAL."""
+        if front:
+            self.task_queue.extendleft(reversed(tasks))
+            for task in tasks:
+                self.inflight_tasks.pop(task.task_id, None)
+        else:
+            self.task_queue.extend(tasks)
+        if self.task_log:
+            self.task_log.append({"EV": "ENQ", "TASKS": [task.to_wire() for task in tasks], "FRONT": front})
+            self._maybe_checkpoint()
+
+    def _requeue_stale_inflight(self, timeout: float, now: float = None) -> int:
+        """
+        Devolve para o início da fila as tarefas em voo há mais de 'timeout'
+        segundos sem status (worker morto, ou entrada recuperada do WAL após
+        um restart). No WAL fica um ENQ com FRONT, como no HANDBACK.
+        Um status atrasado dessas tarefas não é perdido, mas a tarefa pode
+        rodar de novo (entrega "pelo menos uma vez").
+        Retorna quantas tarefas voltaram para a fila.
+        """
+        if now is None:
+            now = time.time()
+        with self.lock:
+            stale = [info.task for info in self.inflight_tasks.values()
+                     if now - info.dispatched_at > timeout]
+            if stale:
+                self._enqueue_locked(stale, front=True)
+                for task in stale:
+                    self.coalescer.queued(task) # As penduradas continuam presas ao TASK_ID
+        return len(stale)
+
+    def _dequeue_task(self, worker_id: str) -> Optional[Dict]:
+        """
+        Retira a próxima tarefa da fila, registra como 'em voo' para o worker
+        e devolve o dict do protocolo (montado só agora, para o envio).
+        Consultas que ganharam resultado em cache enquanto esperavam são
+        concluídas aqui, sem ir ao worker, e a próxima da fila é considerada.
+        """
+        task = None
+        cached = 0
+        with self.lock:
+            now = time.time()
+            while self.task_queue:
+                candidate = self.task_queue.popleft() # Pega a primeira
+                self.coalescer.dequeued(candidate)
+                if self.result_cache.lookup(candidate, now) is MISS:
+                    task = candidate
+                    break
+                if self.task_log:
+                    self.task_log.append({"EV": "DONE", "ID": candidate.task_id, "STATUS": "OK"})
+                cached += self._complete_from_cache_locked(candidate, now)
+            if task is not None or cached:
+                self.queue_space.notify_all()
+            if task is not None:
+                if _is_time(task.enqueued_at):
+                    self.task_latency["queue_wait"].record(max(0.0, now - task.enqueued_at))
+                worker_id = intern_id(worker_id)
+                self.inflight_tasks[task.task_id] = InflightTask(task, worker_id, now)
+                if self.task_log:
+                    self.task_log.append({"EV": "DSP", "ID": task.task_id, "WORKER": worker_id, "TS": now})
+            if self.task_log and (task is not None or cached):
+                self._maybe_checkpoint()
+        if cached:
+            self.metrics.inc("tasks_cache_hit", cached)
+        return task.to_wire() if task is not None else None
+
+    def _complete_from_cache_locked(self, task: QueuedTask, now: float) -> int:
+        """
+        Chamado com self.lock: conclui uma consulta com o resultado em cache
+        (sem ida ao worker), junto com as leituras penduradas nela.
+        Retorna quantas tarefas foram concluídas.
+        """
+        if _is_time(task.enqueued_at):
+            waited = max(0.0, now - task.enqueued_at)
+            self.task_latency["queue_wait"].record(waited)
+            self.task_latency["end_to_end"].record(waited)
+        self.completed_task_timestamps.append(now)
+        return 1 + self._fan_out_locked(task.task_id, "OK", now)
+
+    def _fan_out_locked(self, task_id: str, status: str, now: float) -> int:
+        """
+        Chamado com self.lock: a primária terminou; o mesmo status conclui as
+        leituras penduradas nela (tempo total no histograma, DONE no WAL).
+        Retorna quantas foram concluídas.
+        """
+        followers = self.coalescer.take_followers(task_id)
+        for follower in followers:
+            if _is_time(follower.enqueued_at):
+                self.task_latency["end_to_end"].record(max(0.0, now - follower.enqueued_at))
+            self.completed_task_timestamps.append(now)
+            if self.task_log:
+                self.task_log.append({"EV": "DONE", "ID": follower.task_id, "STATUS": status})
+        return len(followers)
+
+    def _complete_task(self, worker_id: str, status: str, task_id: str = None, exec_time: float = None) -> Optional[InflightTask]:
+        """
+        Remove a tarefa da tabela 'em voo' ao receber o status do worker.
+        Workers antigos não mandam TASK_ID: usa a tarefa mais antiga em voo desse worker.
+        Registra o tempo de execução (EXEC_TIME do worker, se numérico) e o tempo total
+        (ENQUEUED_AT -> status) nos histogramas.
+        O status alimenta o cache de consultas e conclui também as leituras
+        penduradas na tarefa (agrupamento).
+        Retorna o registro em voo (ou None se não foi encontrado).
+        """
+        fanned_out = 0
+        with self.lock:
+            if task_id is None:
+                for candidate_id, info in self.inflight_tasks.items():
+                    if info.worker_id == worker_id:
+                        task_id = candidate_id
+                        break
+            if task_id is None:
+                return None
+
+            record = self.inflight_tasks.pop(task_id, None)
+            # EXEC_TIME vem do worker: valor não numérico é ignorado (não derruba o ACK)
+            if _is_time(exec_time):
+                self.task_latency["execution"].record(max(0.0, float(exec_time)))
+            now = time.time()
+            enqueued_at = record.task.enqueued_at if record else None
+            if _is_time(enqueued_at):
+                self.task_latency["end_to_end"].record(max(0.0, now - enqueued_at))
+            if record:
+                self.result_cache.task_completed(record.task, status, record.dispatched_at, now)
+                fanned_out = self._fan_out_locked(task_id, status, now)
+            if self.task_log:
+                self.task_log.append({"EV": "DONE", "ID": task_id, "STATUS": status})
+                self._maybe_checkpoint()
+        if fanned_out:
+            self.metrics.inc("tasks_fanned_out", fanned_out)
+        return record
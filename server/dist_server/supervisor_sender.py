@@ -0,0 +1,231 @@
+# dist_server/supervisor_sender.py
+import os
+import json
+import time
+import threading
+from collections import deque
+from logs.logger import logger
+
+
+class SupervisorSender:
+    """
+    Entrega assíncrona dos relatórios ao supervisor.
+
+    - submit() só coloca o relatório em uma fila limitada (não bloqueia o reporter).
+    - Uma thread escritora mantém UMA conexão aberta e manda os relatórios
+      pendentes em lote (várias linhas JSON em um único sendall).
+    - Se o supervisor estiver fora, o lote vai para um spool em disco
+      (JSON lines, até 'spool_max_bytes'; acima disso os mais antigos são
+      descartados). Quando a conexão volta, o spool é reenviado em ordem,
+      antes dos relatórios novos. As reconexões usam backoff exponencial.
+    - 'delta': seções de 'performance' iguais às do último relatório enviado
+      nesta conexão são omitidas e listadas em performance.unchanged.
+      A cada 'delta_full_every' relatórios (e após reconectar) vai um completo.
+      O spool guarda sempre o relatório completo.
+
+    O TCP pode aceitar uma escrita depois que o supervisor caiu; o erro só
+    aparece na escrita seguinte. Por isso, no pior caso, um lote por queda
+    se perde (o seguinte já vai para o spool).
+    """
+
+    def __init__(self, transport, host: str, port: int, spool_path: str = None, max_batch: int = 50,
+                 max_pending: int = 1000, spool_max_bytes: int = 16 * 1024 * 1024, connect_timeout: float = 2,
+                 retry_base: float = 1, retry_max: float = 60, delta: bool = False, delta_full_every: int = 10):
+        self.transport = transport
+        self.host = host
+        self.port = port
+        self.spool_path = spool_path
+        self.max_batch = max(1, max_batch)
+        self.spool_max_bytes = spool_max_bytes
+        self.connect_timeout = connect_timeout
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.delta = delta
+        self.delta_full_every = max(1, delta_full_every)
+
+        self.sent = 0          # relatórios entregues ao socket
+        self.spooled = 0       # relatórios que passaram pelo spool
+        self.dropped = 0       # descartados (fila ou spool cheios)
+
+        self._pending = deque()
+        self._max_pending = max(1, max_pending)
+        self._cond = threading.Condition()
+        self._conn = None
+        self._last_sections = None
+        self._since_full = 0
+        self._retry_delay = 0.0
+        self._next_attempt = 0.0
+        self._closed = False
+
+        if spool_path:
+            directory = os.path.dirname(spool_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._writer = threading.Thread(target=self._writer_loop, name="SupervisorSender", daemon=True)
+        self._writer.start()
+
+    def submit(self, payload: dict) -> bool:
+        """Enfileira um relatório. Retorna False se a fila estava cheia (o mais antigo foi descartado)."""
+        with self._cond:
+            if self._closed:
+                return False
+            accepted = len(self._pending) < self._max_pending
+            if not accepted:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(payload)
+            self._cond.notify()
+        return accepted
+
+    # --- Thread escritora ---
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and (not self._pending or time.monotonic() < self._next_attempt):
+                    timeout = None if not self._pending else max(0.0, self._next_attempt - time.monotonic())
+                    self._cond.wait(timeout=timeout)
+                closing = self._closed
+                batch = list(self._pending)
+                self._pending.clear()
+
+            if batch:
+                self._deliver(batch)
+
+            if closing:
+                # Última tentativa feita: o que sobrou no buffer vai para o spool
+                with self._cond:
+                    leftover = list(self._pending)
+                    self._pending.clear()
+                if leftover:
+                    self._spool(leftover)
+                self._disconnect()
+                return
+
+    def _deliver(self, batch: list):
+        """Reenvia o spool (em ordem) e depois o lote; em falha, o que faltou vai para o spool."""
+        done = 0
+        try:
+            self._ensure_connected()
+            self._replay_spool()
+            while done < len(batch):
+                chunk = batch[done:done + self.max_batch]
+                self._send_lines([self._encode(payload) for payload in chunk])
+                done += len(chunk)
+                self.sent += len(chunk)
+            self._retry_delay = 0.0
+        except Exception as e:
+            self._disconnect()
+            remaining = batch[done:]
+            self._retry_delay = min(self.retry_max, max(self.retry_base, self._retry_delay * 2))
+            self._next_attempt = time.monotonic() + self._retry_delay
+            logger.warning(f"[REPORT] Supervisor {self.host}:{self.port} indisponível ({e}). "
+                           f"{len(remaining)} relatórios para o spool; nova tentativa em {self._retry_delay:.0f}s.")
+            self._spool(remaining)
+
+    # --- Conexão persistente ---
+
+    def _ensure_connected(self):
+        if self._conn is None:
+            self._conn = self.transport.connect(self.host, self.port, timeout=self.connect_timeout)
+            self._last_sections = None # Supervisor novo/reiniciado: o próximo relatório vai completo
+            logger.info(f"[REPORT] Conectado ao supervisor {self.host}:{self.port}.")
+
+    def _send_lines(self, lines: list):
+        self._conn.sendall(('\n'.join(lines) + '\n').encode('utf-8'))
+
+    def _disconnect(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    # --- Delta ---
+
+    def _encode(self, payload: dict) -> str:
+        sections = payload.get("performance")
+        if not self.delta or not isinstance(sections, dict):
+            return json.dumps(payload)
+
+        last = self._last_sections
+        self._last_sections = sections
+        if last is None or self._since_full + 1 >= self.delta_full_every:
+            self._since_full = 0
+            return json.dumps(payload)
+
+        self._since_full += 1
+        unchanged = [key for key, value in sections.items() if last.get(key) == value]
+        performance = {key: value for key, value in sections.items() if key not in unchanged}
+        performance["unchanged"] = unchanged
+        return json.dumps({**payload, "performance": performance})
+
+    # --- Spool em disco ---
+
+    def _spool(self, payloads: list):
+        if not payloads:
+            return
+        if not self.spool_path:
+            self.dropped += len(payloads)
+            return
+        try:
+            with open(self.spool_path, 'a', encoding='utf-8') as f:
+                for payload in payloads:
+                    f.write(json.dumps(payload) + '\n')
+            self.spooled += len(payloads)
+            if os.path.getsize(self.spool_path) > self.spool_max_bytes:
+                self._trim_spool()
+        except (OSError, TypeError, ValueError) as e:
+            self.dropped += len(payloads)
+            logger.error(f"[REPORT] Erro ao gravar o spool {self.spool_path}: {e}")
+
+    def _trim_spool(self):
+        """Descarta os relatórios mais antigos até o spool caber em 'spool_max_bytes'."""
+        with open(self.spool_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        total = sum(len(line.encode('utf-8')) for line in lines)
+        start = 0
+        while start < len(lines) and total > self.spool_max_bytes:
+            total -= len(lines[start].encode('utf-8'))
+            start += 1
+        self.dropped += start
+        self._rewrite_spool(lines[start:])
+        logger.warning(f"[REPORT] Spool cheio: {start} relatórios mais antigos descartados.")
+
+    def _rewrite_spool(self, lines: list):
+        tmp_path = self.spool_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.spool_path)
+
+    def _replay_spool(self):
+        """Reenvia o spool em ordem; em falha, regrava só o que não foi enviado."""
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return
+        with open(self.spool_path, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.strip()]
+        done = 0
+        try:
+            while done < len(lines):
+                chunk = lines[done:done + self.max_batch]
+                self._send_lines([line.rstrip('\n') for line in chunk])
+                done += len(chunk)
+                self.sent += len(chunk)
+        except Exception:
+            self._rewrite_spool(lines[done:])
+            raise
+        os.remove(self.spool_path)
+        self._last_sections = None # O supervisor recebeu relatórios completos fora da sequência do delta
+        if lines:
+            logger.success(f"[REPORT] {len(lines)} relatórios do spool reenviados ao supervisor.")
+
+    def close(self, timeout: float = 5):
+        """Última tentativa de envio; o que não sair vai para o spool."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join(timeout=timeout)
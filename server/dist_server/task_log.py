@@ -0,0 +1,278 @@
+# dist_server/task_log.py
+import os
+import glob
+import json
+import mmap
+import threading
+import time
+from collections import deque
+from logs.logger import logger
+
+
+class TaskLog:
+    """
+    Write-ahead log (JSON lines, append-only) da fila de tarefas.
+
+    Eventos (uma linha cada):
+      {"EV": "ENQ",  "TASKS": [...], "FRONT": false}   -> tarefas entraram na fila
+      {"EV": "DSP",  "ID": "...", "WORKER": "..."}     -> tarefa entregue a um worker
+      {"EV": "DONE", "ID": "...", "STATUS": "OK"}      -> tarefa concluída
+
+    - Group commit: append() só coloca a linha no buffer; uma thread escritora
+      grava o lote e faz um único fsync a cada 'fsync_batch' eventos ou
+      'fsync_interval' segundos (o que vier primeiro).
+    - Checkpoint: a cada 'checkpoint_every' eventos o estado completo
+      (fila + em voo) é gravado em '<path>.ckpt' e o log segue em um novo
+      segmento '<path>.<n>'. Segmentos anteriores ao checkpoint são apagados,
+      então o restart só relê o que veio depois do último checkpoint.
+    """
+
+    def __init__(self, path: str, fsync_batch: int = 128, fsync_interval: float = 0.02, checkpoint_every: int = 50000):
+        self.path = path
+        self.fsync_batch = max(1, fsync_batch)
+        self.fsync_interval = fsync_interval
+        self.checkpoint_every = checkpoint_every
+
+        self._pending = []            # linhas (bytes) ou marcadores de checkpoint ainda não gravados
+        self._cond = threading.Condition()
+        self._appended_seq = 0        # último evento colocado no buffer
+        self._durable_seq = 0         # último evento gravado + fsync
+        self._events_since_checkpoint = 0
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._segment = self._last_segment() + 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+
+        self._writer = threading.Thread(target=self._writer_loop, name="TaskLogWriter", daemon=True)
+        self._writer.start()
+
+    # --- Segmentos ---
+
+    def _segment_path(self, segment: int) -> str:
+        return f"{self.path}.{segment:06d}"
+
+    def _list_segments(self) -> list:
+        segments = []
+        for seg_path in glob.glob(f"{glob.escape(self.path)}.[0-9]*"):
+            suffix = seg_path.rsplit('.', 1)[-1]
+            if suffix.isdigit():
+                segments.append(int(suffix))
+        return sorted(segments)
+
+    def _last_segment(self) -> int:
+        segments = self._list_segments()
+        return segments[-1] if segments else 0
+
+    # --- Escrita ---
+
+    def append(self, event: dict, wait: bool = False):
+        """
+        Registra um evento. Não bloqueia, a não ser que 'wait' seja True
+        (aí só retorna depois do fsync do lote que contém o evento).
+        """
+        line = (json.dumps(event, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._cond:
+            if self._closed:
+                return
+            self._pending.append(line)
+            self._appended_seq += 1
+            self._events_since_checkpoint += 1
+            seq = self._appended_seq
+            if len(self._pending) >= self.fsync_batch:
+                self._cond.notify_all()
+
+            if wait:
+                while self._durable_seq < seq and not self._closed:
+                    self._cond.wait(timeout=1.0)
+
+    def needs_checkpoint(self) -> bool:
+        return self._events_since_checkpoint >= self.checkpoint_every
+
+    def checkpoint(self, queue: list, inflight: dict):
+        """
+        Agenda um checkpoint com o estado atual.
+        Deve ser chamado com o lock do servidor, logo após o último append():
+        assim o estado corresponde exatamente aos eventos já no buffer.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._pending.append(('CHECKPOINT', list(queue), dict(inflight)))
+            self._events_since_checkpoint = 0
+            self._cond.notify_all()
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.fsync_interval
+                while not self._closed and len(self._pending) < self.fsync_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+
+                batch = self._pending
+                self._pending = []
+                batch_seq = self._appended_seq
+                closing = self._closed
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    logger.error(f"[WAL] Erro ao gravar lote de {len(batch)} eventos: {e}")
+
+            with self._cond:
+                self._durable_seq = batch_seq
+                self._cond.notify_all()
+
+            if closing:
+                return
+
+    def _write_batch(self, batch: list):
+        """Grava um lote; marcadores de checkpoint trocam de segmento."""
+        lines = []
+        for item in batch:
+            if isinstance(item, tuple):
+                if lines:
+                    self._file.write(b''.join(lines))
+                    lines = []
+                _, queue, inflight = item
+                self._rotate(queue, inflight)
+            else:
+                lines.append(item)
+        if lines:
+            self._file.write(b''.join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _rotate(self, queue: list, inflight: dict):
+        """Grava o checkpoint (atomicamente) e passa a escrever em um novo segmento."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+        next_segment = self._segment + 1
+        snapshot = {"SEGMENT": next_segment, "QUEUE": queue, "INFLIGHT": inflight}
+        tmp_path = f"{self.path}.ckpt.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Registros da fila/em voo (QueuedTask, InflightTask) viram dict só aqui
+            json.dump(snapshot, f, separators=(',', ':'), default=lambda record: record.to_wire())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, f"{self.path}.ckpt")
+
+        self._segment = next_segment
+        self._file = open(self._segment_path(self._segment), 'ab')
+
+        # Segmentos antigos já estão cobertos pelo checkpoint
+        for old in self._list_segments():
+            if old < self._segment:
+                try:
+                    os.remove(self._segment_path(old))
+                except OSError:
+                    pass
+        logger.info(f"[WAL] Checkpoint gravado ({len(queue)} na fila, {len(inflight)} em voo). Segmento {self._segment}.")
+
+    def close(self):
+        """Grava o que falta e fecha o arquivo."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join(timeout=10)
+        try:
+            self._file.close()
+        except Exception:
+            pass
+
+    # --- Leitura (restart) ---
+
+    @staticmethod
+    def replay(path: str):
+        """
+        Reconstrói (fila, em_voo) a partir do último checkpoint + segmentos seguintes.
+        - fila: lista de tarefas na ordem de entrega.
+        - em_voo: dict TASK_ID -> {'task', 'worker_id', 'dispatched_at'}.
+        Os segmentos são lidos com mmap, linha a linha; uma última linha
+        incompleta (crash no meio da escrita) é ignorada.
+        """
+        tasks = {}         # TASK_ID -> tarefa ainda na fila
+        order = deque()    # ordem dos ids (pode ter ids já despachados; filtrados no final)
+        inflight = {}
+        first_segment = 0
+
+        ckpt_path = f"{path}.ckpt"
+        if os.path.exists(ckpt_path):
+            with open(ckpt_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            first_segment = snapshot.get("SEGMENT", 0)
+            for task in snapshot.get("QUEUE", []):
+                tasks[task["TASK_ID"]] = task
+                order.append(task["TASK_ID"])
+            inflight.update(snapshot.get("INFLIGHT", {}))
+
+        segments = []
+        for seg_path in glob.glob(f"{glob.escape(path)}.[0-9]*"):
+            suffix = seg_path.rsplit('.', 1)[-1]
+            if suffix.isdigit() and int(suffix) >= first_segment:
+                segments.append((int(suffix), seg_path))
+
+        events = 0
+        for _, seg_path in sorted(segments):
+            if os.path.getsize(seg_path) == 0:
+                continue
+            with open(seg_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = 0
+                size = len(mm)
+                while pos < size:
+                    end = mm.find(b'\n', pos)
+                    if end == -1:
+                        logger.warning(f"[WAL] Linha incompleta no fim de {seg_path}. Ignorando.")
+                        break
+                    line = mm[pos:end]
+                    pos = end + 1
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"[WAL] Linha corrompida em {seg_path}. Ignorando.")
+                        continue
+                    events += 1
+
+                    ev = event.get("EV")
+                    if ev == "ENQ":
+                        batch = event.get("TASKS", [])
+                        for task in batch:
+                            tasks[task["TASK_ID"]] = task
+                            inflight.pop(task["TASK_ID"], None)
+                        ids = [task["TASK_ID"] for task in batch]
+                        if event.get("FRONT"):
+                            order.extendleft(reversed(ids))
+                        else:
+                            order.extend(ids)
+                    elif ev == "DSP":
+                        task = tasks.pop(event["ID"], None)
+                        if task is not None:
+                            inflight[event["ID"]] = {
+                                'task': task,
+                                'worker_id': event.get("WORKER"),
+                                'dispatched_at': event.get("TS", 0)
+                            }
+                    elif ev == "DONE":
+                        tasks.pop(event["ID"], None)
+                        inflight.pop(event["ID"], None)
+
+        queue = []
+        seen = set()
+        for task_id in order:
+            if task_id in tasks and task_id not in seen:
+                seen.add(task_id)
+                queue.append(tasks[task_id])
+
+        logger.info(f"[WAL] Replay: {events} eventos desde o checkpoint -> {len(queue)} na fila, {len(inflight)} em voo.")
+        return queue, inflight
@@ -0,0 +1,39 @@
+# server/submit_tasks.py
+import sys
+import json
+import socket
+import argparse
+
+from logs.logger import logger
+from payload_models import task_submit
+from .dist_server.ingestion import iter_task_file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Envia um arquivo JSON lines de tarefas para um servidor (SUBMIT em stream).")
+    parser.add_argument("path", help="Arquivo JSON lines; cada linha precisa de 'USER' (e opcionalmente 'TASK').")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--batch", type=int, default=500, help="Tarefas por linha enviada.")
+    args = parser.parse_args()
+
+    sent = 0
+    try:
+        with socket.create_connection((args.host, args.port), timeout=30) as s:
+            writer = s.makefile('w', encoding='utf-8')
+            reader = s.makefile('r', encoding='utf-8')
+
+            # Abre o stream e manda os lotes conforme vão sendo lidos do arquivo.
+            # Com backpressure 'block' o servidor para de ler e o sendall trava aqui.
+            writer.write(json.dumps(task_submit([], stream=True)) + '\n')
+            for batch in iter_task_file(args.path, batch_size=args.batch):
+                writer.write(json.dumps({"TASKS": batch}) + '\n')
+                sent += len(batch)
+            writer.write(json.dumps({"END": True}) + '\n')
+            writer.flush()
+
+            response = json.loads(reader.readline())
+    except Exception as e:
+        logger.critical(f"Falha ao enviar tarefas para {args.host}:{args.port}: {e}")
+        sys.exit(1)
+
+    logger.success(f"{sent} tarefas enviadas: {response.get('ACCEPTED')} aceitas, {response.get('REJECTED')} recusadas. Fila: {response.get('QUEUE_SIZE')}.")
@@ -0,0 +1,19 @@
+import threading
+
+from server.dist_server.state_helpers import StateHelpersMixin
+from server.dist_server.metrics import ServerMetrics
+
+
+def init_server_state(server, config: dict = None, lock=None):
+    """
+    Prepara um dublê de servidor (classe com alguns mixins, ou Server.__new__)
+    com o mesmo estado do Server.__init__ (StateHelpersMixin._init_state),
+    mais lock, queue_space e métricas. Cada teste só ajusta o que usa.
+    """
+    if config is not None:
+        server.config = config
+    StateHelpersMixin._init_state(server, getattr(server, 'config', None) or {})
+    server.lock = lock if lock is not None else threading.Lock()
+    server.queue_space = threading.Condition(server.lock)
+    server.metrics = ServerMetrics()
+    return server
@@ -1,13 +1,18 @@
 import unittest
 import time
-from unittest.mock import Mock, patch, call # Ferramentas de Mock
+from unittest.mock import Mock # Ferramentas de Mock
 
 from server.dist_server.background_tasks import BackgroundTasksMixin
+from server.dist_server.client_actions import ClientActionsMixin
+from server.dist_server.scheduler import Scheduler, ManualClock
+from server.dist_server.executor import InlineExecutor
+from server.dist_server.records import WorkerRecord, OrderKind
+from test.server_state import init_server_state
 
 # 1. Classe Falsa
 # Precisamos de um objeto 'self' para o Mixin.
 # Criamos uma classe de teste que "usa" o Mixin.
-class DummyServerForTest(BackgroundTasksMixin):
+class DummyServerForTest(BackgroundTasksMixin, ClientActionsMixin):
     # O Mixin precisa de 'self.lock', 'self.pending_release_attempts', etc.
     # Nós os "simulamos" (Mock) no próprio teste.
     pass
@@ -23,21 +28,25 @@ class TestBackoffLogic(unittest.TestCase):
         self.server = DummyServerForTest()
         
         # Simula os atributos de estado que o método precisa
-        self.server.lock = unittest.mock.MagicMock() # Finge ser um lock
-        self.server.pending_release_attempts = {}
-        self.server.worker_status = {'w1': {}, 'w2': {}} # Adiciona workers
-        self.server.redirect_queue = []
+        init_server_state(self.server, lock=unittest.mock.MagicMock()) # Finge ser um lock
+        self.server.worker_status = {'w1': WorkerRecord(addr=None, last_seen=0), 'w2': WorkerRecord(addr=None, last_seen=0)} # Adiciona workers
+
+        # Agendador com relógio virtual: as retentativas são timers,
+        # e o teste anda no tempo com advance() (sem dormir).
+        self.clock = ManualClock()
+        self.server.scheduler = Scheduler(clock=self.clock)
+        # Executor de saída que roda na hora (a tentativa acontece dentro do advance)
+        self.server.outbound = InlineExecutor()
         
         # MOCK (Dublê) para a função de rede.
         # Nós controlamos o que ela faz.
         self.server._send_command_release = Mock(name="_send_command_release")
 
 
-    @patch('time.sleep') # <-- Mágica: "Duble" a função 'time.sleep'
-    def test_backoff_path_failure(self, mock_sleep):
+    def test_backoff_path_failure(self):
         """
         Testa o "caminho triste":
-        _send_command_release falha 5x e o backoff é chamado.
+        _send_command_release falha 5x e cada retentativa é agendada com backoff.
         """
         # 1. Prepara (Arrange)
         # Dizemos ao nosso dublê de rede para SEMPRE retornar False
@@ -45,32 +54,32 @@ class TestBackoffLogic(unittest.TestCase):
         
         peer = {'id': 'S2', 'ip': '1.2.3.4', 'port': 9002}
         worker_list = [{'id': 'w1'}, {'id': 'w2'}]
+        attempt_times = []
+        self.server._send_command_release.side_effect = lambda *a: attempt_times.append(self.clock()) or False
         
         # 2. Age (Act)
-        # Chamamos a função que queremos testar
+        # Primeira tentativa na hora; as outras só quando o relógio andar
         self.server._handle_release_with_backoff(peer, worker_list)
+        first_only = self.server._send_command_release.call_count
+        self.server.scheduler.advance(120)
         
         # 3. Verifica (Assert)
+        self.assertEqual(first_only, 1)
         
         # Verificamos se a rede foi chamada 5 vezes (max_retries)
         self.assertEqual(self.server._send_command_release.call_count, 5)
         
-        # Verificamos se o 'time.sleep' foi chamado com os delays certos
-        # (5s, 10s, 20s, 40s)
-        expected_sleeps = [
-            call(5),  # (2**0) * 5
-            call(10), # (2**1) * 5
-            call(20), # (2**2) * 5
-            call(30)  # Atinge o máximo de 30
-        ]
-        self.assertEqual(mock_sleep.call_args_list, expected_sleeps)
+        # Verificamos os intervalos entre as tentativas
+        # (5s, 10s, 20s e o máximo de 30s)
+        gaps = [b - a for a, b in zip(attempt_times, attempt_times[1:])]
+        self.assertEqual(gaps, [5, 10, 20, 30])
         
-        # Verificamos se o estado foi limpo no final
+        # Verificamos se o estado foi limpo no final e nada ficou agendado
         self.assertEqual(self.server.pending_release_attempts, {})
+        self.assertEqual(self.server.scheduler.pending(), 0)
 
 
-    @patch('time.sleep') # O Mock é necessário mesmo que não o usemos
-    def test_backoff_path_success(self, mock_sleep):
+    def test_backoff_path_success(self):
         """
         Testa o "caminho feliz":
         _send_command_release funciona na primeira tentativa.
@@ -91,12 +100,14 @@ class TestBackoffLogic(unittest.TestCase):
         # Verificamos se a rede foi chamada apenas 1 vez
         self.server._send_command_release.assert_called_once()
         
-        # Verificamos se o time.sleep NÃO foi chamado
-        mock_sleep.assert_not_called()
+        # Verificamos que nenhuma retentativa foi agendada
+        self.assertEqual(self.server.scheduler.pending(), 0)
         
         # Verificamos se a devolução foi agendada
         self.assertEqual(len(self.server.redirect_queue), 1)
-        self.assertEqual(self.server.redirect_queue[0]['worker_id'], 'w1')
+        self.assertEqual(self.server.redirect_queue[0].worker_id, 'w1')
+        self.assertEqual(self.server.redirect_queue[0].kind, OrderKind.RETURN)
+        self.assertTrue(self.server.worker_status['w1'].release_notified)
         
         # Verificamos se o estado foi limpo
         self.assertEqual(self.server.pending_release_attempts, {})
@@ -0,0 +1,43 @@
+import unittest
+
+from bench.cluster_bench import _borrowing_metrics, _plan
+
+
+class TestClusterBench(unittest.TestCase):
+
+    def test_borrowing_convergence(self):
+        """
+        Testa as medidas de empréstimo: primeiro emprestado, 90% do pico
+        e (no mass_return) o tempo até todos voltarem para casa.
+        """
+        # 1. Prepara: pico de 10 emprestados; carga termina em t=10
+        timeline = [(0, 0), (2, 0), (3, 2), (4, 6), (5, 9), (6, 10), (10, 10), (11, 4), (13, 0)]
+
+        # 2. Age
+        burst = _borrowing_metrics(timeline, trigger=2, scenario="burst")
+        mass_return = _borrowing_metrics(timeline, trigger=10, scenario="mass_return")
+
+        # 3. Verifica
+        self.assertEqual(burst["peak_borrowed"], 10)
+        self.assertEqual(burst["first_borrow_s"], 1)
+        self.assertEqual(burst["convergence_s"], 3)
+        self.assertEqual(mass_return["return_s"], 3)
+
+    def test_scenario_plans(self):
+        """
+        Testa se os cenários apontam o pico e o crash para os servidores certos.
+        """
+        # 1. Prepara / 2. Age
+        burst = _plan("burst", servers=3, rate=100, duration=30)
+        crash = _plan("peer_crash", servers=3, rate=100, duration=30)
+
+        # 3. Verifica
+        self.assertEqual(burst["phases"][1]["targets"], [0])
+        self.assertEqual(burst["trigger"], 10)
+        self.assertEqual(crash["events"], [{"at": 15, "kill": "server2"}])
+        with self.assertRaises(ValueError):
+            _plan("unknown", servers=2, rate=1, duration=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
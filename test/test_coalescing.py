@@ -0,0 +1,67 @@
+import unittest
+
+from server.dist_server.state_helpers import StateHelpersMixin
+from test.server_state import init_server_state
+
+
+class DummyServer(StateHelpersMixin):
+    def __init__(self):
+        init_server_state(self, config={'coalescing': {'enabled': True}})
+
+
+class TestCoalescing(unittest.TestCase):
+
+    def test_duplicates_share_one_execution(self):
+        """
+        Testa o agrupamento: leituras iguais ficam penduradas na primeira da
+        fila (não ocupam a fila) e o status dela conclui todas. Depois que a
+        primária sai da fila, uma leitura nova forma outro grupo.
+        """
+        # 1. Prepara
+        server = DummyServer()
+        tasks = [{"TASK": "QUERY", "USER": "Arthur"} for _ in range(5)] + [{"TASK": "QUERY", "USER": "Maria"}]
+
+        # 2. Age
+        accepted = server._enqueue_tasks(tasks, capacity=2)
+        queued = [t.user for t in server.task_queue]
+        primary = server._dequeue_task("W1")
+        server._enqueue_tasks([{"TASK": "QUERY", "USER": "Arthur"}])
+        server._complete_task("W1", "OK", primary["TASK_ID"])
+
+        # 3. Verifica
+        self.assertEqual(accepted, 6) # As duplicatas não contam na capacidade
+        self.assertEqual(queued, ["Arthur", "Maria"])
+        self.assertEqual([t.user for t in server.task_queue], ["Maria", "Arthur"])
+        self.assertEqual(server.metrics.counters["tasks_coalesced"], 4)
+        self.assertEqual(server.metrics.counters["tasks_fanned_out"], 4)
+        self.assertEqual(len(server.completed_task_timestamps), 4)
+        self.assertEqual(server.coalescer.waiting, 0)
+
+    def test_update_closes_group_and_requeue_keeps_followers(self):
+        """
+        Testa que uma atualização do usuário fecha o grupo (a leitura seguinte
+        roda depois dela) e que a primária devolvida à fila (worker sumiu)
+        continua levando as penduradas.
+        """
+        # 1. Prepara
+        server = DummyServer()
+        server._enqueue_tasks([{"TASK": "QUERY", "USER": "Arthur"}, {"TASK": "QUERY", "USER": "Arthur"},
+                               {"TASK": "DEPOSIT", "USER": "Arthur"}, {"TASK": "QUERY", "USER": "Arthur"}])
+        kinds = [t.kind for t in server.task_queue]
+
+        # 2. Age
+        primary = server._dequeue_task("W1")
+        requeued = server._requeue_stale_inflight(timeout=0, now=primary["ENQUEUED_AT"] + 60)
+        again = server._dequeue_task("W2")
+        server._complete_task("W2", "NOK", again["TASK_ID"])
+
+        # 3. Verifica
+        self.assertEqual(kinds, ["QUERY", "DEPOSIT", "QUERY"])
+        self.assertEqual(requeued, 1)
+        self.assertEqual(again["TASK_ID"], primary["TASK_ID"])
+        self.assertEqual(server.metrics.counters["tasks_fanned_out"], 1)
+        self.assertEqual(server.coalescer.waiting, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import json
+import tempfile
+import unittest
+
+from logs.events import EventLog
+from logs.analyze_events import analyze
+
+
+class TestEventLog(unittest.TestCase):
+
+    def test_record_and_analyze(self):
+        """
+        Testa o caminho completo: eventos gravados pelo EventLog (com rotação
+        de segmento) e o relatório do analisador (rotas, workers, migrações).
+        """
+        # 1. Prepara
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "SERVER_1_events.jsonl")
+            log = EventLog()
+            log.open(path, flush_interval=0.01, max_bytes=2000)
+
+            # 2. Age
+            log.record("ALIVE", "W1", source="SERVER_1", duration=0.002)
+            for i in range(30):
+                log.record("DISPATCH", "W1" if i < 20 else "W2", source="SERVER_1", task=f"t{i}")
+            log.record("REDIRECT", "W2", source="SERVER_1", to="127.0.0.1:9002")
+            log.record("RETURN", "W2", source="SERVER_2", to="127.0.0.1:9001")
+            log.close()
+            log.record("ALIVE", "W1", source="SERVER_1")  # ignorado: log fechado
+
+            segments = sorted(os.listdir(tmp))
+            with open(os.path.join(tmp, segments[0])) as f:
+                first = json.loads(f.readline())
+            report = analyze([tmp], bucket=60)
+
+        # 3. Verifica
+        self.assertGreater(len(segments), 1)
+        self.assertEqual((first["r"], first["e"], first["d"]), ("ALIVE", "W1", 0.002))
+        self.assertEqual(report["events"], 33)
+        self.assertEqual(report["routes"]["ALIVE"]["count"], 1)
+        self.assertEqual(report["routes"]["DISPATCH"]["events"], 30)
+        self.assertEqual(report["workers"]["top"][0]["worker"], "W1")
+        self.assertEqual(report["workers"]["top"][0]["tasks"], 20)
+        self.assertEqual(report["migrations"]["total"], 2)
+        self.assertEqual(sum(s["REDIRECT"] + s["RETURN"] for s in report["migrations"]["timeline"]), 2)
+
+    def test_disabled_and_bounded(self):
+        """
+        Testa que, desligado, record() não guarda nada e que o buffer
+        descarta os mais antigos (contando) se o escritor atrasar.
+        """
+        # 1. Prepara
+        log = EventLog()
+
+        # 2. Age / 3. Verifica
+        log.record("ALIVE", "W1")
+        self.assertEqual(len(log._pending), 0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            log.open(os.path.join(tmp, "x_events.jsonl"), flush_interval=60, max_pending=5)
+            for i in range(8):
+                log.record("ALIVE", f"W{i}")
+            self.assertEqual(log.dropped, 3)
+            log.close()
+
+    def test_analyze_skips_non_object_lines(self):
+        """
+        Testa que linhas JSON válidas que não são objetos ([1,2], 3, "x")
+        e linhas quebradas são ignoradas sem derrubar a análise.
+        """
+        # 1. Prepara
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "SERVER_1_events.jsonl.000001")
+            with open(path, 'w') as f:
+                f.write('[1,2]\n3\n"x"\nnull\n{quebrado\n')
+                f.write('{"t":1.0,"p":"SERVER_1","r":"ALIVE","e":"W1","d":0.001}\n')
+
+            # 2. Age
+            report = analyze([tmp])
+
+        # 3. Verifica
+        self.assertEqual(report["events"], 1)
+        self.assertEqual(report["routes"]["ALIVE"]["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
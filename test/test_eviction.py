@@ -0,0 +1,88 @@
+import unittest
+
+from server.dist_server.eviction import StateEvictor, TimingWheel
+from server.dist_server.records import RedirectOrder, ReturnBatch, WorkerState
+
+
+class TestEviction(unittest.TestCase):
+
+    def test_wheel_expires_stale_entries_and_keeps_alive_ones(self):
+        """
+        Testa a remoção por TTL: o worker que mandou ALIVE depois volta para
+        a roda, o que sumiu sai; lote de retorno e ordem não entregue também saem.
+        """
+        # 1. Prepara
+        evictor = StateEvictor({'worker_ttl': 60, 'return_batch_ttl': 30, 'redirect_order_ttl': 20, 'interval': 5})
+        worker_status, pending_returns = {}, {}
+        evictor.register_worker(worker_status, "W_ALIVE", None, 0)
+        evictor.register_worker(worker_status, "W_GONE", None, 0)
+        pending_returns["SERVER_2"] = ReturnBatch({}, ["W9"], ["W9"], 0)
+        evictor.watch_return_batch("SERVER_2", 0)
+        order = RedirectOrder("W9", {"ip": "127.0.0.1", "port": 9002}, created_at=0)
+        redirect_queue = [order]
+        evictor.watch_order(order)
+
+        # 2. Age
+        worker_status["W_ALIVE"].last_seen = 50
+        early = evictor.evict(worker_status, pending_returns, redirect_queue, 25)
+        first = evictor.evict(worker_status, pending_returns, redirect_queue, 65)
+        second = evictor.evict(worker_status, pending_returns, redirect_queue, 115)
+
+        # 3. Verifica
+        self.assertEqual(early["redirect_orders"], 1)
+        self.assertEqual(redirect_queue, [])
+        self.assertEqual(first["workers"], 1)
+        self.assertEqual(first["return_batches"], 1)
+        self.assertEqual(pending_returns, {})
+        self.assertEqual(list(worker_status), []) # W_ALIVE expirou no prazo novo (50 + 60)
+        self.assertEqual(second["workers"], 1)
+        self.assertEqual(evictor.evicted["workers"], 2)
+
+    def test_tombstone_recognizes_returning_worker(self):
+        """
+        Testa a lápide: um worker emprestado removido por TTL que volta é
+        registrado de novo com o dono e o estado; a lápide expira depois.
+        """
+        # 1. Prepara
+        evictor = StateEvictor({'worker_ttl': 10, 'tombstone_ttl': 100, 'interval': 1})
+        worker_status = {}
+        record = evictor.register_worker(worker_status, "W1", None, 0)
+        record.owner_id = "SERVER_2"
+        record.state = WorkerState.LENT
+        evictor.register_worker(worker_status, "W2", None, 0)
+
+        # 2. Age
+        evictor.evict(worker_status, {}, [], 20)
+        revived = evictor.register_worker(worker_status, "W1", ("127.0.0.1", 1), 30)
+        revived.last_seen = 195 # Continua mandando ALIVE
+        expired = evictor.evict(worker_status, {}, [], 200)
+
+        # 3. Verifica
+        self.assertEqual(revived.owner_id, "SERVER_2")
+        self.assertEqual(revived.state, WorkerState.LENT)
+        self.assertEqual(evictor.revived, 1)
+        self.assertEqual(expired["tombstones"], 1) # A lápide do W2
+        self.assertEqual(evictor.tombstones, {})
+        self.assertIn("W1", worker_status)
+
+    def test_wheel_handles_deadlines_beyond_one_turn(self):
+        """Testa prazos maiores que uma volta da roda: o item espera a volta certa."""
+        # 1. Prepara
+        wheel = TimingWheel(tick=1, slots=4, now=0)
+        wheel.schedule("far", 10)
+        wheel.schedule("near", 2)
+
+        # 2. Age
+        at_3 = wheel.advance(3)
+        at_7 = wheel.advance(7)
+        at_11 = wheel.advance(11)
+
+        # 3. Verifica
+        self.assertEqual(at_3, ["near"])
+        self.assertEqual(at_7, [])
+        self.assertEqual(at_11, ["far"])
+        self.assertEqual(wheel.size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import threading
+import time
+import unittest
+
+from server.dist_server.executor import BoundedExecutor
+
+
+class TestBoundedExecutor(unittest.TestCase):
+
+    def test_per_key_limit_keeps_other_peers_moving(self):
+        """
+        Testa o limite por peer: com o peer S2 travado, só 'per_key_limit'
+        jobs dele rodam; os do S3 passam na frente e o resto do S2 espera.
+        """
+        # 1. Prepara
+        executor = BoundedExecutor(max_workers=4, max_queue=16, per_key_limit=1, name="Test")
+        release_s2 = threading.Event()
+        s3_done = threading.Event()
+        started = []
+
+        def blocked(tag):
+            started.append(tag)
+            release_s2.wait(timeout=2)
+
+        # 2. Age
+        executor.submit(blocked, "s2-a", key="S2")
+        executor.submit(blocked, "s2-b", key="S2")
+        executor.submit(s3_done.set, key="S3")
+        s3_ran = s3_done.wait(timeout=2)
+        time.sleep(0.05)
+        started_while_blocked = list(started)
+        pending_s2 = executor.pending("S2")
+        release_s2.set()
+        deadline = time.monotonic() + 2
+        while executor.stats()["completed"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # 3. Verifica
+        self.assertTrue(s3_ran)
+        self.assertEqual(started_while_blocked, ["s2-a"])
+        self.assertEqual(pending_s2, 2)
+        self.assertEqual(started, ["s2-a", "s2-b"])
+        self.assertEqual(executor.pending("S2"), 0)
+        executor.shutdown()
+
+    def test_bounded_queue_rejects_and_shutdown_cancels(self):
+        """
+        Testa os limites: threads não passam de 'max_workers', a fila recusa
+        acima de 'max_queue' e o shutdown devolve os jobs que não rodaram.
+        """
+        # 1. Prepara
+        executor = BoundedExecutor(max_workers=2, max_queue=3, name="Test")
+        gate = threading.Event()
+
+        def job(n):
+            gate.wait(timeout=2)
+
+        # 2. Age
+        accepted = [executor.submit(job, i) for i in range(8)]
+        time.sleep(0.05)
+        stats = executor.stats()
+        cancelled = executor.shutdown()
+        gate.set()
+
+        # 3. Verifica
+        self.assertEqual(accepted, [True] * 5 + [False] * 3)
+        self.assertEqual(stats["threads"], 2)
+        self.assertEqual(stats["running"], 2)
+        self.assertEqual(stats["queued"], 3)
+        self.assertEqual(stats["rejected"], 3)
+        self.assertEqual(cancelled, [(2,), (3,), (4,)])
+        self.assertFalse(executor.submit(job, 9))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from worker.dist_worker.endpoints import EndpointTable
+from worker.dist_worker.prefetch import PrefetchMixin
+from worker.dist_worker.main_loop import LogicMixin
+
+HOME = ("127.0.0.1", 9001)
+S2 = ("127.0.0.1", 9002)
+S3 = ("127.0.0.1", 9003)
+
+
+class DummyWorker(PrefetchMixin, LogicMixin):
+    def __init__(self):
+        self.worker_id = "W1"
+        self.owner_id = "SERVER_1"
+        self._running = True
+        self.concurrency = 1
+        self._inflight = 0
+        self.home_host, self.home_port = HOME
+        self.current_master_host, self.current_master_port = HOME
+        self._failed_over = False
+        self._last_home_probe = 0.0
+        self.home_probe_interval = 15
+        self.endpoints = EndpointTable(down_cooldown=10)
+        for host, port in (HOME, S2, S3):
+            self.endpoints.learn(host, port)
+        self.poller = MagicMock()
+        self._init_prefetch({'prefetch': {'depth': 4}})
+        self._connect_and_send = MagicMock(return_value={"STATUS": "ACK"})
+
+
+class TestEndpointTable(unittest.TestCase):
+
+    @patch('worker.dist_worker.endpoints.time.monotonic')
+    def test_ranked_and_cooldown(self, mock_monotonic):
+        """
+        Testa o ranking (menos falhas, depois menor RTT, RTT desconhecido
+        por último) e o 'down_cooldown' de um endpoint que falhou.
+        """
+        # 1. Prepara
+        mock_monotonic.return_value = 100.0
+        table = EndpointTable(down_cooldown=10, rtt_alpha=0.5)
+        for host, port in (HOME, S2, S3):
+            table.learn(host, port)
+        table.record_success(*S2, rtt=0.020)
+        table.record_success(*S3, rtt=0.010)
+        table.record_success(*S3, rtt=0.050)   # EWMA: 0.030
+
+        # 2. Age / 3. Verifica
+        self.assertEqual(table.ranked(), [S2, S3, HOME])
+        self.assertEqual(table.ranked(exclude=S2), [S3, HOME])
+
+        table.record_failure(*S2)
+        self.assertFalse(table.is_healthy(*S2))
+        self.assertEqual(table.ranked(), [S3, HOME])
+
+        mock_monotonic.return_value = 110.5
+        self.assertTrue(table.is_healthy(*S2))
+        self.assertEqual(table.ranked(), [S3, HOME, S2])  # ainda conta a falha
+
+        table.record_success(*S2, rtt=0.020)
+        self.assertEqual(table.ranked()[0], S2)
+
+
+class TestFailover(unittest.TestCase):
+
+    def test_fail_over_hands_buffer_to_new_master(self):
+        """
+        Testa o failover com a casa fora: vai para o melhor endpoint,
+        devolve o buffer ao NOVO mestre e, depois de 'home_probe_interval',
+        sonda a casa de novo.
+        """
+        # 1. Prepara
+        worker = DummyWorker()
+        worker.endpoints.record_success(*S3, rtt=0.005)
+        worker.endpoints.record_success(*S2, rtt=0.050)
+        worker._buffer_task({"TASK": "QUERY", "USER": "Arthur", "TASK_ID": "t1"}, *HOME)
+        worker.endpoints.record_failure(*HOME)
+
+        # 2. Age
+        switched = worker._fail_over(*HOME)
+        first_target = worker._choose_fetch_target()
+        worker._last_home_probe = time.monotonic() - 16
+        probe_target = worker._choose_fetch_target()
+
+        # 3. Verifica
+        self.assertTrue(switched)
+        self.assertTrue(worker._failed_over)
+        self.assertEqual((worker.current_master_host, worker.current_master_port), S3)
+        handback = worker._connect_and_send.call_args
+        self.assertEqual(handback.args[1:3], S3)
+        self.assertEqual([t["TASK_ID"] for t in handback.args[0]["TASKS"]], ["t1"])
+        self.assertEqual(first_target, S3)
+        self.assertEqual(probe_target, HOME)
+
+    def test_fail_over_prefers_home_and_gives_up_without_candidates(self):
+        """
+        Testa que, se o mestre emprestado cai e a casa está saudável, o
+        worker volta para casa; sem nenhum endpoint saudável, não troca.
+        """
+        # 1. Prepara
+        worker = DummyWorker()
+        worker.current_master_host, worker.current_master_port = S2
+        worker._failed_over = True
+
+        # 2. Age
+        back_home = worker._fail_over(*S2)
+        worker.endpoints.record_failure(*S2)
+        worker.endpoints.record_failure(*S3)
+        no_candidate = worker._fail_over(*HOME)
+
+        # 3. Verifica
+        self.assertTrue(back_home)
+        self.assertFalse(worker._failed_over)
+        self.assertFalse(no_candidate)
+        self.assertEqual((worker.current_master_host, worker.current_master_port), HOME)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import unittest
+from unittest.mock import patch
+
+from worker.dist_worker.farm import WorkerFarm
+
+HOMES = [{"host": "127.0.0.1", "port": 9001}, {"host": "127.0.0.1", "port": 9002}]
+
+
+def _crashing_child(config: dict, slot: int, stats_queue, stats_interval: float):
+    """Filho de mentira: publica a contagem e morre com erro."""
+    stats_queue.put((slot, f"W{slot}", 0))
+    sys.exit(1)
+
+
+def _farm(processes: int) -> WorkerFarm:
+    config = {
+        'home_server': HOMES[0],
+        'known_servers': [{"host": "127.0.0.1", "port": 9003}],
+        'farm': {'home_servers': HOMES, 'restart_delay': 0, 'stats_interval': 1},
+    }
+    return WorkerFarm(config, processes=processes)
+
+
+class TestWorkerFarm(unittest.TestCase):
+
+    def test_children_are_spread_across_home_servers(self):
+        """
+        Testa a distribuição: os filhos alternam entre as casas (round-robin)
+        e as outras casas entram nos 'known_servers' do filho, sem repetir.
+        """
+        # 1. Prepara
+        farm = _farm(processes=4)
+
+        # 2. Age
+        configs = [farm._child_config(slot) for slot in range(4)]
+
+        # 3. Verifica
+        self.assertEqual([c['home_server']['port'] for c in configs], [9001, 9002, 9001, 9002])
+        self.assertEqual([s['port'] for s in configs[0]['known_servers']], [9003, 9002])
+        self.assertEqual([s['port'] for s in configs[1]['known_servers']], [9003, 9001])
+        self.assertEqual(farm.config['home_server'], HOMES[0]) # O config do pai não muda
+
+    @patch('worker.dist_worker.farm._child_main', _crashing_child)
+    def test_crashed_child_is_restarted(self):
+        """
+        Testa a supervisão: um filho que morre é marcado e, passado o
+        'restart_delay', recriado no mesmo slot (novo processo).
+        """
+        # 1. Prepara
+        farm = _farm(processes=1)
+        farm._spawn(0)
+        first = farm._children[0]
+        first.join(timeout=10)
+
+        # 2. Age
+        farm._supervise() # Detecta a morte e agenda o reinício
+        farm._supervise() # restart_delay=0: recria
+        second = farm._children[0]
+        second.join(timeout=10)
+        farm.stop()
+
+        # 3. Verifica
+        self.assertEqual(first.exitcode, 1)
+        self.assertIsNot(second, first)
+        self.assertEqual(farm.restarts, 1)
+
+    @patch('worker.dist_worker.farm.logger')
+    def test_throughput_is_aggregated(self, mock_logger):
+        """
+        Testa o resumo: soma as tarefas de todos os filhos desde o último
+        resumo, e um filho reiniciado (contador voltou a zero) conta só o novo.
+        """
+        # 1. Prepara
+        farm = _farm(processes=2)
+        farm._stats_queue.put((0, "W0", 10))
+        farm._drain_stats(timeout=5)
+        farm._counts[1] = ("W1", 6)
+
+        # 2. Age
+        farm._log_summary(elapsed=2)
+        first = mock_logger.info.call_args.args[0]
+        farm._counts[0] = ("W0", 14)
+        farm._counts[1] = ("W1b", 2) # Reiniciado
+        farm._log_summary(elapsed=2)
+        second = mock_logger.info.call_args.args[0]
+
+        # 3. Verifica
+        self.assertIn("| 8.00 tarefas/s |", first)
+        self.assertIn("por filho: 0:5.00 1:3.00", first)
+        self.assertIn("| 3.00 tarefas/s |", second)
+        self.assertIn("por filho: 0:2.00 1:1.00", second)
+
+
+if __name__ == '__main__':
+    unittest.main()
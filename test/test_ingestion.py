@@ -0,0 +1,116 @@
+import threading
+import time
+import unittest
+
+from server.dist_server.ingestion import IngestionMixin
+from server.dist_server.state_helpers import StateHelpersMixin
+from server.dist_server.coalescing import TaskCoalescer
+from test.server_state import init_server_state
+
+
+class DummyServer(IngestionMixin, StateHelpersMixin):
+    def __init__(self, backpressure: str):
+        init_server_state(self, config={
+            'ingestion': {'queue_capacity': 3, 'backpressure': backpressure, 'block_timeout': 2}
+        })
+
+
+class TestIngestion(unittest.TestCase):
+
+    def test_reject_when_full(self):
+        """
+        Testa o backpressure 'reject': só cabe até 'queue_capacity',
+        o excedente e as tarefas inválidas são recusados.
+        """
+        # 1. Prepara
+        server = DummyServer(backpressure='reject')
+        batch = [{"USER": f"u{i}"} for i in range(5)] + [{"TASK": "QUERY"}]
+
+        # 2. Age
+        accepted, rejected = server._submit_tasks(batch)
+
+        # 3. Verifica
+        self.assertEqual((accepted, rejected), (3, 3))
+        self.assertEqual([t.user for t in server.task_queue], ["u0", "u1", "u2"])
+        self.assertTrue(all(t.task_id for t in server.task_queue))
+
+    def test_malformed_items_are_rejected(self):
+        """
+        Testa a validação do SUBMIT: USER/TASK que não são string (lista,
+        dict, número), USER vazio e tipos que o worker não executa são
+        recusados e contados; o resto entra na fila.
+        """
+        # 1. Prepara
+        server = DummyServer(backpressure='reject')
+        server.coalescer = TaskCoalescer({'enabled': True}) # Chaves do índice precisam ser hasheáveis
+        batch = [
+            {"USER": ["Arthur"]},
+            {"USER": {"id": 1}},
+            {"USER": 42},
+            {"USER": ""},
+            {"TASK": ["QUERY"], "USER": "Maria"},
+            {"TASK": "DEPOSIT", "USER": "Maria"},
+            "QUERY",
+            {"TASK": "QUERY", "USER": "Joao"},
+        ]
+
+        # 2. Age
+        accepted, rejected = server._submit_tasks(batch)
+
+        # 3. Verifica
+        self.assertEqual((accepted, rejected), (1, 7))
+        self.assertEqual([(t.kind, t.user) for t in server.task_queue], [("QUERY", "Joao")])
+        self.assertEqual(server.metrics.counters["tasks_rejected"], 7)
+
+    def test_block_waits_for_space(self):
+        """
+        Testa o backpressure 'block': o SUBMIT espera a fila esvaziar
+        (um worker consumindo) em vez de recusar.
+        """
+        # 1. Prepara
+        server = DummyServer(backpressure='block')
+
+        def consume():
+            for _ in range(2):
+                time.sleep(0.05)
+                server._dequeue_task("w1")
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+
+        # 2. Age
+        accepted, rejected = server._submit_tasks([{"USER": f"u{i}"} for i in range(5)])
+        consumer.join()
+
+        # 3. Verifica
+        self.assertEqual((accepted, rejected), (5, 0))
+        self.assertEqual(len(server.inflight_tasks), 2)
+
+    def test_concurrent_submits_respect_capacity(self):
+        """
+        Testa que SUBMITs concorrentes não passam de 'queue_capacity'
+        (a capacidade é reconferida sob o lock do enfileiramento).
+        """
+        # 1. Prepara
+        server = DummyServer(backpressure='reject')
+        server.config['ingestion']['queue_capacity'] = 50
+        results = []
+        start = threading.Barrier(8)
+
+        def submit():
+            start.wait()
+            results.append(server._submit_tasks([{"USER": "u"} for _ in range(20)]))
+
+        threads = [threading.Thread(target=submit) for _ in range(8)]
+
+        # 2. Age
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # 3. Verifica
+        self.assertEqual(len(server.task_queue), 50)
+        self.assertEqual(sum(a for a, _ in results), 50)
+        self.assertEqual(sum(r for _, r in results), 110)
+        self.assertEqual(server._enqueue_tasks([{"USER": "x"}], capacity=50), 0)
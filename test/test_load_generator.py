@@ -0,0 +1,90 @@
+import random
+import unittest
+from collections import Counter
+
+from bench.load_generator import ArrivalShape, KeyChooser
+from histogram import LatencyHistogram
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    def _count_arrivals(self, shape: ArrivalShape, duration: float) -> list:
+        arrivals = []
+        t = shape.next_arrival(0.0)
+        while t < duration:
+            arrivals.append(t)
+            t = shape.next_arrival(t)
+        return arrivals
+
+    def test_poisson_rate(self):
+        """
+        Testa se a forma 'poisson' entrega, em média, a taxa pedida.
+        """
+        # 1. Prepara
+        shape = ArrivalShape("poisson", rate=200, rng=random.Random(42))
+
+        # 2. Age
+        arrivals = self._count_arrivals(shape, duration=50)
+
+        # 3. Verifica (10000 esperadas; desvio padrão ~100)
+        self.assertAlmostEqual(len(arrivals), 10000, delta=400)
+
+    def test_burst_concentrates_arrivals(self):
+        """
+        Testa se a forma 'burst' concentra as chegadas dentro dos picos.
+        """
+        # 1. Prepara: base 10/s, pico de 1s a 1000/s a cada 10s
+        shape = ArrivalShape("burst", rate=10, burst_rate=1000, burst_every=10, burst_length=1, rng=random.Random(7))
+
+        # 2. Age
+        arrivals = self._count_arrivals(shape, duration=100)
+        in_burst = sum(1 for t in arrivals if (t % 10) < 1)
+
+        # 3. Verifica (~10000 no pico contra ~900 fora dele)
+        self.assertAlmostEqual(in_burst, 10000, delta=500)
+        self.assertAlmostEqual(len(arrivals) - in_burst, 900, delta=150)
+
+    def test_zipf_keys_are_skewed(self):
+        """
+        Testa se a distribuição Zipf deixa o usuário mais "quente" bem
+        acima da média, enquanto a uniforme fica perto dela.
+        """
+        # 1. Prepara
+        zipf = KeyChooser("zipf", users=100, zipf_s=1.2, rng=random.Random(1))
+        uniform = KeyChooser("uniform", users=100, rng=random.Random(1))
+
+        # 2. Age
+        zipf_counts = Counter(zipf.next_user() for _ in range(20000))
+        uniform_counts = Counter(uniform.next_user() for _ in range(20000))
+
+        # 3. Verifica (média: 200 por usuário)
+        self.assertEqual(zipf_counts.most_common(1)[0][0], "user-0")
+        self.assertGreater(zipf_counts["user-0"], 10 * 200)
+        self.assertLess(uniform_counts.most_common(1)[0][1], 2 * 200)
+
+    def test_histogram_percentiles(self):
+        """
+        Testa se o histograma devolve percentis com erro relativo pequeno.
+        """
+        # 1. Prepara: latências de 1ms a 1000ms
+        histogram = LatencyHistogram()
+
+        # 2. Age
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+
+        # 3. Verifica
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.percentile(50), 0.5, delta=0.5 * 0.04)
+        self.assertAlmostEqual(histogram.percentile(99), 0.99, delta=0.99 * 0.04)
+        self.assertAlmostEqual(histogram.mean(), 0.5005, delta=0.001)
+
+        other = LatencyHistogram()
+        other.record(5.0)
+        histogram.merge(other)
+        self.assertEqual(histogram.count, 1001)
+        self.assertEqual(histogram.summary()["max_ms"], 5000.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import json
+import socket
+import threading
+import time
+import unittest
+import urllib.request
+
+from server.dist_server.connection_handler import ConnectionHandlerMixin
+from server.dist_server.state_helpers import StateHelpersMixin
+from server.dist_server.metrics import MetricsMixin, TimedLock, prometheus_text
+from server.dist_server.executor import BoundedExecutor
+from server.dist_server.records import QueuedTask
+from payload_models import metrics_request
+from bench.microbench import FakeConn
+from test.server_state import init_server_state
+
+
+class DummyServer(ConnectionHandlerMixin, StateHelpersMixin, MetricsMixin):
+    def __init__(self, http_port: int = None):
+        self.id = "SERVER_TEST"
+        self.start_time = time.time() - 10
+        self._running = True
+        self._threads = []
+        self.config = {
+            'timing': {'heartbeat_timeout': 30},
+            'metrics': {'sample_interval': 5, 'history_seconds': 20, 'http_port': http_port,
+                        'lock_timing': True},
+        }
+        init_server_state(self, lock=self._new_state_lock())
+        self._init_metrics()
+        self.executors = {"outbound": BoundedExecutor(name="Outbound")}
+        self.task_queue.extend([QueuedTask("t1", "QUERY", "Arthur"), QueuedTask("t2", "QUERY", "Maria")])
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_timed_lock_measures_contention(self):
+        """
+        Testa o TimedLock: acquire livre não é cronometrado, acquire
+        disputado entra no histograma; serve de base para um Condition.
+        """
+        # 1. Prepara
+        lock = TimedLock()
+        cond = threading.Condition(lock)
+        lock.acquire()
+
+        def contend():
+            with lock:
+                cond.notify_all()
+
+        thread = threading.Thread(target=contend)
+
+        # 2. Age
+        thread.start()
+        time.sleep(0.05)
+        cond.wait(timeout=2)  # solta o lock: a outra thread entra e notifica
+        lock.release()
+        thread.join()
+
+        # 3. Verifica
+        summary = lock.summary()
+        self.assertEqual(summary["contended"], 1)
+        self.assertGreaterEqual(summary["acquisitions"], 3)
+        self.assertGreaterEqual(summary["max_ms"], 40)
+        self.assertFalse(lock.locked())
+
+    def test_stats_route_counters_and_history(self):
+        """
+        Testa a rota STATS: depois de um ALIVE, o snapshot traz o despacho
+        nos contadores/taxas, a fila nos gauges, o tempo por rota e o anel.
+        """
+        # 1. Prepara
+        server = DummyServer()
+        server._handle_connection(FakeConn(json.dumps({"WORKER": "ALIVE", "WORKER_UUID": "W1"}) + '\n'), ("127.0.0.1", 50000))
+        server._metrics_sample()
+        server.metrics.observe("peer_rtt", 0.004, label="SERVER_2")
+
+        # 2. Age
+        conn = FakeConn(json.dumps(metrics_request(history=True)) + '\n')
+        server._handle_connection(conn, ("127.0.0.1", 50001))
+        snapshot = json.loads(conn.sent[0])
+        text = prometheus_text(snapshot)
+
+        # 3. Verifica
+        self.assertEqual(snapshot["RESPONSE"], "METRICS")
+        self.assertEqual(snapshot["counters"]["tasks_dispatched"], 1)
+        self.assertEqual(snapshot["gauges"]["queue_depth"], 1)
+        self.assertEqual(snapshot["gauges"]["inflight_tasks"], 1)
+        self.assertEqual(snapshot["gauges"]["connections_active"], 1)  # a própria consulta
+        self.assertEqual(snapshot["routes"]["ALIVE"]["count"], 1)
+        self.assertEqual(snapshot["peer_rtt"]["SERVER_2"]["count"], 1)
+        self.assertEqual(len(snapshot["history"]), 1)
+        self.assertEqual(snapshot["history"][0]["counters"]["tasks_dispatched"], 1)
+        self.assertIn("lock_wait", snapshot)
+        self.assertEqual(snapshot["gauges"]["outbound_queue_depth"], 0)
+        self.assertIn('dist_tasks_dispatched_total{server="SERVER_TEST"} 1', text)
+        self.assertIn('dist_peer_rtt_seconds_count{server="SERVER_TEST",peer="SERVER_2"} 1', text)
+
+    def test_history_ring_is_bounded_and_http_scrape(self):
+        """
+        Testa que o anel guarda só 'history_seconds / sample_interval'
+        amostras e que a porta HTTP responde /metrics e /stats.
+        """
+        # 1. Prepara
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = DummyServer(http_port=port)
+
+        # 2. Age
+        for _ in range(6):
+            server._metrics_sample()
+        server._start_metrics_http()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+                text = resp.read().decode('utf-8')
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats?history=1", timeout=5) as resp:
+                stats = json.loads(resp.read())
+        finally:
+            server._stop_metrics_http()
+
+        # 3. Verifica
+        self.assertEqual(len(server.metrics.recent()), 4)
+        self.assertIn('dist_queue_depth{server="SERVER_TEST"} 2', text)
+        self.assertEqual(stats["gauges"]["queue_depth"], 2)
+        self.assertEqual(len(stats["history"]), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
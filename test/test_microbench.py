@@ -0,0 +1,66 @@
+import json
+import unittest
+
+from bench.microbench import FakeConn, make_server, measure, compare, REFERENCE
+
+
+class TestMicrobench(unittest.TestCase):
+
+    def test_alive_through_fake_connection(self):
+        """
+        Testa se a rota ALIVE roda em memória (sem socket) e entrega
+        a primeira tarefa da fila.
+        """
+        # 1. Prepara
+        server = make_server(queue_size=3, workers=1)
+        conn = FakeConn(json.dumps({"WORKER": "ALIVE", "WORKER_UUID": "W0"}) + '\n')
+
+        # 2. Age
+        server._handle_connection(conn, ("127.0.0.1", 50000))
+
+        # 3. Verifica
+        self.assertEqual(len(conn.sent), 1)
+        self.assertEqual(json.loads(conn.sent[0])["TASK_ID"], "t0")
+        self.assertEqual(len(server.task_queue), 2)
+        self.assertIn("t0", server.inflight_tasks)
+
+    def test_measure_reports_per_call_time(self):
+        """
+        Testa se a medição calibra o número de chamadas e devolve ns por chamada.
+        """
+        # 1. Prepara
+        calls = []
+
+        # 2. Age
+        result = measure(lambda: calls.append(1), min_run_time=0.001, repeats=3)
+
+        # 3. Verifica
+        self.assertGreater(result["number"], 1)
+        self.assertGreaterEqual(len(calls), result["number"] * 3)
+        self.assertGreater(result["ns_per_op"], 0)
+
+    def test_compare_gates_on_median(self):
+        """
+        Testa que a comparação usa a mediana (não o mínimo de uma rodada de
+        sorte), normalizada pela referência, e aceita baseline antigo só com mínimo.
+        """
+        # 1. Prepara
+        baseline = {REFERENCE: {"ns_per_op": 90, "median_ns": 100},
+                    "alive.empty": {"ns_per_op": 900, "median_ns": 1000},
+                    "alive.queue_10": {"ns_per_op": 1000}}
+        results = {REFERENCE: {"ns_per_op": 150, "median_ns": 200},   # máquina 2x mais lenta agora
+                   "alive.empty": {"ns_per_op": 1000, "median_ns": 2100},
+                   "alive.queue_10": {"ns_per_op": 500, "median_ns": 3000}}
+
+        # 2. Age
+        rows = {row[0]: row for row in compare(results, baseline, tolerance=0.3)}
+
+        # 3. Verifica
+        self.assertAlmostEqual(rows["alive.empty"][3], 1.05)
+        self.assertFalse(rows["alive.empty"][4])
+        self.assertAlmostEqual(rows["alive.queue_10"][3], 1.5)
+        self.assertTrue(rows["alive.queue_10"][4])
+
+
+if __name__ == '__main__':
+    unittest.main()
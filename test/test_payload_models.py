@@ -1,6 +1,6 @@
 import unittest
 # Use imports absolutos a partir da raiz do projeto ('test/' está na raiz)
-from payload_models import get_task, server_command_release
+from payload_models import get_task, server_command_release, task_status, server_ack
 
 class TestPayloadModels(unittest.TestCase):
 
@@ -47,3 +47,19 @@ class TestPayloadModels(unittest.TestCase):
         self.assertEqual(payload['SERVER_UUID'], "S1")
         self.assertEqual(len(payload['WORKERS_UUID']), 2)
         self.assertEqual(payload['WORKERS_UUID'], ["w1", "w2"])
+
+    def test_task_status_fetch_next(self):
+        """Testa o pedido de "report and fetch" no task_status."""
+        payload = task_status(worker_id="w-123", status="OK", task="QUERY", fetch_next=True)
+        self.assertTrue(payload["FETCH_NEXT"])
+
+        # Sem o flag, o payload continua igual ao da v1
+        payload = task_status(worker_id="w-123", status="OK", task="QUERY")
+        self.assertNotIn("FETCH_NEXT", payload)
+
+    def test_server_ack_with_next(self):
+        """Testa o ACK carregando a próxima tarefa."""
+        next_task = {"TASK": "QUERY", "USER": "Maria"}
+        payload = server_ack(next_message=next_task)
+        self.assertEqual(payload, {"STATUS": "ACK", "NEXT": next_task})
+        self.assertEqual(server_ack(), {"STATUS": "ACK"})
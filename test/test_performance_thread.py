@@ -4,6 +4,9 @@ from unittest.mock import Mock, patch, MagicMock
 
 # Importa o Mixin que contém a thread
 from server.dist_server.background_tasks import BackgroundTasksMixin
+from server.dist_server.sampler import SystemSampler
+from server.dist_server.records import WorkerRecord
+from test.server_state import init_server_state
 
 # Classe Dummy para simular o Server
 class DummyServer(BackgroundTasksMixin):
@@ -11,16 +14,11 @@ class DummyServer(BackgroundTasksMixin):
         self.id = "SERVER_TEST"
         self.start_time = time.time()
         self._running = True
-        self.lock = unittest.mock.MagicMock()
         self._send_to_supervisor = unittest.mock.MagicMock()
-        
-        # Estado interno simulado
-        self.task_queue = []
-        self.worker_status = {}
-        self.peer_status = {}
-        
+        self.sampler = SystemSampler()
+
         # Configuração simulada
-        self.config = {
+        init_server_state(self, lock=unittest.mock.MagicMock(), config={
             'load_balancing': {'max_queue_threshold': 50},
             'timing': {'heartbeat_timeout': 30},
             'server': {'id_number': '1'},
@@ -29,20 +27,18 @@ class DummyServer(BackgroundTasksMixin):
                 'supervisor_interval': 1,  
                 'supervisor_info': {"ip":'127.0.0.1','port': 8000}               
             }
-        }
+        })
 
 class TestPerformanceThread(unittest.TestCase):
 
     def setUp(self):
         self.server = DummyServer()
 
-    @patch('server.dist_server.background_tasks.psutil')
+    @patch('server.dist_server.sampler.psutil')
     @patch('server.dist_server.background_tasks.server_performance_report')
-    @patch('time.sleep')
-
-    def test_performance_reporter_loop(self, mock_sleep, mock_payload_gen, mock_psutil):
+    def test_performance_report_job(self, mock_payload_gen, mock_psutil):
         """
-        Testa uma iteração do loop de performance.
+        Testa um disparo do job de relatório de performance.
         """
         
         # --- 1. CONFIGURA OS MOCKS (Simulando o Hardware) ---
@@ -68,27 +64,26 @@ class TestPerformanceThread(unittest.TestCase):
         # Simula Load Avg
         mock_psutil.getloadavg.return_value = (1.5, 1.2, 1.0)
 
+        # Simula o próprio processo (CPU, RSS e threads)
+        mock_process = mock_psutil.Process.return_value
+        mock_process.cpu_percent.return_value = 3.0
+        mock_process.memory_info.return_value.rss = 64 * 1024 * 1024
+        mock_process.num_threads.return_value = 9
+
         # --- 2. CONFIGURA O ESTADO DA "FAZENDA" ---
         self.server.task_queue = ["task1", "task2"]
         self.server.worker_status = {
-            "w1": {"last_seen": time.time(), "OWNER_ID": "1"},
-            "w2": {"last_seen": time.time() - 1000, "OWNER_ID": "1"}
+            "w1": WorkerRecord(addr=None, last_seen=time.time()),
+            "w2": WorkerRecord(addr=None, last_seen=time.time() - 1000)
         }
 
-        # --- 3. CONTROLE DO LOOP ---
-        
-        mock_sleep.return_value = None 
-
-        def stop_server_after_report(*args, **kwargs):
-            self.server._running = False
-            return {"mock": "payload"}
-
-        mock_payload_gen.side_effect = stop_server_after_report
+        mock_payload_gen.return_value = {"mock": "payload"}
 
-        # --- 4. EXECUTA (Act) ---
-        self.server._performance_reporter_loop()
+        # --- 3. EXECUTA (Act) ---
+        # O agendador chama o job a cada 'supervisor_interval'; aqui, um disparo
+        self.server._report_performance()
 
-        # --- 5. VERIFICA (Assert) ---
+        # --- 4. VERIFICA (Assert) ---
         
         # Verifica se psutil foi chamado
         mock_psutil.cpu_percent.assert_called()
@@ -96,6 +91,7 @@ class TestPerformanceThread(unittest.TestCase):
         
         # Verifica se gerou o payload
         self.assertTrue(mock_payload_gen.called)
+        self.server._send_to_supervisor.assert_called_once()
         
         # Valida os argumentos passados
         args, kwargs = mock_payload_gen.call_args
@@ -104,6 +100,7 @@ class TestPerformanceThread(unittest.TestCase):
 
         self.assertEqual(passed_system['cpu']['usage_percent'], 15.5)
         self.assertEqual(passed_system['memory']['total_mb'], 16384) 
+        self.assertEqual(passed_system['process'], {"cpu_percent": 3.0, "rss_mb": 64.0, "threads": 9})
         
         self.assertEqual(passed_farm['workers']['total_registered'], 2)
         self.assertEqual(passed_farm['workers']['workers_alive'], 1) 
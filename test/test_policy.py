@@ -0,0 +1,74 @@
+import unittest
+
+from server.dist_server.records import WorkerRecord
+from server.dist_server.policy import (load_action, select_workers_to_release, share_decision, release_retry_delay,
+                                       LOAD_REQUEST, LOAD_RELEASE, LOAD_STEADY, SHARE_OK, SHARE_TOO_FEW_WORKERS,
+                                       SHARE_LOW_LOAD)
+from bench.policy_sim import PolicySimulator, base_config, resolve_policy
+
+
+class TestPolicy(unittest.TestCase):
+
+    def test_load_and_share_decisions(self):
+        """
+        Testa as regras de decisão: limites da fila e aprovação de WORKER_REQUEST.
+        """
+        # 1. Prepara / 2. Age / 3. Verifica
+        self.assertEqual(load_action(16, 5, 15), LOAD_REQUEST)
+        self.assertEqual(load_action(15, 5, 15), LOAD_STEADY)
+        self.assertEqual(load_action(4, 5, 15), LOAD_RELEASE)
+
+        self.assertEqual(share_decision(2, 10, 2, 1), (False, SHARE_TOO_FEW_WORKERS))
+        self.assertEqual(share_decision(3, 0, 2, 1), (False, SHARE_LOW_LOAD))
+        self.assertEqual(share_decision(3, 1, 2, 1), (True, SHARE_OK))
+
+        self.assertEqual([release_retry_delay(a) for a in range(1, 5)], [5, 10, 20, 30])
+
+    def test_select_workers_to_release(self):
+        """
+        Testa o agrupamento por dono: ignora os da casa e os já notificados,
+        e respeita o limite de 'min_workers_before_sharing'.
+        """
+        # 1. Prepara
+        worker_status = {
+            "W1": WorkerRecord(addr=None, last_seen=0),
+            "W2": WorkerRecord(addr=None, last_seen=0, owner_id="SERVER_2"),
+            "W3": WorkerRecord(addr=None, last_seen=0, owner_id="SERVER_2", release_notified=True),
+            "W4": WorkerRecord(addr=None, last_seen=0, owner_id="SERVER_3"),
+            "W5": WorkerRecord(addr=None, last_seen=0, owner_id="SERVER_2"),
+        }
+
+        # 2. Age
+        unlimited = select_workers_to_release(worker_status, min_workers=10)
+        limited = select_workers_to_release(worker_status, min_workers=3)
+
+        # 3. Verifica
+        self.assertEqual(unlimited, {"SERVER_2": [{"id": "W2"}, {"id": "W5"}], "SERVER_3": [{"id": "W4"}]})
+        self.assertEqual(limited, {"SERVER_2": [{"id": "W2"}], "SERVER_3": [{"id": "W4"}]})
+
+    def test_simulator_lends_workers_to_hot_server(self):
+        """
+        Testa o simulador: com carga concentrada no servidor 0, a política
+        padrão gera REDIRECTs e 'no_sharing' não; a carga é a mesma nos dois.
+        """
+        # 1. Prepara
+        workload = {"servers": 3, "workers": 30, "duration": 600, "work_time": 5.0, "skew": 0.6, "seed": 7}
+        base = base_config()
+
+        # 2. Age
+        results = {}
+        for spec in ("baseline", "no_sharing"):
+            name, config = resolve_policy(spec, base)
+            results[name] = PolicySimulator(config, workload).run()
+
+        # 3. Verifica
+        self.assertGreater(results["baseline"]["migrations"]["redirects"], 0)
+        self.assertEqual(results["no_sharing"]["migrations"]["redirects"], 0)
+        self.assertEqual(results["baseline"]["counters"]["arrived"], results["no_sharing"]["counters"]["arrived"])
+        self.assertGreater(results["baseline"]["throughput"], 0)
+        with self.assertRaises(ValueError):
+            resolve_policy("unknown", base)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from worker.dist_worker.prefetch import PrefetchMixin
+from worker.dist_worker.main_loop import LogicMixin
+from worker.dist_worker.client_actions import ClientActionsMixin
+from worker.dist_worker.endpoints import EndpointTable
+from server.dist_server.connection_handler import ConnectionHandlerMixin
+from server.dist_server.state_helpers import StateHelpersMixin
+from server.dist_server.executor import BoundedExecutor
+from server.dist_server.records import QueuedTask, InflightTask
+from payload_models import task_handback
+from transport import LoopbackTransport
+from test.server_state import init_server_state
+
+
+class DummyWorker(PrefetchMixin, LogicMixin):
+    def __init__(self, ttl: float = 30):
+        self.worker_id = "W1"
+        self._running = True
+        self.concurrency = 1
+        self._inflight = 0
+        self.home_host, self.home_port = "127.0.0.1", 9001
+        self.current_master_host, self.current_master_port = "127.0.0.1", 9002
+        self._failed_over = False
+        self.endpoints = EndpointTable()
+        self._init_prefetch({'prefetch': {'depth': 4, 'ttl': ttl}})
+        self._connect_and_send = MagicMock(return_value={"STATUS": "ACK"})
+
+
+class DummyServer(ConnectionHandlerMixin, StateHelpersMixin):
+    def __init__(self, transport):
+        self.transport = transport
+        self.host, self.port = "127.0.0.1", 9001
+        self.id = "SERVER_TEST"
+        self._running = True
+        self.server_socket = None
+        init_server_state(self)
+        self.task_queue.append(QueuedTask("t9", "QUERY", "Maria"))
+        self.connection_pool = BoundedExecutor(max_workers=4, max_queue=16, name="Conn")
+        self.connection_idle_timeout = 5
+
+
+class DummyClient(ClientActionsMixin):
+    def __init__(self, transport):
+        self.transport = transport
+        self._running = True
+        self.connect_timeout = 2
+
+
+def _task(task_id):
+    return {"TASK": "QUERY", "USER": "Arthur", "TASK_ID": task_id}
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def test_expired_tasks_are_handed_back(self):
+        """
+        Testa o TTL do buffer: tarefas velhas voltam (HANDBACK) para o
+        mestre que as entregou e o slot recebe a primeira tarefa válida.
+        """
+        # 1. Prepara
+        worker = DummyWorker(ttl=5)
+        now = time.time()
+        worker.task_buffer.extend([
+            (_task("t1"), "127.0.0.1", 9001, now - 60),
+            (_task("t2"), "127.0.0.1", 9002, now - 30),
+            (_task("t3"), "127.0.0.1", 9001, now),
+        ])
+
+        # 2. Age
+        entry = worker._take_buffered_task()
+
+        # 3. Verifica
+        self.assertEqual(entry[0]["TASK_ID"], "t3")
+        self.assertEqual(worker._inflight, 1)
+        sent = {(c.args[1], c.args[2]): [t["TASK_ID"] for t in c.args[0]["TASKS"]]
+                for c in worker._connect_and_send.call_args_list}
+        self.assertEqual(sent, {("127.0.0.1", 9001): ["t1"], ("127.0.0.1", 9002): ["t2"]})
+        self.assertTrue(all(c.args[0]["STATUS"] == "HANDBACK" for c in worker._connect_and_send.call_args_list))
+
+    def test_redirect_and_return_drain_buffer(self):
+        """
+        Testa que REDIRECT e RETURN esvaziam o buffer: as tarefas
+        pré-buscadas voltam ao mestre antigo, na ordem recebida.
+        """
+        # 1. Prepara
+        worker = DummyWorker()
+        worker._buffer_task(_task("t1"), "127.0.0.1", 9002)
+        worker._buffer_task(_task("t2"), "127.0.0.1", 9002)
+
+        # 2. Age
+        redirect = worker._process_response({"TASK": "REDIRECT", "SERVER_REDIRECT": {"ip": "127.0.0.1", "port": 9003}},
+                                            "127.0.0.1", 9002)
+        worker._buffer_task(_task("t3"), "127.0.0.1", 9003)
+        returned = worker._process_response({"TASK": "RETURN", "SERVER_RETURN": {"ip": "127.0.0.1", "port": 9001}},
+                                            "127.0.0.1", 9003)
+
+        # 3. Verifica
+        self.assertEqual((redirect, returned), ("REDIRECT", "RETURN"))
+        self.assertEqual(len(worker.task_buffer), 0)
+        calls = worker._connect_and_send.call_args_list
+        self.assertEqual([t["TASK_ID"] for t in calls[0].args[0]["TASKS"]], ["t1", "t2"])
+        self.assertEqual(calls[0].args[1:3], ("127.0.0.1", 9002))
+        self.assertEqual(calls[1].args[1:3], ("127.0.0.1", 9003))
+        self.assertEqual((worker.current_master_host, worker.current_master_port), ("127.0.0.1", 9001))
+
+    def test_server_puts_handback_at_front(self):
+        """
+        Testa o lado do servidor: o HANDBACK recebido pela rota de status
+        recoloca as tarefas no início da fila (na ordem) e as tira de 'em voo'.
+        """
+        # 1. Prepara
+        transport = LoopbackTransport()
+        server = DummyServer(transport)
+        server.inflight_tasks = {"t1": InflightTask(QueuedTask.from_wire(_task("t1")), "W1", time.time())}
+        listener_thread = threading.Thread(target=server._listen_loop, daemon=True)
+        listener_thread.start()
+        client = DummyClient(transport)
+
+        # 2. Age (espera o listener registrar o endereço)
+        response = None
+        deadline = time.monotonic() + 2
+        while response is None and time.monotonic() < deadline:
+            response = client._connect_and_send(task_handback("W1", [_task("t1"), _task("t2")]), "127.0.0.1", 9001)
+            time.sleep(0.01)
+
+        server._running = False
+        server.server_socket.close()
+        listener_thread.join(timeout=3)
+
+        # 3. Verifica
+        self.assertEqual(response["STATUS"], "ACK")
+        self.assertEqual([t.task_id for t in server.task_queue], ["t1", "t2", "t9"])
+        self.assertEqual(server.inflight_tasks, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
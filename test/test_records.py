@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+from collections import deque
+
+from server.dist_server.records import QueuedTask, InflightTask, WorkerRecord, intern_id
+from server.dist_server.state_helpers import StateHelpersMixin
+from server.dist_server.task_log import TaskLog
+from test.server_state import init_server_state
+
+
+class TestRecords(unittest.TestCase):
+
+    def test_queued_task_round_trip_is_compact(self):
+        """
+        Testa o registro da fila: volta ao mesmo dict do protocolo (campos
+        extras preservados), não tem __dict__ e compartilha a string do USER.
+        """
+        # 1. Prepara
+        user = "".join(["Ma", "ria"])  # string nova, igual a "Maria"
+        wire = {"TASK": "QUERY", "USER": user, "TASK_ID": "t1", "ENQUEUED_AT": 10.0, "PRIORITY": 2}
+
+        # 2. Age
+        task = QueuedTask.from_wire(wire)
+        other = QueuedTask.from_wire({"TASK": "QUERY", "USER": "Maria", "TASK_ID": "t2"})
+
+        # 3. Verifica
+        self.assertEqual(task.to_wire(), wire)
+        self.assertEqual(other.to_wire(), {"TASK": "QUERY", "USER": "Maria", "TASK_ID": "t2"})
+        self.assertIsNone(other.extra)
+        self.assertIs(task.user, other.user)
+        self.assertIs(task.user, intern_id("Maria"))
+        self.assertFalse(hasattr(task, "__dict__"))
+        self.assertFalse(hasattr(WorkerRecord(addr=None, last_seen=0), "__dict__"))
+
+    def test_checkpoint_serializes_records(self):
+        """
+        Testa o WAL com os registros: o checkpoint grava a fila e as tarefas
+        em voo (QueuedTask/InflightTask) e o replay as reconstrói.
+        """
+        # 1. Prepara
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "tasks.wal")
+        log = TaskLog(path, fsync_batch=1)
+        queue = deque([QueuedTask("t1", "QUERY", "Arthur", 1.0)])
+        inflight = {"t2": InflightTask(QueuedTask("t2", "QUERY", "Maria", 2.0), "W1", 3.0)}
+
+        # 2. Age
+        log.checkpoint(queue, inflight)
+        log.close()
+        server = init_server_state(StateHelpersMixin())
+        server._restore_tasks(*TaskLog.replay(path))
+        shutil.rmtree(tmpdir)
+
+        # 3. Verifica
+        self.assertEqual(list(server.task_queue), list(queue))
+        self.assertEqual(server.inflight_tasks, inflight)
+
+
+if __name__ == '__main__':
+    unittest.main()
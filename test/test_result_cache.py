@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from server.dist_server.state_helpers import StateHelpersMixin
+from server.dist_server.result_cache import ResultCache, MISS
+from server.dist_server.records import QueuedTask
+from server.dist_server.task_log import TaskLog
+from test.server_state import init_server_state
+
+
+class DummyServer(StateHelpersMixin):
+    def __init__(self, cache_config: dict):
+        init_server_state(self, config={'result_cache': cache_config})
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_cached_queries_complete_without_worker(self):
+        """
+        Testa o cache de consultas: o OK do worker é guardado por usuário;
+        as consultas iguais que estavam na fila e as que chegam depois são
+        concluídas no servidor, e o relatório traz as taxas de acerto.
+        """
+        # 1. Prepara
+        server = DummyServer({'enabled': True, 'ttl': 60})
+        server._enqueue_tasks([{"TASK": "QUERY", "USER": "Arthur"} for _ in range(3)])
+
+        # 2. Age
+        task = server._dequeue_task("W1")
+        server._complete_task("W1", "OK", task["TASK_ID"], 0.1)
+        drained = server._dequeue_task("W1")
+        accepted = server._enqueue_tasks([{"TASK": "QUERY", "USER": "Arthur"}, {"TASK": "QUERY", "USER": "Maria"}])
+        report = server.result_cache.report()
+
+        # 3. Verifica
+        self.assertIsNone(drained) # As 2 consultas restantes saíram da fila pelo cache
+        self.assertEqual(accepted, 2)
+        self.assertEqual([t.user for t in server.task_queue], ["Maria"])
+        self.assertEqual(server.metrics.counters["tasks_cache_hit"], 3)
+        self.assertEqual(len(server.completed_task_timestamps), 3)
+        self.assertEqual(report["hits"], 3)
+        self.assertEqual(report["misses"], 5)
+        self.assertEqual(report["hit_rate"], 0.375)
+        self.assertEqual(server.result_cache.report()["hits"], 0) # Zera a cada relatório
+
+    def test_handback_of_cached_query_completes_once(self):
+        """
+        Testa o HANDBACK de uma consulta cujo resultado já está em cache: ela
+        sai da tabela 'em voo' (não é reenfileirada pelo timeout de despacho) e
+        é concluída uma única vez, com DONE no WAL.
+        """
+        # 1. Prepara
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "tasks.wal")
+        server = DummyServer({'enabled': True, 'ttl': 60})
+        server.task_log = TaskLog(path, fsync_batch=1)
+        server._enqueue_tasks([{"TASK": "QUERY", "USER": "Arthur"} for _ in range(2)])
+        first = server._dequeue_task("W1")
+        prefetched = server._dequeue_task("W1")
+        server._complete_task("W1", "OK", first["TASK_ID"])
+
+        # 2. Age
+        server._enqueue_tasks([prefetched], front=True)
+        drained = server._dequeue_task("W1")
+        requeued = server._requeue_stale_inflight(timeout=0, now=prefetched["ENQUEUED_AT"] + 60)
+        server.task_log.close()
+        queue, inflight = TaskLog.replay(path)
+        shutil.rmtree(tmpdir)
+
+        # 3. Verifica
+        self.assertIsNone(drained)
+        self.assertEqual(server.inflight_tasks, {})
+        self.assertEqual(requeued, 0)
+        self.assertEqual(server.metrics.counters["tasks_cache_hit"], 1)
+        self.assertEqual((queue, inflight), ([], {}))
+
+    def test_expired_or_failed_query_goes_to_worker(self):
+        """
+        Testa os limites do cache: NOK não é guardado, entrada mais velha que
+        o TTL é descartada e o LRU mantém no máximo 'max_entries' usuários.
+        """
+        # 1. Prepara
+        cache = ResultCache({'enabled': True, 'ttl': 10, 'max_entries': 2})
+        arthur, maria, joao = (QueuedTask(f"t{user}", "QUERY", user) for user in ("Arthur", "Maria", "Joao"))
+
+        # 2. Age
+        cache.task_completed(arthur, "NOK", dispatched_at=0, now=1)
+        after_nok = cache.lookup(arthur, now=2)
+        cache.task_completed(arthur, "OK", dispatched_at=0, now=1)
+        fresh = cache.lookup(arthur, now=5)
+        expired = cache.lookup(arthur, now=20)
+        for task in (arthur, maria, joao):
+            cache.task_completed(task, "OK", dispatched_at=20, now=21)
+
+        # 3. Verifica
+        self.assertIs(after_nok, MISS)
+        self.assertEqual(fresh, "OK")
+        self.assertIs(expired, MISS)
+        self.assertIs(cache.lookup(arthur, now=22), MISS) # O mais antigo saiu pelo LRU
+        self.assertEqual(cache.lookup(joao, now=22), "OK")
+        self.assertEqual(cache.evictions, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
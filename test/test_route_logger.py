@@ -0,0 +1,84 @@
+import unittest
+
+from logs.logger import RouteLogger
+
+
+class FakeSink:
+    """Imita o logger do loguru: guarda (nível, mensagem já formatada)."""
+
+    def __init__(self):
+        self.lines = []
+
+    def opt(self, **kwargs):
+        return self
+
+    def log(self, level, message, *args, **kwargs):
+        self.lines.append((level, message.format(*args, **kwargs)))
+
+    def info(self, message):
+        self.lines.append(("INFO", message))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRouteLogger(unittest.TestCase):
+
+    def test_sample_rate_and_passthrough(self):
+        """
+        Testa as políticas por rota: 'sample' emite 1 a cada N, 'rate' segue
+        o token bucket, rotas não listadas e WARNING sempre saem.
+        """
+        # 1. Prepara
+        clock, sink = FakeClock(), FakeSink()
+        config = {"summary_interval": 1000, "routes": {
+            "DISPATCH": {"mode": "sample", "sample_every": 10},
+            "STATUS": {"mode": "rate", "rate": 2, "burst": 2},
+        }}
+        routes = RouteLogger(config, clock=clock, sink=sink)
+
+        # 2. Age
+        sampled = sum(routes.log("DISPATCH", "INFO", "tarefa {}", i) for i in range(25))
+        burst = sum(routes.log("STATUS", "INFO", "status") for _ in range(5))
+        clock.now = 1.0
+        refilled = sum(routes.log("STATUS", "INFO", "status") for _ in range(5))
+        routes.log("NO_TASK", "WARNING", "aviso")
+        routes.log("HEARTBEAT", "INFO", "heartbeat {}", "S2")
+
+        # 3. Verifica
+        self.assertEqual(sampled, 3)
+        self.assertEqual(sink.lines[:2], [("INFO", "tarefa 0"), ("INFO", "tarefa 10")])
+        self.assertEqual((burst, refilled), (2, 2))
+        self.assertIn(("WARNING", "aviso"), sink.lines)
+        self.assertIn(("INFO", "heartbeat S2"), sink.lines)
+
+    def test_summary_replaces_per_event_lines(self):
+        """
+        Testa o modo 'summary': nenhuma linha por evento e um resumo por
+        janela; prefixo "WORKER.CONNECT" usa a política de "WORKER".
+        """
+        # 1. Prepara
+        clock, sink = FakeClock(), FakeSink()
+        routes = RouteLogger({"summary_interval": 10}, clock=clock, sink=sink)
+
+        # 2. Age
+        for _ in range(50):
+            routes.log("DISPATCH", "INFO", "Enviando tarefa para {}.", "W1")
+            routes.log("WORKER.CONNECT", "INFO", "Conexão de {}", "W1")
+        clock.now = 10.0
+        routes.log("DISPATCH", "INFO", "Enviando tarefa para {}.", "W1")
+
+        # 3. Verifica
+        self.assertEqual(len(sink.lines), 2)
+        self.assertIn("[SUMMARY] 51 tarefas despachadas nos últimos 10.0 s", sink.lines[0][1])
+        self.assertIn("50 conexões de worker", sink.lines[1][1])
+        self.assertEqual(routes.totals()["DISPATCH"], 51)
+
+
+if __name__ == '__main__':
+    unittest.main()
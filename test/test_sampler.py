@@ -0,0 +1,45 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from server.dist_server.sampler import SystemSampler
+
+
+class TestSystemSampler(unittest.TestCase):
+
+    @patch('server.dist_server.sampler.psutil')
+    def test_static_once_and_never_blocks(self, mock_psutil):
+        """
+        Testa que cpu_count é lido uma vez só, que cpu_percent nunca usa
+        intervalo (não bloqueia) e que system_data não chama o psutil.
+        """
+        # 1. Prepara
+        mock_psutil.cpu_percent.return_value = 42.0
+        mock_psutil.cpu_count.return_value = 8
+        mock_psutil.getloadavg.return_value = (0.5, 0.4, 0.3)
+        mock_psutil.virtual_memory.return_value = MagicMock(total=2 * 1024**3, available=1024**3, percent=50.0, used=1024**3)
+        mock_psutil.disk_usage.return_value = MagicMock(total=100 * 1024**3, free=40 * 1024**3, percent=60.0)
+        mock_process = mock_psutil.Process.return_value
+        mock_process.cpu_percent.return_value = 1.5
+        mock_process.memory_info.return_value.rss = 32 * 1024 * 1024
+        mock_process.num_threads.return_value = 12
+        sampler = SystemSampler()
+
+        # 2. Age
+        for _ in range(3):
+            sampler.sample()
+        calls_before = len(mock_psutil.mock_calls)
+        data = sampler.system_data(uptime=75.9)
+
+        # 3. Verifica
+        self.assertEqual(mock_psutil.cpu_count.call_count, 2)  # lógicas e físicas, uma vez
+        for call in mock_psutil.cpu_percent.call_args_list:
+            self.assertEqual(call.kwargs, {"interval": None})
+        self.assertEqual(len(mock_psutil.mock_calls), calls_before)
+        self.assertEqual(data["uptime_seconds"], 75)
+        self.assertEqual(data["cpu"], {"usage_percent": 42.0, "count_logical": 8, "count_physical": 8})
+        self.assertEqual(data["memory"]["total_mb"], 2048)
+        self.assertEqual(data["process"], {"cpu_percent": 1.5, "rss_mb": 32.0, "threads": 12})
+
+
+if __name__ == '__main__':
+    unittest.main()
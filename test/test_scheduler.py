@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+
+from server.dist_server.scheduler import Scheduler, ManualClock
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_periodic_and_one_shot_on_virtual_clock(self):
+        """
+        Testa o relógio virtual: jobs periódicos disparam a cada intervalo,
+        o one-shot dispara uma vez e um timer cancelado não dispara mais.
+        """
+        # 1. Prepara
+        clock = ManualClock()
+        scheduler = Scheduler(clock=clock)
+        fired = []
+        scheduler.call_every(10, lambda: fired.append(("hb", clock())), first_delay=0)
+        scheduler.call_later(25, lambda: fired.append(("retry", clock())))
+        report = scheduler.call_every(15, lambda: fired.append(("report", clock())))
+
+        # 2. Age
+        scheduler.advance(30)
+        report.cancel()
+        scheduler.advance(30)
+
+        # 3. Verifica
+        self.assertEqual(fired[:5], [("hb", 0), ("hb", 10), ("report", 15), ("hb", 20), ("retry", 25)])
+        self.assertEqual([t for name, t in fired if name == "report"], [15, 30])
+        self.assertEqual([t for name, t in fired if name == "hb"], [0, 10, 20, 30, 40, 50, 60])
+        self.assertEqual(scheduler.pending(), 1)
+
+    def test_threads_wake_on_new_timer_and_stop_immediately(self):
+        """
+        Testa as threads: um timer novo acorda quem dorme esperando um timer
+        distante; stop() encerra na hora e um job que falha não derruba nada.
+        """
+        # 1. Prepara
+        scheduler = Scheduler(threads=1)
+        done = threading.Event()
+        scheduler.call_later(3600, done.set)
+        scheduler.start()
+        time.sleep(0.02)
+
+        # 2. Age
+        scheduler.call_later(0, lambda: 1 / 0)
+        scheduler.call_later(0.01, done.set)
+        woke = done.wait(timeout=1)
+        started = time.monotonic()
+        scheduler.stop()
+        stop_seconds = time.monotonic() - started
+
+        # 3. Verifica
+        self.assertTrue(woke)
+        self.assertEqual(scheduler.failed, 1)
+        self.assertLess(stop_seconds, 0.5)
+        self.assertEqual(scheduler.pending(), 0)
+        self.assertTrue(scheduler.call_later(0, done.set).cancelled)
+
+
+if __name__ == '__main__':
+    unittest.main()
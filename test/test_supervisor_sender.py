@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from server.dist_server.supervisor_sender import SupervisorSender
+from transport import LoopbackTransport
+
+
+class FakeSupervisor:
+    """Supervisor em loopback: guarda cada linha JSON recebida."""
+
+    def __init__(self, transport, host="127.0.0.1", port=34121):
+        self.received = []
+        self.listener = transport.listen(host, port)
+        self.listener.settimeout(0.2)
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self.listener.accept()
+            except Exception:
+                continue
+            threading.Thread(target=self._read_loop, args=(conn,), daemon=True).start()
+
+    def _read_loop(self, conn):
+        reader = conn.makefile('r', encoding='utf-8')
+        while True:
+            try:
+                line = reader.readline()
+            except Exception:
+                return
+            if not line:
+                return
+            self.received.append(json.loads(line))
+
+    def stop(self):
+        self._running = False
+        self.listener.close()
+        self._thread.join(timeout=2)
+
+
+def _report(n, cpu=10):
+    return {"server_uuid": "SERVER_TEST", "seq": n,
+            "performance": {"system": {"cpu": cpu}, "farm_state": {"tasks_pending": n}}}
+
+
+def _wait_for(predicate, timeout=3):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestSupervisorSender(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.spool_path = os.path.join(self.tmp_dir, "supervisor.spool")
+        self.transport = LoopbackTransport()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_spool_while_down_and_replay_in_order(self):
+        """
+        Testa o spool: com o supervisor fora, os relatórios vão para o disco;
+        quando ele volta, o spool é reenviado antes dos relatórios novos.
+        """
+        # 1. Prepara
+        sender = SupervisorSender(self.transport, "127.0.0.1", 34121, spool_path=self.spool_path,
+                                  retry_base=0.05, retry_max=0.05)
+
+        # 2. Age
+        for n in range(3):
+            sender.submit(_report(n))
+        spooled = _wait_for(lambda: sender.spooled == 3)
+        supervisor = FakeSupervisor(self.transport)
+        try:
+            sender.submit(_report(3))
+            delivered = _wait_for(lambda: len(supervisor.received) == 4)
+        finally:
+            sender.close()
+            supervisor.stop()
+
+        # 3. Verifica
+        self.assertTrue(spooled)
+        self.assertTrue(delivered)
+        self.assertEqual([r["seq"] for r in supervisor.received], [0, 1, 2, 3])
+        self.assertEqual(sender.sent, 4)
+        self.assertFalse(os.path.exists(self.spool_path))
+
+    def test_batches_share_one_connection(self):
+        """
+        Testa o envio em lote: relatórios acumulados saem por uma única
+        conexão, em blocos de até 'max_batch' linhas, na ordem enviada.
+        """
+        # 1. Prepara
+        supervisor = FakeSupervisor(self.transport)
+        sender = SupervisorSender(self.transport, "127.0.0.1", 34121, spool_path=self.spool_path, max_batch=2)
+        connects = []
+        original_connect = self.transport.connect
+
+        def counting_connect(*args, **kwargs):
+            connects.append(args)
+            return original_connect(*args, **kwargs)
+
+        self.transport.connect = counting_connect
+
+        # 2. Age
+        try:
+            for n in range(7):
+                sender.submit(_report(n))
+            delivered = _wait_for(lambda: len(supervisor.received) == 7)
+        finally:
+            sender.close()
+            supervisor.stop()
+
+        # 3. Verifica
+        self.assertTrue(delivered)
+        self.assertEqual([r["seq"] for r in supervisor.received], list(range(7)))
+        self.assertEqual(len(connects), 1)
+        self.assertEqual(sender.spooled, 0)
+
+    def test_delta_omits_unchanged_sections(self):
+        """
+        Testa o modo delta: seções iguais às do relatório anterior saem em
+        'unchanged' e a cada 'delta_full_every' vai um relatório completo.
+        """
+        # 1. Prepara
+        sender = SupervisorSender(self.transport, "127.0.0.1", 34121, delta=True, delta_full_every=3)
+        sender.close()
+
+        # 2. Age
+        encoded = [json.loads(sender._encode(_report(n))) for n in range(4)]
+
+        # 3. Verifica
+        self.assertEqual(encoded[0]["performance"], _report(0)["performance"])
+        self.assertEqual(encoded[1]["performance"], {"farm_state": {"tasks_pending": 1}, "unchanged": ["system"]})
+        self.assertEqual(encoded[2]["performance"]["unchanged"], ["system"])
+        self.assertEqual(encoded[3]["performance"], _report(3)["performance"])
+
+
+if __name__ == '__main__':
+    unittest.main()
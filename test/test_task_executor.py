@@ -0,0 +1,113 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from worker.dist_worker.task_executor import ExecutionMixin
+from worker.dist_worker.prefetch import PrefetchMixin
+
+
+class DummyWorker(ExecutionMixin, PrefetchMixin):
+    def __init__(self, concurrency: int):
+        self.worker_id = "W1"
+        self._running = True
+        self.current_master_host, self.current_master_port = "127.0.0.1", 9001
+        self._init_prefetch({})
+        self._init_execution({'execution': {'concurrency': concurrency, 'work_time': 0}})
+        self._connect_and_send = MagicMock(return_value={"STATUS": "ACK"})
+
+    def run(self, task_ids: list, timeout: float = 5) -> bool:
+        """Bufferiza as tarefas, sobe os slots e espera o buffer esvaziar com todos os slots livres."""
+        for task_id in task_ids:
+            self._buffer_task({"TASK": "QUERY", "USER": "Arthur", "TASK_ID": task_id}, "127.0.0.1", 9001)
+        self._start_slots()
+        with self._buffer_cond:
+            done = self._buffer_cond.wait_for(lambda: not self.task_buffer and self._inflight == 0, timeout)
+            self._running = False
+            self._buffer_cond.notify_all()
+        self._shutdown_execution()
+        return done
+
+    def reported(self) -> list:
+        return [c.args[0]["TASK_ID"] for c in self._connect_and_send.call_args_list]
+
+
+class TestTaskExecutor(unittest.TestCase):
+
+    def test_slots_run_tasks_concurrently(self):
+        """
+        Testa os slots: com concurrency=3, as três tarefas executam ao mesmo
+        tempo (a barreira só abre com as três dentro de _execute_task).
+        """
+        # 1. Prepara
+        worker = DummyWorker(concurrency=3)
+        barrier = threading.Barrier(3, timeout=2)
+
+        def execute(task):
+            barrier.wait() # BrokenBarrierError se as três não chegarem juntas
+            return "OK"
+        worker._execute_task = execute
+
+        # 2. Age
+        done = worker.run(["t1", "t2", "t3"])
+
+        # 3. Verifica
+        self.assertTrue(done)
+        self.assertFalse(barrier.broken)
+        self.assertEqual(sorted(worker.reported()), ["t1", "t2", "t3"])
+        self.assertEqual(worker.tasks_completed, 3)
+
+    def test_inflight_never_exceeds_concurrency(self):
+        """
+        Testa o limite: com 10 tarefas no buffer e concurrency=2, no máximo
+        duas executam ao mesmo tempo, e as dez terminam.
+        """
+        # 1. Prepara
+        worker = DummyWorker(concurrency=2)
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def execute(task):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            threading.Event().wait(0.02)
+            with lock:
+                running[0] -= 1
+            return "OK"
+        worker._execute_task = execute
+
+        # 2. Age
+        done = worker.run([f"t{i}" for i in range(10)])
+
+        # 3. Verifica
+        self.assertTrue(done)
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(worker.tasks_completed, 10)
+        self.assertEqual(len(worker.reported()), 10)
+
+    def test_failing_task_frees_its_slot(self):
+        """
+        Testa a falha: uma tarefa que levanta exceção não reporta status,
+        mas libera o slot (_inflight volta a 0) e a próxima tarefa executa.
+        """
+        # 1. Prepara
+        worker = DummyWorker(concurrency=1)
+
+        def execute(task):
+            if task["TASK_ID"] == "t1":
+                raise RuntimeError("falha simulada")
+            return "OK"
+        worker._execute_task = execute
+
+        # 2. Age
+        done = worker.run(["t1", "t2"])
+
+        # 3. Verifica
+        self.assertTrue(done)
+        self.assertEqual(worker._inflight, 0)
+        self.assertEqual(worker.reported(), ["t2"])
+        self.assertEqual(worker.tasks_completed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
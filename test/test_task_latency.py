@@ -0,0 +1,84 @@
+import time
+import unittest
+
+from payload_models import new_task_payload, task_status, server_performance_report
+from server.dist_server.state_helpers import StateHelpersMixin
+from server.dist_server.background_tasks import BackgroundTasksMixin
+from test.server_state import init_server_state
+
+
+class DummyServer(StateHelpersMixin, BackgroundTasksMixin):
+    def __init__(self):
+        init_server_state(self)
+
+
+class TestTaskLatency(unittest.TestCase):
+
+    def test_payloads_carry_lifecycle_fields(self):
+        """
+        Testa que a tarefa nasce com TASK_ID/ENQUEUED_AT, que o status leva
+        EXEC_TIME e que o relatório de performance inclui 'task_latency'.
+        """
+        # 1. Prepara
+        before = time.time()
+
+        # 2. Age
+        task = new_task_payload("Arthur")
+        status = task_status("W1", "OK", "QUERY", task_id=task["TASK_ID"], exec_time=0.1234567)
+        report = server_performance_report("S1", {}, {}, {}, [], task_latency={"queue_wait": {"count": 1}})
+        legacy = server_performance_report("S1", {}, {}, {}, [])
+
+        # 3. Verifica
+        self.assertEqual(len(task["TASK_ID"]), 32)
+        self.assertGreaterEqual(task["ENQUEUED_AT"], before)
+        self.assertEqual(status["EXEC_TIME"], 0.123457)
+        self.assertNotIn("EXEC_TIME", task_status("W1", "OK", "QUERY"))
+        self.assertEqual(report["performance"]["task_latency"], {"queue_wait": {"count": 1}})
+        self.assertNotIn("task_latency", legacy["performance"])
+
+    def test_dequeue_and_complete_record_histograms(self):
+        """
+        Testa que o despacho registra a espera na fila, o status registra
+        execução e tempo total, e que o relatório zera os histogramas.
+        """
+        # 1. Prepara
+        server = DummyServer()
+        server._enqueue_tasks([{"TASK": "QUERY", "USER": "Arthur", "ENQUEUED_AT": time.time() - 2}])
+
+        # 2. Age
+        task = server._dequeue_task("W1")
+        server._complete_task("W1", "OK", task["TASK_ID"], 0.5)
+        summary = server._collect_task_latency()
+
+        # 3. Verifica
+        self.assertEqual(summary["queue_wait"]["count"], 1)
+        self.assertGreaterEqual(summary["queue_wait"]["min_ms"], 1900)
+        self.assertEqual(summary["execution"]["count"], 1)
+        self.assertAlmostEqual(summary["execution"]["p50_ms"], 500, delta=25)
+        self.assertGreaterEqual(summary["end_to_end"]["min_ms"], 1900)
+        self.assertEqual(server.task_latency["queue_wait"].count, 0)
+
+    def test_invalid_exec_time_is_ignored(self):
+        """
+        Testa que EXEC_TIME ou ENQUEUED_AT não numéricos não derrubam o
+        status: a tarefa sai de 'em voo' e só os tempos válidos entram.
+        """
+        # 1. Prepara
+        server = DummyServer()
+        server._enqueue_tasks([{"TASK": "QUERY", "USER": "Arthur"}, {"TASK": "QUERY", "USER": "Maria", "ENQUEUED_AT": "ontem"}])
+        first = server._dequeue_task("W1")
+        second = server._dequeue_task("W1")
+
+        # 2. Age
+        server._complete_task("W1", "OK", first["TASK_ID"], "rápido")
+        server._complete_task("W1", "OK", second["TASK_ID"], float("nan"))
+
+        # 3. Verifica
+        self.assertEqual(server.inflight_tasks, {})
+        self.assertEqual(server.task_latency["execution"].count, 0)
+        self.assertEqual(server.task_latency["queue_wait"].count, 1)
+        self.assertEqual(server.task_latency["end_to_end"].count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
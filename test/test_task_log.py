@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from server.dist_server.task_log import TaskLog
+from server.dist_server.state_helpers import StateHelpersMixin
+from test.server_state import init_server_state
+
+
+def _task(task_id, user="Maria"):
+    return {"TASK": "QUERY", "USER": user, "TASK_ID": task_id}
+
+
+class TestTaskLog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "tasks.wal")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_replay_rebuilds_queue_and_inflight(self):
+        """
+        Testa o restart: ENQ/DSP/DONE gravados devem reconstruir
+        a fila (na ordem) e a tabela de tarefas em voo.
+        """
+        # 1. Prepara
+        log = TaskLog(self.path, fsync_batch=2)
+        log.append({"EV": "ENQ", "TASKS": [_task("t1"), _task("t2"), _task("t3")], "FRONT": False})
+        log.append({"EV": "DSP", "ID": "t1", "WORKER": "w1", "TS": 1.0})
+        log.append({"EV": "DSP", "ID": "t2", "WORKER": "w1", "TS": 2.0})
+        log.append({"EV": "DONE", "ID": "t1", "STATUS": "OK"})
+        # t4 é devolvida (HANDBACK) para o início da fila
+        log.append({"EV": "ENQ", "TASKS": [_task("t4")], "FRONT": True})
+        log.close()
+
+        # 2. Age
+        queue, inflight = TaskLog.replay(self.path)
+
+        # 3. Verifica
+        self.assertEqual([t["TASK_ID"] for t in queue], ["t4", "t3"])
+        self.assertEqual(list(inflight.keys()), ["t2"])
+        self.assertEqual(inflight["t2"]["worker_id"], "w1")
+
+    def test_replay_starts_from_checkpoint(self):
+        """Testa se o checkpoint troca de segmento e o replay parte dele."""
+        # 1. Prepara
+        log = TaskLog(self.path)
+        log.append({"EV": "ENQ", "TASKS": [_task("t1"), _task("t2")], "FRONT": False})
+        log.checkpoint([_task("t2")], {})
+        log.append({"EV": "ENQ", "TASKS": [_task("t3")], "FRONT": False})
+        log.close()
+
+        # 2. Age
+        queue, inflight = TaskLog.replay(self.path)
+
+        # 3. Verifica: só o segmento pós-checkpoint sobrou em disco
+        segments = [f for f in os.listdir(self.tmpdir) if f.startswith("tasks.wal.0")]
+        self.assertEqual(len(segments), 1)
+        self.assertEqual([t["TASK_ID"] for t in queue], ["t2", "t3"])
+        self.assertEqual(inflight, {})
+
+    def test_replay_ignores_torn_tail(self):
+        """Testa se uma última linha incompleta (crash na escrita) é ignorada."""
+        log = TaskLog(self.path)
+        log.append({"EV": "ENQ", "TASKS": [_task("t1")], "FRONT": False}, wait=True)
+        segment_path = log._segment_path(log._segment)
+        log.close()
+
+        with open(segment_path, 'ab') as f:
+            f.write(b'{"EV":"ENQ","TASKS":[{"TASK":"QU')
+
+        queue, _ = TaskLog.replay(self.path)
+        self.assertEqual([t["TASK_ID"] for t in queue], ["t1"])
+
+    def test_stale_inflight_goes_back_to_front(self):
+        """
+        Testa o dispatch timeout: tarefas em voo recuperadas do WAL (ou de
+        worker morto) sem status voltam para o início da fila, com ENQ FRONT.
+        """
+        # 1. Prepara
+        log = TaskLog(self.path, fsync_batch=1)
+        log.append({"EV": "ENQ", "TASKS": [_task("t1"), _task("t2"), _task("t3")], "FRONT": False})
+        log.append({"EV": "DSP", "ID": "t1", "WORKER": "w_morto", "TS": 100.0})
+        log.append({"EV": "DSP", "ID": "t2", "WORKER": "w1", "TS": 190.0})
+        log.close()
+
+        server = init_server_state(StateHelpersMixin())
+        server._restore_tasks(*TaskLog.replay(self.path))
+        server.task_log = TaskLog(self.path, fsync_batch=1)
+
+        # 2. Age
+        requeued = server._requeue_stale_inflight(timeout=60, now=200.0)
+        server.task_log.close()
+        queue, inflight = TaskLog.replay(self.path)
+
+        # 3. Verifica
+        self.assertEqual(requeued, 1)
+        self.assertEqual([t.task_id for t in server.task_queue], ["t1", "t3"])
+        self.assertEqual(list(server.inflight_tasks), ["t2"])
+        self.assertEqual([t["TASK_ID"] for t in queue], ["t1", "t3"])
+        self.assertEqual(list(inflight), ["t2"])
@@ -0,0 +1,124 @@
+import json
+import socket
+import threading
+import time
+import unittest
+
+from server.dist_server.connection_handler import ConnectionHandlerMixin
+from server.dist_server.state_helpers import StateHelpersMixin
+from server.dist_server.executor import BoundedExecutor
+from server.dist_server.records import QueuedTask
+from worker.dist_worker.client_actions import ClientActionsMixin
+from payload_models import get_task
+from transport import LoopbackTransport
+from test.server_state import init_server_state
+
+
+class DummyServer(ConnectionHandlerMixin, StateHelpersMixin):
+    def __init__(self, transport):
+        self.transport = transport
+        self.host, self.port = "127.0.0.1", 9001
+        self.id = "SERVER_TEST"
+        self._running = True
+        self.server_socket = None
+        init_server_state(self)
+        self.task_queue.append(QueuedTask("t1", "QUERY", "Arthur"))
+        self.connection_pool = BoundedExecutor(max_workers=4, max_queue=16, name="Conn")
+        self.connection_idle_timeout = 5
+
+
+class DummyWorker(ClientActionsMixin):
+    def __init__(self, transport):
+        self.transport = transport
+        self._running = True
+        self.connect_timeout = 2
+
+
+class TestLoopbackTransport(unittest.TestCase):
+
+    def test_request_reply(self):
+        """
+        Testa uma troca de linhas pelo loopback: o cliente envia, o
+        "servidor" responde e fecha; o cliente lê a resposta e depois EOF.
+        """
+        # 1. Prepara
+        transport = LoopbackTransport()
+        listener = transport.listen("127.0.0.1", 9001)
+
+        def serve():
+            conn, addr = listener.accept()
+            with conn:
+                line = conn.makefile('r', encoding='utf-8').readline()
+                conn.sendall(line.upper().encode('utf-8'))
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+
+        # 2. Age
+        with transport.connect("127.0.0.1", 9001, timeout=2) as conn:
+            conn.sendall(b'{"ping": 1}\n')
+            reader = conn.makefile('r', encoding='utf-8')
+            reply = reader.readline()
+            eof = reader.readline()
+        thread.join()
+
+        # 3. Verifica
+        self.assertEqual(reply, '{"PING": 1}\n')
+        self.assertEqual(eof, '')
+
+    def test_refused_and_timeout(self):
+        """
+        Testa os erros "de socket": conexão recusada sem listener (ou depois
+        do close) e timeout de leitura/accept.
+        """
+        # 1. Prepara
+        transport = LoopbackTransport()
+
+        # 2. Age / 3. Verifica
+        with self.assertRaises(ConnectionRefusedError):
+            transport.connect("127.0.0.1", 9001)
+
+        listener = transport.listen("127.0.0.1", 9001)
+        listener.settimeout(0.05)
+        with self.assertRaises(socket.timeout):
+            listener.accept()
+
+        conn = transport.connect("127.0.0.1", 9001, timeout=0.05)
+        with self.assertRaises(socket.timeout):
+            conn.makefile('r').readline()
+
+        listener.close()
+        with self.assertRaises(ConnectionRefusedError):
+            transport.connect("127.0.0.1", 9001)
+
+    def test_worker_gets_task_from_server(self):
+        """
+        Testa o caminho completo em memória: _listen_loop do servidor e
+        _connect_and_send do worker, sem nenhum socket real.
+        """
+        # 1. Prepara
+        transport = LoopbackTransport()
+        server = DummyServer(transport)
+        listener_thread = threading.Thread(target=server._listen_loop, daemon=True)
+        listener_thread.start()
+        worker = DummyWorker(transport)
+
+        # 2. Age (espera o listener registrar o endereço)
+        response = None
+        deadline = time.monotonic() + 2
+        while response is None and time.monotonic() < deadline:
+            response = worker._connect_and_send(get_task("W1"), "127.0.0.1", 9001)
+            time.sleep(0.01)
+
+        server._running = False
+        server.server_socket.close()
+        listener_thread.join(timeout=3)
+
+        # 3. Verifica
+        self.assertEqual(response["TASK_ID"], "t1")
+        self.assertIn("t1", server.inflight_tasks)
+        self.assertFalse(listener_thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import patch
+
+from worker.dist_worker.backoff import AdaptiveBackoff, PollScheduler
+
+
+class TestAdaptiveBackoff(unittest.TestCase):
+
+    @patch('worker.dist_worker.backoff.uniform', return_value=0.0)
+    def test_exponential_with_cap(self, mock_uniform):
+        """
+        Testa a sequência de delays sem jitter:
+        1s, 2s, 4s, 8s e depois o teto de 10s.
+        """
+        # 1. Prepara
+        backoff = AdaptiveBackoff(base_delay=1, max_delay=10, factor=2, jitter_frac=0.2)
+
+        # 2. Age
+        delays = [backoff.next_delay() for _ in range(6)]
+
+        # 3. Verifica
+        self.assertEqual(delays, [1, 2, 4, 8, 10, 10])
+
+    @patch('worker.dist_worker.backoff.uniform', return_value=0.0)
+    def test_long_outage_stays_at_cap(self, mock_uniform):
+        """
+        Testa milhares de misses seguidos (servidor fora por horas): o delay
+        fica no teto, sem OverflowError, e o expoente para de crescer.
+        """
+        # 1. Prepara
+        backoff = AdaptiveBackoff(base_delay=1, max_delay=15, factor=2, jitter_frac=0.2)
+
+        # 2. Age
+        delays = [backoff.next_delay() for _ in range(5000)]
+
+        # 3. Verifica
+        self.assertEqual(delays[-1], 15)
+        self.assertLessEqual(backoff.attempt, 4)
+        backoff.reset()
+        self.assertEqual(backoff.next_delay(), 1)
+
+    def test_jitter_stays_in_range(self):
+        """Testa se o jitter fica dentro de +/- jitter_frac do delay."""
+        backoff = AdaptiveBackoff(base_delay=4, max_delay=4, factor=2, jitter_frac=0.25)
+        for _ in range(100):
+            delay = backoff.next_delay()
+            self.assertGreaterEqual(delay, 3.0)
+            self.assertLessEqual(delay, 5.0)
+
+    @patch('worker.dist_worker.backoff.uniform', return_value=0.0)
+    def test_productive_poll_resets(self, mock_uniform):
+        """
+        Testa o PollScheduler: polls vazios crescem o delay,
+        um poll produtivo volta ao delay base e não pausa.
+        """
+        # 1. Prepara
+        poller = PollScheduler({'polling': {'idle_base_delay': 0.5, 'idle_max_delay': 5}})
+
+        # 2. Age & 3. Verifica
+        self.assertEqual(poller.on_empty(), 0.5)
+        self.assertEqual(poller.on_empty(), 1.0)
+        self.assertEqual(poller.on_productive(), 0.0)
+        self.assertEqual(poller.on_empty(), 0.5)
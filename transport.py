@@ -0,0 +1,214 @@
+# transport.py
+"""
+Transporte usado por Servidor e Worker para abrir conexões e escutar.
+
+- TcpTransport: o comportamento normal (sockets TCP).
+- LoopbackTransport: tudo em memória, dentro do mesmo processo. Vários
+  servidores e workers trocam mensagens por buffers, sem portas reais.
+  Útil para testes e benchmarks grandes e determinísticos.
+
+As duas implementações devolvem objetos "tipo socket": sendall(), makefile(),
+settimeout(), close() e uso com 'with'. Assim o código de roteamento e de
+balanceamento roda igual nos dois casos.
+"""
+import io
+import socket
+import threading
+from collections import deque
+from itertools import count
+
+
+class TcpTransport:
+    """Transporte padrão: sockets TCP."""
+
+    def connect(self, host: str, port: int, timeout: float = None) -> socket.socket:
+        return socket.create_connection((host, port), timeout=timeout)
+
+    def listen(self, host: str, port: int) -> socket.socket:
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_socket.bind((host, port))
+        server_socket.listen()
+        return server_socket
+
+
+# --- LOOPBACK (em memória) ---
+
+class _Pipe:
+    """Um sentido da conexão: buffer de bytes com leitura bloqueante."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def write(self, data: bytes):
+        with self._cond:
+            if self._closed:
+                raise BrokenPipeError("Conexão loopback fechada.")
+            self._buffer += data
+            self._cond.notify_all()
+
+    def readline(self, timeout: float = None) -> bytes:
+        """Bloqueia até uma linha completa ou EOF (b'' quando fechado e vazio)."""
+        with self._cond:
+            while True:
+                end = self._buffer.find(b'\n')
+                if end != -1:
+                    line = bytes(self._buffer[:end + 1])
+                    del self._buffer[:end + 1]
+                    return line
+                if self._closed:
+                    line = bytes(self._buffer)
+                    self._buffer.clear()
+                    return line
+                if not self._cond.wait(timeout=timeout):
+                    raise socket.timeout("timed out")
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class _LoopbackFile(io.TextIOBase):
+    """O que makefile() devolve: leitura/escrita de texto sobre a conexão."""
+
+    def __init__(self, conn: "LoopbackConnection", encoding: str):
+        self._conn = conn
+        self._encoding = encoding or 'utf-8'
+
+    def readline(self, size: int = -1) -> str:
+        return self._conn._recv_line().decode(self._encoding)
+
+    def write(self, text: str) -> int:
+        self._conn.sendall(text.encode(self._encoding))
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class LoopbackConnection:
+    """Uma ponta de uma conexão em memória (interface mínima de socket)."""
+
+    def __init__(self, inbound: _Pipe, outbound: _Pipe):
+        self._inbound = inbound
+        self._outbound = outbound
+        self._timeout = None
+
+    def settimeout(self, timeout: float):
+        self._timeout = timeout
+
+    def sendall(self, data: bytes):
+        self._outbound.write(bytes(data))
+
+    def _recv_line(self) -> bytes:
+        return self._inbound.readline(timeout=self._timeout)
+
+    def makefile(self, mode: str = 'r', encoding: str = None) -> _LoopbackFile:
+        return _LoopbackFile(self, encoding)
+
+    def close(self):
+        # Fecha os dois sentidos: o outro lado lê EOF e não consegue mais escrever
+        self._outbound.close()
+        self._inbound.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class LoopbackListener:
+    """Fila de conexões pendentes de um endereço (equivalente ao socket de escuta)."""
+
+    def __init__(self, transport: "LoopbackTransport", address: tuple):
+        self._transport = transport
+        self._address = address
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._timeout = None
+        self._closed = False
+
+    def settimeout(self, timeout: float):
+        self._timeout = timeout
+
+    def _enqueue(self, conn: LoopbackConnection, addr: tuple):
+        with self._cond:
+            if self._closed:
+                raise ConnectionRefusedError(f"Nada escutando em {self._address[0]}:{self._address[1]}")
+            self._pending.append((conn, addr))
+            self._cond.notify()
+
+    def accept(self) -> tuple:
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    raise OSError("Listener loopback fechado.")
+                if not self._cond.wait(timeout=self._timeout):
+                    raise socket.timeout("timed out")
+            return self._pending.popleft()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            pending = list(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+        # Quem estava na fila de accept vê a conexão cair
+        for conn, _ in pending:
+            conn.close()
+        self._transport._unregister(self._address, self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class LoopbackTransport:
+    """
+    Transporte em memória. Uma mesma instância deve ser compartilhada por
+    todos os servidores e workers que precisam se enxergar.
+    Endereços (host, porta) são só chaves: não há portas reais.
+    """
+
+    def __init__(self):
+        self._listeners = {}   # (host, porta) -> LoopbackListener
+        self._lock = threading.Lock()
+        self._client_ports = count(50000)
+
+    def listen(self, host: str, port: int) -> LoopbackListener:
+        address = (host, port)
+        with self._lock:
+            if address in self._listeners:
+                raise OSError(f"Endereço {host}:{port} já está em uso (loopback).")
+            listener = LoopbackListener(self, address)
+            self._listeners[address] = listener
+            return listener
+
+    def _unregister(self, address: tuple, listener: LoopbackListener):
+        with self._lock:
+            if self._listeners.get(address) is listener:
+                del self._listeners[address]
+
+    def connect(self, host: str, port: int, timeout: float = None) -> LoopbackConnection:
+        with self._lock:
+            listener = self._listeners.get((host, port))
+            client_addr = ("loopback", next(self._client_ports))
+        if listener is None:
+            raise ConnectionRefusedError(f"Nada escutando em {host}:{port} (loopback).")
+
+        to_server, to_client = _Pipe(), _Pipe()
+        client = LoopbackConnection(inbound=to_client, outbound=to_server)
+        server = LoopbackConnection(inbound=to_server, outbound=to_client)
+        client.settimeout(timeout)
+        listener._enqueue(server, client_addr)
+        return client
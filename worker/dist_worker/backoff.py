@@ -0,0 +1,70 @@
+# dist_worker/backoff.py
+from random import uniform
+
+
+class AdaptiveBackoff:
+    """
+    Backoff exponencial com cap e jitter (mesma fórmula do heartbeat do servidor).
+    Cada 'miss' consecutivo multiplica o delay por 'factor'; um 'hit' zera a sequência.
+    """
+
+    def __init__(self, base_delay: float, max_delay: float, factor: float = 2, jitter_frac: float = 0.1):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter_frac = jitter_frac
+        self.attempt = 0
+
+    def reset(self):
+        """Chamado após um poll produtivo: o próximo miss volta ao delay base."""
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        """Registra um miss e retorna quanto esperar antes do próximo poll."""
+        raw_delay = self.base_delay * (self.factor ** self.attempt)
+        capped = min(raw_delay, self.max_delay)
+        # No teto o expoente para de crescer (senão factor ** attempt estoura numa queda longa)
+        if raw_delay < self.max_delay:
+            self.attempt += 1
+        # O jitter espalha os polls de muitos workers (ex.: logo após o restart de um servidor)
+        jitter = uniform(-self.jitter_frac, self.jitter_frac)
+        return max(0.0, capped * (1 + jitter))
+
+
+class PollScheduler:
+    """
+    Decide a pausa do loop do worker a partir do desfecho de cada poll:
+    - produtivo (tarefa, REDIRECT, RETURN): pede de novo imediatamente;
+    - fila vazia: backoff 'idle';
+    - falha de conexão/erro: backoff 'failure' (mais longo).
+    """
+
+    def __init__(self, config: dict):
+        config_poll = config.get('polling', {})
+        factor = config_poll.get('backoff_factor', 2)
+        jitter_frac = config_poll.get('jitter_frac', 0.2)
+
+        self.idle = AdaptiveBackoff(
+            base_delay=config_poll.get('idle_base_delay', 0.5),
+            max_delay=config_poll.get('idle_max_delay', 5),
+            factor=factor,
+            jitter_frac=jitter_frac
+        )
+        self.failure = AdaptiveBackoff(
+            base_delay=config_poll.get('failure_base_delay', 1),
+            max_delay=config_poll.get('failure_max_delay', 15),
+            factor=factor,
+            jitter_frac=jitter_frac
+        )
+
+    def on_productive(self) -> float:
+        self.idle.reset()
+        self.failure.reset()
+        return 0.0
+
+    def on_empty(self) -> float:
+        self.failure.reset()
+        return self.idle.next_delay()
+
+    def on_failure(self) -> float:
+        return self.failure.next_delay()
@@ -1,21 +1,25 @@
 # dist_worker/client_actions.py
 import socket
 import json
+import time
 from logs.logger import logger
+from logs.events import events
 
 class ClientActionsMixin:
     
-    def _connect_and_send(self, payload: dict, host: str, port: int) -> dict:
+    def _connect_and_send(self, payload: dict, host: str, port: int, ignore_stop: bool = False) -> dict:
         """
         Função helper para conectar, enviar UM payload e receber UMA resposta.
         (Antiga 'connect_and_send' do worker_v1.py)
+        - 'ignore_stop' permite enviar mesmo durante o shutdown (ex.: devolver tarefas).
         """
         # Se o worker foi sinalizado para parar, não tente novas conexões
-        if not self._running:
+        if not self._running and not ignore_stop:
             return None
 
+        started = time.monotonic()
         try:
-            with socket.create_connection((host, port), timeout=5) as s:
+            with self.transport.connect(host, port, timeout=self.connect_timeout) as s:
                 
                 s.sendall((json.dumps(payload) + '\n').encode('utf-8'))
                 
@@ -27,6 +31,11 @@ class ClientActionsMixin:
                     return None
                 
                 response_data = json.loads(response_line)
+                if events.enabled:
+                    # Ida e volta vista pelo worker (conexão + resposta)
+                    route = payload.get("WORKER") or ("STATUS" if "STATUS" in payload else payload.get("TASK"))
+                    events.record(f"W.{route}", self.worker_id, duration=time.monotonic() - started,
+                                  source=self.worker_id, to=f"{host}:{port}")
                 return response_data
 
         except socket.timeout:
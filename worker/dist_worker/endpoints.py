@@ -0,0 +1,76 @@
+# dist_worker/endpoints.py
+import time
+import threading
+
+
+class EndpointTable:
+    """
+    Servidores conhecidos pelo worker, com saúde e latência.
+    - Começa com o servidor de casa + 'known_servers' do config.
+    - Aprende novos endereços pelos payloads de REDIRECT/RETURN.
+    - Um endpoint que falha fica 'down' por 'down_cooldown' segundos.
+    - A latência é uma média móvel exponencial (EWMA) do RTT dos pedidos.
+    """
+
+    def __init__(self, down_cooldown: float = 10, rtt_alpha: float = 0.3):
+        self.down_cooldown = down_cooldown
+        self.rtt_alpha = rtt_alpha
+        # key: (host, port) -> {'uuid', 'rtt', 'failures', 'down_until'}
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def learn(self, host: str, port: int, uuid: str = None):
+        """Registra um endpoint (ou completa o uuid de um já conhecido)."""
+        with self._lock:
+            entry = self._endpoints.get((host, port))
+            if entry is None:
+                self._endpoints[(host, port)] = {'uuid': uuid, 'rtt': None, 'failures': 0, 'down_until': 0.0}
+            elif uuid and not entry['uuid']:
+                entry['uuid'] = uuid
+
+    def record_success(self, host: str, port: int, rtt: float):
+        with self._lock:
+            entry = self._endpoints.get((host, port))
+            if entry is None:
+                return
+            entry['failures'] = 0
+            entry['down_until'] = 0.0
+            if entry['rtt'] is None:
+                entry['rtt'] = rtt
+            else:
+                entry['rtt'] = self.rtt_alpha * rtt + (1 - self.rtt_alpha) * entry['rtt']
+
+    def record_failure(self, host: str, port: int):
+        with self._lock:
+            entry = self._endpoints.get((host, port))
+            if entry is None:
+                return
+            entry['failures'] += 1
+            entry['down_until'] = time.monotonic() + self.down_cooldown
+
+    def is_healthy(self, host: str, port: int) -> bool:
+        with self._lock:
+            entry = self._endpoints.get((host, port))
+            return entry is not None and entry['down_until'] <= time.monotonic()
+
+    def ranked(self, exclude: tuple = None) -> list:
+        """
+        Lista (host, port) dos endpoints saudáveis, do melhor para o pior:
+        menos falhas recentes primeiro, depois menor RTT (desconhecido vai por último).
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._endpoints.items()
+                if key != exclude and entry['down_until'] <= now
+            ]
+        candidates.sort(key=lambda item: (
+            item[1]['failures'],
+            item[1]['rtt'] if item[1]['rtt'] is not None else float('inf')
+        ))
+        return [key for key, _ in candidates]
+
+    def snapshot(self) -> dict:
+        """Cópia do estado, para logs/diagnóstico."""
+        with self._lock:
+            return {f"{h}:{p}": dict(e) for (h, p), e in self._endpoints.items()}
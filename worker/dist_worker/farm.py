@@ -0,0 +1,165 @@
+# dist_worker/farm.py
+import copy
+import queue
+import signal
+import threading
+import time
+import multiprocessing as mp
+from logs.logger import logger
+from .worker import Worker
+
+
+def _child_main(config: dict, slot: int, stats_queue, stats_interval: float):
+    """
+    Ponto de entrada de um processo filho da farm.
+    Roda UM Worker e publica periodicamente quantas tarefas ele já executou.
+    """
+    # O pai cuida do Ctrl+C e encerra os filhos com SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    worker = Worker(config=config)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+
+    def report_stats():
+        while worker._running:
+            time.sleep(stats_interval)
+            stats_queue.put((slot, worker.worker_id, worker.tasks_completed))
+
+    threading.Thread(target=report_stats, name="FarmStats", daemon=True).start()
+    worker.start()
+    stats_queue.put((slot, worker.worker_id, worker.tasks_completed))
+
+
+class WorkerFarm:
+    """
+    Launcher de vários processos worker a partir de um único pai já "aquecido"
+    (imports e logging feitos uma vez, filhos criados com fork quando disponível).
+    - Reinicia filhos que morrem.
+    - Distribui os filhos entre os 'home_servers' da seção 'farm' (round-robin).
+    - Agrega o throughput de todos os filhos em uma linha de log periódica.
+    """
+
+    def __init__(self, config: dict, processes: int = None):
+        config_farm = config.get('farm', {})
+        self.config = config
+        self.processes = max(1, int(processes or config_farm.get('processes', 1)))
+        self.home_servers = config_farm.get('home_servers') or [config['home_server']]
+        self.restart_delay = config_farm.get('restart_delay', 2)
+        self.stats_interval = config_farm.get('stats_interval', 10)
+
+        start_methods = mp.get_all_start_methods()
+        self._ctx = mp.get_context('fork') if 'fork' in start_methods else mp.get_context()
+        self._stats_queue = self._ctx.Queue()
+
+        self._children = {}      # slot -> Process
+        self._restart_at = {}    # slot -> instante em que o filho pode ser recriado
+        self._counts = {}        # slot -> (worker_id, tasks_completed)
+        self._last_counts = {}   # slot -> tasks_completed no último resumo
+        self.restarts = 0
+        self._running = True
+
+    def _child_config(self, slot: int) -> dict:
+        """Config do filho: casa escolhida em round-robin; as demais casas viram 'known_servers'."""
+        child_config = copy.deepcopy(self.config)
+        home = self.home_servers[slot % len(self.home_servers)]
+        child_config['home_server'] = dict(home)
+
+        known = [s for s in child_config.get('known_servers', []) if (s['host'], s['port']) != (home['host'], home['port'])]
+        for other in self.home_servers:
+            if (other['host'], other['port']) != (home['host'], home['port']) and other not in known:
+                known.append(dict(other))
+        child_config['known_servers'] = known
+        return child_config
+
+    def _spawn(self, slot: int):
+        process = self._ctx.Process(
+            target=_child_main,
+            args=(self._child_config(slot), slot, self._stats_queue, self.stats_interval),
+            name=f"Worker-{slot}",
+            daemon=False
+        )
+        process.start()
+        self._children[slot] = process
+        home = self.home_servers[slot % len(self.home_servers)]
+        logger.info(f"[FARM] Filho {slot} iniciado (pid {process.pid}) -> casa {home['host']}:{home['port']}.")
+
+    def start(self):
+        """Sobe todos os filhos e supervisiona até stop() ou Ctrl+C."""
+        logger.info(f"[FARM] Iniciando {self.processes} processos worker...")
+        for slot in range(self.processes):
+            self._spawn(slot)
+
+        last_summary = time.monotonic()
+        try:
+            while self._running:
+                self._drain_stats(timeout=1.0)
+                self._supervise()
+
+                if time.monotonic() - last_summary >= self.stats_interval:
+                    self._log_summary(time.monotonic() - last_summary)
+                    last_summary = time.monotonic()
+        except KeyboardInterrupt:
+            logger.warning("[FARM] Ctrl+C recebido.")
+        finally:
+            self.stop()
+
+    def _supervise(self):
+        """Recria os filhos que morreram (depois de 'restart_delay' segundos)."""
+        now = time.monotonic()
+        for slot, process in list(self._children.items()):
+            if process.is_alive():
+                continue
+
+            if slot not in self._restart_at:
+                logger.error(f"[FARM] Filho {slot} (pid {process.pid}) morreu com código {process.exitcode}. Reiniciando em {self.restart_delay}s.")
+                self._restart_at[slot] = now + self.restart_delay
+            elif now >= self._restart_at[slot]:
+                del self._restart_at[slot]
+                self.restarts += 1
+                self._spawn(slot)
+
+    def _drain_stats(self, timeout: float):
+        """Lê as contagens publicadas pelos filhos."""
+        try:
+            slot, worker_id, completed = self._stats_queue.get(timeout=timeout)
+            self._counts[slot] = (worker_id, completed)
+            while True:
+                slot, worker_id, completed = self._stats_queue.get_nowait()
+                self._counts[slot] = (worker_id, completed)
+        except queue.Empty:
+            pass
+
+    def _log_summary(self, elapsed: float):
+        """Uma linha com o throughput total e por filho desde o último resumo."""
+        total = 0
+        per_child = []
+        for slot in sorted(self._counts):
+            worker_id, completed = self._counts[slot]
+            previous = self._last_counts.get(slot, 0)
+            # Filho reiniciado: o contador dele recomeçou do zero
+            delta = completed - previous if completed >= previous else completed
+            self._last_counts[slot] = completed
+            total += delta
+            per_child.append(f"{slot}:{delta / elapsed:.2f}")
+
+        alive = sum(1 for p in self._children.values() if p.is_alive())
+        logger.info(f"[FARM] {alive}/{self.processes} vivos | {total / elapsed:.2f} tarefas/s | reinícios: {self.restarts} | por filho: {' '.join(per_child)}")
+
+    def stop(self):
+        """Encerra todos os filhos (SIGTERM, e SIGKILL para quem não sair a tempo)."""
+        if not self._running and not self._children:
+            return
+        self._running = False
+        logger.warning(f"[FARM] Encerrando {len(self._children)} processos...")
+
+        for process in self._children.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._children.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                logger.error(f"[FARM] Filho pid {process.pid} não encerrou. Forçando.")
+                process.kill()
+                process.join()
+        self._children.clear()
+        logger.info("[FARM] Todos os processos encerrados.")
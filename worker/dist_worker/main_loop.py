@@ -1,8 +1,8 @@
 # dist_worker/main_loop.py
 import time
 from random import randint
-from logs.logger import logger 
-from payload_models import get_task, task_status
+from logs.logger import logger, log_route
+from payload_models import get_task
 
 class LogicMixin:
 
@@ -11,21 +11,44 @@ class LogicMixin:
         Loop principal do Worker.
         (Antiga 'run_worker' do worker_v1.py)
         """
-        
+
         while self._running: # A flag de controle agora é checada aqui
+            # Só pede tarefa se houver espaço nos slots livres + buffer de prefetch
+            # (ou se um slot recebeu uma ordem de REDIRECT/RETURN junto com o ACK)
+            if not self._wait_for_capacity():
+                break
+
             try:
-                # Decide qual 'owner_id' enviar
-                current_owner_id = None
-                if self.current_master_host != self.home_host or self.current_master_port != self.home_port:
-                    current_owner_id = self.owner_id
+                # Ordens que chegaram no campo NEXT de um ACK têm prioridade
+                if self._pending_orders:
+                    response = self._pending_orders.popleft()
+                    master_host, master_port = self.current_master_host, self.current_master_port
+                else:
+                    # Normalmente o mestre atual; em failover, de tempos em tempos sonda a casa
+                    master_host, master_port = self._choose_fetch_target()
+
+                    # Decide qual 'owner_id' enviar: fora de casa, informa quem é o dono
+                    current_owner_id = None
+                    if master_host != self.home_host or master_port != self.home_port:
+                        current_owner_id = self.owner_id
+
+                    # 1. PEDIR TAREFA
+                    log_route("FETCH", "INFO", "Pedindo nova tarefa ao servidor {}:{}...", master_host, master_port)
+
+                    get_task_payload = get_task(self.worker_id, owner_id=current_owner_id)
 
-                # 1. PEDIR TAREFA
-                logger.info(f"Pedindo nova tarefa ao servidor {self.current_master_host}:{self.current_master_port}...")
-                
-                get_task_payload = get_task(self.worker_id, owner_id=current_owner_id)
+                    # Chama o método do ClientActionsMixin
+                    sent_at = time.monotonic()
+                    response = self._connect_and_send(get_task_payload, master_host, master_port)
 
-                # Chama o método do ClientActionsMixin
-                response = self._connect_and_send(get_task_payload, self.current_master_host, self.current_master_port) 
+                    if response is not None:
+                        self.endpoints.record_success(master_host, master_port, time.monotonic() - sent_at)
+                        if (master_host, master_port) != (self.current_master_host, self.current_master_port):
+                            # A sonda da casa respondeu: volta para casa
+                            logger.success(f"Servidor de CASA ({self.home_host}:{self.home_port}) voltou. Saindo do failover.")
+                            self.current_master_host = self.home_host
+                            self.current_master_port = self.home_port
+                            self._failed_over = False
 
                 # Se o worker foi parado, response será None ou a flag estará False
                 if not self._running:
@@ -33,94 +56,151 @@ class LogicMixin:
 
 
                 if response is None:
-                    logger.warning(f"Falha ao conectar com {self.current_master_host}:{self.current_master_port}.")
-                    
-                    # Verifica se o worker estava "fora de casa"
-                    is_at_home = (self.current_master_host == self.home_host and 
-                                  self.current_master_port == self.home_port)
-
-                    if not is_at_home:
-                        # Se falhou ao conectar com um mestre temporário, VOLTA PARA CASA
-                        logger.error(f"Conexão perdida com mestre temporário. RETORNANDO PARA CASA ({self.home_host}:{self.home_port}).")
-                        self.current_master_host = self.home_host
-                        self.current_master_port = self.home_port
-                        time.sleep(5) # Pausa antes de tentar conectar em casa
-                    else:
-                        # Se falhou ao conectar com o mestre DE CASA, apenas espere e tente de novo.
-                        logger.error(f"Servidor de CASA ({self.home_host}) está offline. Tentando novamente em 15s...")
-                        time.sleep(15)
-                    
+                    logger.warning(f"Falha ao conectar com {master_host}:{master_port}.")
+                    self.endpoints.record_failure(master_host, master_port)
+
+                    if (master_host, master_port) != (self.current_master_host, self.current_master_port):
+                        # Era só a sonda da casa: continua no servidor de failover
+                        continue
+
+                    # Troca imediatamente para o melhor servidor saudável (casa tem prioridade)
+                    if self._fail_over(master_host, master_port):
+                        continue
+
+                    # Nenhum servidor saudável conhecido: espera com backoff e tenta de novo.
+                    delay = self.poller.on_failure()
+                    logger.error(f"Nenhum servidor disponível (atual: {master_host}:{master_port}). Tentando novamente em {delay:.2f}s...")
+                    self._pause(delay)
+
                     continue # Reinicia o loop (agora com o host/porta corretos)
 
                 # 2. PROCESSAR RESPOSTA
-                task_cmd = response.get("TASK")
-
-                # --- LÓGICAS DE FEDERAÇÃO ---
-                if task_cmd == "REDIRECT":
-                    new_master = response.get("SERVER_REDIRECT")
-                    if new_master and 'ip' in new_master and 'port' in new_master:
-                        logger.warning(f"ORDEM DE REDIRECT: Movendo para {new_master['ip']}:{new_master['port']}")
-                        # Atualiza o ESTADO do worker
-                        self.current_master_host = new_master['ip']
-                        self.current_master_port = new_master['port']
-                    else:
-                        logger.error("Recebido REDIRECT mal formatado.")
-                    time.sleep(2)
-                    continue 
-
-                elif task_cmd == "RETURN":
-                    home_master = response.get("SERVER_RETURN")
-                    if home_master and home_master['ip'] == self.home_host and home_master['port'] == self.home_port:
-                        logger.warning(f"ORDEM DE RETORNO: Voltando para casa {home_master['ip']}:{home_master['port']}")
-                        # Atualiza o ESTADO do worker
-                        self.current_master_host = self.home_host
-                        self.current_master_port = self.home_port
-                    else:
-                         logger.error("Recebido RETURN mal formatado.")
-                    time.sleep(2)
-                    continue
-                # --- FIM DA LÓGICA DE FEDERAÇÃO ---
+                outcome = self._process_response(response, master_host, master_port)
+
+                # Tarefa, REDIRECT ou RETURN: pede de novo sem pausa
+                if outcome in ("TASK", "REDIRECT", "RETURN"):
+                    self.poller.on_productive()
 
                 # Caso 2a: Fila Vazia
-                elif task_cmd == "NO_TASK":
-                    logger.info("Fila vazia. Aguardando 5 segundos...")
-                    time.sleep(5)
-                    continue
-
-                # Caso 2b: Recebeu uma Tarefa Real
-                elif task_cmd == "QUERY":
-                    task = response
-                    logger.success(f"Recebida tarefa QUERY para: {task.get('USER')}")
-
-                    work_time = 1
-                    logger.info(f"Processando tarefa por {work_time} segundos...")
-                    time.sleep(work_time)
-
-                    status_payload = task_status(
-                        status="OK",
-                        worker_id=self.worker_id,
-                        task=task_cmd
-                    )
-
-                    logger.info(f"Reportando status 'OK' para server...")
-                    ack_response = self._connect_and_send(status_payload, self.current_master_host, self.current_master_port)
-
-                    if ack_response and ack_response.get("STATUS") == "ACK":
-                        logger.success(f"Servidor confirmou (ACK) o recebimento do status.")
-                    else:
-                        logger.warning(f"Servidor NÃO confirmou o recebimento do status. Resposta: {ack_response}")
-                    
-                    time.sleep(1) 
+                elif outcome == "NO_TASK":
+                    delay = self.poller.on_empty()
+                    log_route("NO_TASK", "INFO", "Fila vazia. Aguardando {:.2f} segundos...", delay)
+                    self._pause(delay)
 
                 # Caso 2c: Resposta inesperada
-                else:
-                    logger.error(f"Resposta inesperada do servidor: {response}")
-                    time.sleep(5)
+                elif outcome == "UNEXPECTED":
+                    self._pause(self.poller.on_failure())
 
             except Exception as e:
                 # Só loga o erro se o worker não estiver parando
                 if self._running:
                     logger.critical(f"Erro fatal no loop do worker: {e}", exc_info=True)
-                    time.sleep(15)
-        
-        logger.info(f"Worker {self.worker_id} encerrando o loop principal.")
\ No newline at end of file
+                    self._pause(self.poller.on_failure())
+
+        logger.info(f"Worker {self.worker_id} encerrando o loop principal.")
+
+    def _pause(self, delay: float):
+        """
+        Espera 'delay' segundos, mas acorda antes se o worker for parado
+        ou se chegar uma ordem de REDIRECT/RETURN no campo NEXT de um ACK.
+        """
+        deadline = time.monotonic() + delay
+        with self._buffer_cond:
+            while self._running and not self._pending_orders:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._buffer_cond.wait(timeout=remaining)
+
+    def _choose_fetch_target(self) -> tuple:
+        """
+        Retorna (host, port) de quem deve receber o próximo get_task.
+        Em failover (casa caiu), a cada 'home_probe_interval' segundos pede à casa.
+        """
+        if self._failed_over and (time.monotonic() - self._last_home_probe) >= self.home_probe_interval:
+            self._last_home_probe = time.monotonic()
+            return self.home_host, self.home_port
+        return self.current_master_host, self.current_master_port
+
+    def _fail_over(self, failed_host: str, failed_port: int) -> bool:
+        """
+        Troca o mestre atual depois de uma falha de conexão.
+        Prefere a casa (se saudável); senão o melhor endpoint pelo ranking
+        de saúde/latência. Retorna False se não há nenhum candidato saudável.
+        """
+        home = (self.home_host, self.home_port)
+        candidates = self.endpoints.ranked(exclude=(failed_host, failed_port))
+        if not candidates:
+            return False
+
+        target = home if home in candidates else candidates[0]
+
+        # As tarefas pré-buscadas eram do mestre que caiu: devolvê-las a ele
+        # falharia, então vão para o novo mestre. Se o antigo voltar com elas
+        # no WAL, o dispatch timeout dele as reenfileira (pelo menos uma vez).
+        self._drain_buffer(f"{failed_host}:{failed_port} offline", target=target)
+
+        self.current_master_host, self.current_master_port = target
+        self._failed_over = target != home
+        self._last_home_probe = time.monotonic()
+
+        if self._failed_over:
+            logger.error(f"FAILOVER: {failed_host}:{failed_port} offline. Usando {target[0]}:{target[1]} (dono continua {self.owner_id}).")
+        else:
+            logger.error(f"Conexão perdida com {failed_host}:{failed_port}. RETORNANDO PARA CASA ({self.home_host}:{self.home_port}).")
+        self.poller.on_productive()
+        return True
+
+    def _process_response(self, response: dict, master_host: str, master_port: int) -> str:
+        """
+        Trata uma resposta do mestre (de um get_task ou do campo NEXT de um ACK).
+        Retorna o desfecho: 'REDIRECT', 'RETURN', 'NO_TASK', 'TASK' ou 'UNEXPECTED'.
+        """
+        task_cmd = response.get("TASK")
+
+        # --- LÓGICAS DE FEDERAÇÃO ---
+        if task_cmd == "REDIRECT":
+            new_master = response.get("SERVER_REDIRECT")
+            if new_master and 'ip' in new_master and 'port' in new_master:
+                logger.warning(f"ORDEM DE REDIRECT: Movendo para {new_master['ip']}:{new_master['port']}")
+                # As tarefas pré-buscadas pertencem ao mestre antigo
+                self._drain_buffer("REDIRECT")
+                self.endpoints.learn(new_master['ip'], new_master['port'])
+                # Atualiza o ESTADO do worker
+                self.current_master_host = new_master['ip']
+                self.current_master_port = new_master['port']
+                self._failed_over = False
+            else:
+                logger.error("Recebido REDIRECT mal formatado.")
+            return "REDIRECT"
+
+        elif task_cmd == "RETURN":
+            home_master = response.get("SERVER_RETURN")
+            if home_master and home_master['ip'] == self.home_host and home_master['port'] == self.home_port:
+                logger.warning(f"ORDEM DE RETORNO: Voltando para casa {home_master['ip']}:{home_master['port']}")
+                self._drain_buffer("RETURN")
+                # Atualiza o ESTADO do worker
+                self.current_master_host = self.home_host
+                self.current_master_port = self.home_port
+                self._failed_over = False
+            else:
+                 logger.error("Recebido RETURN mal formatado.")
+            return "RETURN"
+        # --- FIM DA LÓGICA DE FEDERAÇÃO ---
+
+        # Caso 2a: Fila Vazia
+        elif task_cmd == "NO_TASK":
+            return "NO_TASK"
+
+        # Caso 2b: Recebeu uma Tarefa Real
+        elif task_cmd == "QUERY":
+            log_route("TASK.RECEIVED", "SUCCESS", "Recebida tarefa QUERY para: {}", response.get('USER'))
+
+            # Vai para o buffer local; um slot livre a executa e o loop
+            # volta a pedir tarefa enquanto houver capacidade.
+            self._buffer_task(response, master_host, master_port)
+            return "TASK"
+
+        # Caso 2c: Resposta inesperada
+        logger.error(f"Resposta inesperada do servidor: {response}")
+        return "UNEXPECTED"
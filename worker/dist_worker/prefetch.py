@@ -0,0 +1,144 @@
+# dist_worker/prefetch.py
+import time
+import threading
+from collections import deque
+from logs.logger import logger
+from payload_models import task_handback
+
+
+class PrefetchMixin:
+
+    def _init_prefetch(self, config: dict):
+        """
+        Prepara o buffer local de tarefas a partir da seção 'prefetch' do config.
+        - depth: quantas tarefas podem ficar esperando localmente além dos slots livres.
+        - low_water: o buffer só volta a ser preenchido quando cair até este nível.
+        - ttl: tempo (s) máximo que uma tarefa pode ficar no buffer antes de ser devolvida.
+        - piggyback: pede a próxima tarefa junto com o report de status ("report and fetch").
+        """
+        config_prefetch = config.get('prefetch', {})
+        self.prefetch_depth = max(0, int(config_prefetch.get('depth', 0)))
+        self.prefetch_low_water = min(int(config_prefetch.get('low_water', 0)), self.prefetch_depth)
+        self.prefetch_ttl = config_prefetch.get('ttl', 30)
+        self.piggyback = bool(config_prefetch.get('piggyback', False))
+
+        # Cada item: (task, master_host, master_port, fetched_at)
+        self.task_buffer = deque()
+        self._buffer_cond = threading.Condition()
+        self._filling = True
+
+        # Ordens de REDIRECT/RETURN recebidas no campo NEXT de um ACK.
+        # São aplicadas pelo loop principal, que é o dono do estado do mestre.
+        self._pending_orders = deque()
+
+    def _wait_for_capacity(self) -> bool:
+        """
+        Bloqueia o loop de busca até que valha a pena pedir outra tarefa.
+        Capacidade = slots livres + profundidade do prefetch. Usa histerese:
+        depois de cheio, só volta a buscar quando o buffer cai até 'low_water'.
+        """
+        with self._buffer_cond:
+            while self._running:
+                if self._pending_orders:
+                    return True
+
+                free_slots = self.concurrency - self._inflight
+                buffered = len(self.task_buffer)
+                has_room = buffered < free_slots + self.prefetch_depth
+
+                if not has_room:
+                    self._filling = False
+                elif not self._filling and buffered <= self.prefetch_low_water:
+                    self._filling = True
+
+                if has_room and self._filling:
+                    return True
+                self._buffer_cond.wait(timeout=1.0)
+        return False
+
+    def _wants_next_task(self) -> bool:
+        """
+        Chamado por um slot que está terminando uma tarefa: diz se vale a pena
+        pedir a próxima junto com o report (o próprio slot conta como livre).
+        """
+        with self._buffer_cond:
+            free_slots = self.concurrency - (self._inflight - 1)
+            return len(self.task_buffer) < free_slots + self.prefetch_depth
+
+    def _accept_next_message(self, message: dict, master_host: str, master_port: int):
+        """Trata o campo NEXT de um ACK: bufferiza a tarefa ou agenda a ordem."""
+        task_cmd = message.get("TASK")
+        if task_cmd in ("REDIRECT", "RETURN"):
+            with self._buffer_cond:
+                self._pending_orders.append(message)
+                self._buffer_cond.notify_all()
+        elif task_cmd != "NO_TASK":
+            self._process_response(message, master_host, master_port)
+
+    def _buffer_task(self, task: dict, master_host: str, master_port: int):
+        """Coloca uma tarefa recebida no buffer local e acorda um slot."""
+        with self._buffer_cond:
+            self.task_buffer.append((task, master_host, master_port, time.time()))
+            self._buffer_cond.notify_all()
+
+    def _take_buffered_task(self):
+        """
+        Retira a próxima tarefa do buffer (chamado pelos slots).
+        Tarefas que passaram do TTL são devolvidas em vez de executadas.
+        Retorna None quando o worker está parando.
+        """
+        with self._buffer_cond:
+            while self._running:
+                expired = []
+                now = time.time()
+                while self.task_buffer and (now - self.task_buffer[0][3]) > self.prefetch_ttl:
+                    expired.append(self.task_buffer.popleft())
+
+                if expired:
+                    self._buffer_cond.notify_all()
+                    # Devolve fora do lock para não segurar os outros slots
+                    self._buffer_cond.release()
+                    try:
+                        logger.warning(f"[PREFETCH] {len(expired)} tarefas expiraram no buffer. Devolvendo.")
+                        self._hand_back(expired)
+                    finally:
+                        self._buffer_cond.acquire()
+                    continue
+
+                if self.task_buffer:
+                    entry = self.task_buffer.popleft()
+                    self._inflight += 1
+                    self._buffer_cond.notify_all()
+                    return entry
+
+                self._buffer_cond.wait(timeout=1.0)
+        return None
+
+    def _drain_buffer(self, reason: str, target: tuple = None):
+        """
+        Esvazia o buffer e devolve as tarefas aos mestres que as entregaram.
+        Com 'target' (host, port), todas vão para ele (failover: o mestre de
+        origem está fora do ar).
+        """
+        with self._buffer_cond:
+            entries = list(self.task_buffer)
+            self.task_buffer.clear()
+            self._buffer_cond.notify_all()
+
+        if entries:
+            logger.warning(f"[PREFETCH] Devolvendo {len(entries)} tarefas do buffer ({reason}).")
+            self._hand_back(entries, target)
+
+    def _hand_back(self, entries: list, target: tuple = None):
+        """Agrupa as tarefas por mestre de origem (ou 'target') e envia um HANDBACK para cada um."""
+        by_master = {}
+        for task, host, port, _ in entries:
+            by_master.setdefault(target or (host, port), []).append(task)
+
+        for (host, port), tasks in by_master.items():
+            payload = task_handback(worker_id=self.worker_id, tasks=tasks)
+            response = self._connect_and_send(payload, host, port, ignore_stop=True)
+            if response and response.get("STATUS") == "ACK":
+                logger.info(f"[PREFETCH] {len(tasks)} tarefas devolvidas para {host}:{port}.")
+            else:
+                logger.error(f"[PREFETCH] Falha ao devolver {len(tasks)} tarefas para {host}:{port}. Resposta: {response}")
@@ -0,0 +1,126 @@
+# dist_worker/task_executor.py
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from logs.logger import logger, log_route
+from logs.events import events
+from payload_models import task_status
+
+
+def _run_cpu_bound(task: dict, work_time: float) -> str:
+    """
+    Execução simulada de uma tarefa CPU-bound.
+    Roda em um processo do ProcessPool, por isso fica no nível do módulo (picklável).
+    """
+    deadline = time.perf_counter() + work_time
+    acc = 0
+    while time.perf_counter() < deadline:
+        acc += 1
+    return "OK"
+
+
+class ExecutionMixin:
+
+    def _init_execution(self, config: dict):
+        """
+        Prepara os slots de execução a partir da seção 'execution' do config.
+        - concurrency: quantas tarefas podem estar em andamento ao mesmo tempo.
+        - cpu_bound_tasks: tipos de tarefa que vão para o pool de processos.
+        - work_time: tempo (s) simulado de execução de cada tarefa.
+        """
+        config_exec = config.get('execution', {})
+        self.concurrency = max(1, int(config_exec.get('concurrency', 1)))
+        self.cpu_bound_tasks = set(config_exec.get('cpu_bound_tasks', []))
+        self.work_time = config_exec.get('work_time', 1)
+
+        # Tarefas em execução agora (protegido pelo _buffer_cond do PrefetchMixin)
+        self._inflight = 0
+        # Total de tarefas executadas (lido pelo launcher de farm para medir throughput)
+        self.tasks_completed = 0
+
+        self._executor = None
+        self._process_pool = None
+
+    def _start_slots(self):
+        """Sobe uma thread consumidora por slot; cada uma puxa tarefas do buffer local."""
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="TaskSlot")
+        if self.cpu_bound_tasks:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.concurrency)
+
+        for _ in range(self.concurrency):
+            self._executor.submit(self._slot_loop)
+
+    def _slot_loop(self):
+        """Loop de um slot: pega a próxima tarefa do buffer, executa e reporta."""
+        while self._running:
+            entry = self._take_buffered_task()
+            if entry is None:
+                break
+            task, master_host, master_port, _ = entry
+            self._execute_and_report(task, master_host, master_port)
+
+    def _execute_and_report(self, task: dict, master_host: str, master_port: int):
+        """
+        Executa a tarefa e reporta o status.
+        O status é reportado ao mestre que ENTREGOU a tarefa, mesmo que o
+        worker tenha sido redirecionado enquanto ela executava.
+        """
+        task_cmd = task.get("TASK")
+        try:
+            log_route("TASK.RUN", "INFO", "Processando tarefa {} para {} por {} segundos...", task_cmd, task.get('USER'), self.work_time)
+            exec_started = time.monotonic()
+            status = self._execute_task(task)
+            exec_time = time.monotonic() - exec_started
+            if events.enabled:
+                events.record("EXEC", self.worker_id, source=self.worker_id, duration=exec_time,
+                              task=task.get("TASK_ID"), st=status)
+            with self._buffer_cond:
+                self.tasks_completed += 1
+
+            # "Report and fetch": só pede a próxima se ainda estamos neste mestre
+            fetch_next = (self.piggyback
+                          and (master_host, master_port) == (self.current_master_host, self.current_master_port)
+                          and self._wants_next_task())
+
+            status_payload = task_status(
+                status=status,
+                worker_id=self.worker_id,
+                task=task_cmd,
+                fetch_next=fetch_next,
+                task_id=task.get("TASK_ID"),
+                exec_time=exec_time
+            )
+
+            log_route("STATUS.REPORT", "INFO", "Reportando status '{}' para server...", status)
+            ack_response = self._connect_and_send(status_payload, master_host, master_port)
+
+            if ack_response and ack_response.get("STATUS") == "ACK":
+                log_route("STATUS.ACK", "SUCCESS", "Servidor confirmou (ACK) o recebimento do status.")
+                # Servidores antigos ignoram FETCH_NEXT e não mandam NEXT
+                if ack_response.get("NEXT"):
+                    self._accept_next_message(ack_response["NEXT"], master_host, master_port)
+            else:
+                logger.warning(f"Servidor NÃO confirmou o recebimento do status. Resposta: {ack_response}")
+
+        except Exception as e:
+            if self._running:
+                logger.error(f"Erro ao executar tarefa {task_cmd}: {e}", exc_info=True)
+        finally:
+            with self._buffer_cond:
+                self._inflight -= 1
+                self._buffer_cond.notify_all()
+
+    def _execute_task(self, task: dict) -> str:
+        """Executa a tarefa (simulada). Retorna 'OK' ou 'NOK'."""
+        if self._process_pool and task.get("TASK") in self.cpu_bound_tasks:
+            return self._process_pool.submit(_run_cpu_bound, task, self.work_time).result()
+
+        # Tarefas I/O-bound apenas esperam; a thread do slot fica livre para o GIL
+        time.sleep(self.work_time)
+        return "OK"
+
+    def _shutdown_execution(self, wait: bool = True):
+        """Encerra os pools de execução, aguardando as tarefas em voo se 'wait'."""
+        if self._executor:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+        if self._process_pool:
+            self._process_pool.shutdown(wait=wait, cancel_futures=not wait)
@@ -2,31 +2,45 @@
 import uuid
 import time
 import json # <-- Importe JSON
-from logs.logger import logger, setup_file_logging
+from logs.logger import logger, setup_file_logging, configure_route_logging, route_logger
+from logs.events import events, configure_event_log
 from .client_actions import ClientActionsMixin
 from .main_loop import LogicMixin
+from .task_executor import ExecutionMixin
+from .prefetch import PrefetchMixin
+from .backoff import PollScheduler
+from .endpoints import EndpointTable
+from transport import TcpTransport
 
-class Worker(ClientActionsMixin, LogicMixin):
+class Worker(ClientActionsMixin, LogicMixin, ExecutionMixin, PrefetchMixin):
     
-    def __init__(self, config_path=None):
+    def __init__(self, config_path=None, config: dict = None, transport=None, file_logging: bool = True):
         """
         Inicializa o worker e seu estado, carregando
         a configuração de um arquivo JSON.
+        - 'config' permite passar o dict já carregado (usado pelo launcher de farm).
+        - 'transport' troca o TCP por outro transporte (ex.: LoopbackTransport em memória).
+        - 'file_logging=False' não cria arquivos de log próprios (muitos workers no mesmo processo).
         """
-        logger.info(f"Inicializando worker com config: {config_path}")
+        logger.info(f"Inicializando worker com config: {config_path or 'dict em memória'}")
         
         # --- LÓGICA DE CARREGAMENTO DO JSON ---
-        if not config_path:
+        if not config_path and config is None:
             raise ValueError("O caminho para o arquivo de configuração (config_path) é obrigatório.")
             
         try:
-            with open(config_path, 'r') as f:
-                config = json.load(f)
+            if config is None:
+                with open(config_path, 'r') as f:
+                    config = json.load(f)
             
             # Carrega os dados do JSON
             self.home_host = config['home_server']['host']
             self.home_port = config['home_server']['port']
             self.home_uuid = config['home_server']['uuid']
+            known_servers = config.get('known_servers', [])
+            config_failover = config.get('failover', {})
+            # Amostragem/rate limit dos logs do caminho quente (seção 'logging')
+            configure_route_logging(config.get('logging'))
             
         except FileNotFoundError:
             logger.critical(f"ERRO: Arquivo de configuração '{config_path}' não encontrado!")
@@ -47,21 +61,58 @@ class Worker(ClientActionsMixin, LogicMixin):
         self.current_master_host = self.home_host
         self.current_master_port = self.home_port
         self.owner_id = self.home_uuid # O 'dono' original
+
+        self.transport = transport or TcpTransport()
+
+        # Servidores conhecidos para failover (casa + 'known_servers' + aprendidos em REDIRECT/RETURN)
+        self.connect_timeout = config_failover.get('connect_timeout', 5)
+        self.home_probe_interval = config_failover.get('home_probe_interval', 15)
+        self.endpoints = EndpointTable(down_cooldown=config_failover.get('down_cooldown', 10))
+        self.endpoints.learn(self.home_host, self.home_port, self.home_uuid)
+        for srv in known_servers:
+            self.endpoints.learn(srv['host'], srv['port'], srv.get('uuid'))
+        self._failed_over = False # True quando saiu de casa por falha (não por REDIRECT)
+        self._last_home_probe = 0.0
         
         # Flag de controle
         self._running = True
 
+        # Slots de execução concorrente (seção 'execution' do config)
+        self._init_execution(config)
+        # Buffer local de tarefas pré-buscadas (seção 'prefetch' do config)
+        self._init_prefetch(config)
+        # Pausas adaptativas entre polls (seção 'polling' do config)
+        self.poller = PollScheduler(config)
+
         # Configura os logs de ARQUIVO usando esse ID
-        setup_file_logging(self.worker_id)
+        if file_logging:
+            setup_file_logging(self.worker_id)
+        # Log estruturado de eventos (seção 'events', desligado por padrão)
+        configure_event_log(config.get('events'), self.worker_id)
         
-        logger.success(f"Worker {self.worker_id} inicializado. DONO: {self.home_host}:{self.home_port} ({self.home_uuid})")
+        logger.success(f"Worker {self.worker_id} inicializado. DONO: {self.home_host}:{self.home_port} ({self.home_uuid}) | Slots: {self.concurrency} | Prefetch: {self.prefetch_depth}")
 
     def start(self):
         """Inicia o loop principal do worker."""
         # _run_loop() vem do LogicMixin e contém o "while self._running"
-        self._run_loop()
+        self._start_slots()
+        try:
+            self._run_loop()
+        finally:
+            # Garante que os slots parem mesmo se o loop saiu por uma exceção (ex.: Ctrl+C)
+            self._running = False
+            with self._buffer_cond:
+                self._buffer_cond.notify_all()
+            # Devolve o que ainda estava no buffer e aguarda as tarefas em execução
+            self._drain_buffer("shutdown")
+            self._shutdown_execution(wait=True)
         
     def stop(self):
         """Sinaliza para o loop parar na próxima iteração."""
         logger.warning("Sinal de encerramento recebido...")
-        self._running = False
\ No newline at end of file
+        self._running = False
+        route_logger.flush()
+        events.close()
+        # Acorda o loop de busca e os slots que estão esperando no buffer
+        with self._buffer_cond:
+            self._buffer_cond.notify_all()
\ No newline at end of file
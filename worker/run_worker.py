@@ -1,25 +1,49 @@
 # run_worker.py
+import sys
+import json
+import argparse
 from .dist_worker import Worker
+from .dist_worker.farm import WorkerFarm
 from logs.logger import logger
 
 WORKER_CONFIG_PATH = "worker/config.json"
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inicia um worker (ou uma farm de workers).")
+    parser.add_argument("config", nargs="?", default=WORKER_CONFIG_PATH,
+                        help=f"Caminho do config do worker (padrão: {WORKER_CONFIG_PATH})")
+    parser.add_argument("--processes", "-n", type=int, default=None,
+                        help="Número de processos worker (modo farm). Padrão: 'farm.processes' do config ou 1.")
+    args = parser.parse_args()
+
+    # --- MODO FARM: vários processos a partir deste pai ---
+    try:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    except Exception as e:
+        logger.critical(f"Falha ao ler o config '{args.config}': {e}")
+        sys.exit(1)
+
+    processes = args.processes or config.get('farm', {}).get('processes', 1)
+    if processes > 1:
+        WorkerFarm(config, processes=processes).start()
+        sys.exit(0)
+
+    # --- MODO SIMPLES: um único worker neste processo ---
     worker = None
     try:
         logger.info("Iniciando o worker...")
-        # Você pode passar um config aqui se quiser no futuro
-        worker = Worker(config_path=WORKER_CONFIG_PATH) 
+        worker = Worker(config_path=args.config)
         # start() agora é o loop principal e vai bloquear a execução aqui
-        worker.start() 
-    
+        worker.start()
+
     except KeyboardInterrupt:
         logger.warning("Recebido sinal de encerramento. Parando worker...")
         if worker:
             worker.stop()
         logger.info("Worker encerrado pelo usuário.")
-    
+
     except Exception as e:
         logger.critical(f"Falha ao iniciar o worker: {e}", exc_info=True)
         if worker:
-            worker.stop()
\ No newline at end of file
+            worker.stop()